@@ -0,0 +1,100 @@
+"""
+Import-Time Benchmark:Measures cold-start latency of every eval module.
+
+Each module is imported in a FRESH interpreter (so nothing is cached in sys.modules) and we record:
+1)wall: end-to-end time of `python -c "import <module>"` minus a bare interpreter start
+2)self: the module's own cumulative import time reported by `python -X importtime`
+3)heavy: which heavy dependencies (inspect_ai, dotenv, provider SDKs) got pulled in by the import
+
+Usage: python bench_imports.py [--repeat N] [module ...]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+EVAL_MODULES = [
+    "eval_common",
+    "hallucination_eval",
+    "failure_taxonomy",
+    "prompt_variation_eval",
+    "tool_agent_eval",
+    "multi_model_eval",
+    "task_matrix",
+    "log_analysis",
+    "log_compact",
+    "log_index",
+]
+
+HEAVY_MODULES = ["inspect_ai", "dotenv", "openai", "anthropic", "boto3", "httpx"]
+
+PROBE = (
+    "import sys, {module}; "
+    "print(','.join(m for m in {heavy!r} if m in sys.modules))"
+)
+
+# MEASUREMENT
+def _run(code, importtime=False):
+    """Run code in a fresh interpreter; return (wall seconds, stdout, stderr)"""
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    return wall, proc.stdout, proc.stderr
+
+
+def _self_import_us(stderr, module):
+    """Cumulative microseconds for `module` from -X importtime output"""
+    for line in stderr.splitlines():
+        # format: "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1].strip())
+    return 0
+
+
+def benchmark_module(module, repeat=5, baseline=0.0):
+    """Median cold-start numbers for one module"""
+    walls, selfs, heavy = [], [], ""
+    for _ in range(repeat):
+        wall, out, _ = _run(PROBE.format(module=module, heavy=HEAVY_MODULES))
+        walls.append(max(wall - baseline, 0.0))
+        heavy = out.strip()
+        _, _, err = _run(f"import {module}", importtime=True)
+        selfs.append(_self_import_us(err, module))
+    return {
+        "module": module,
+        "wall_ms": statistics.median(walls) * 1000,
+        "self_ms": statistics.median(selfs) / 1000,
+        "heavy": heavy or "-"
+    }
+
+
+def interpreter_baseline(repeat=5):
+    """Median wall time of a bare `python -c pass`, subtracted from every measurement"""
+    return statistics.median(_run("pass")[0] for _ in range(repeat))
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import latency per eval module")
+    parser.add_argument("modules", nargs="*", default=EVAL_MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = interpreter_baseline(args.repeat)
+    print(f"Interpreter baseline: {baseline * 1000:.1f} ms (subtracted)\n")
+    print(f"{'module':<24}{'wall ms':>10}{'self ms':>10}  heavy deps loaded")
+    print("-" * 70)
+    for module in args.modules:
+        try:
+            r = benchmark_module(module, args.repeat, baseline)
+            print(f"{r['module']:<24}{r['wall_ms']:>10.1f}{r['self_ms']:>10.1f}  {r['heavy']}")
+        except RuntimeError as e:
+            print(f"{module:<24}{'error':>10}{'':>10}  {e}")
+
+
+if __name__ == "__main__":
+    main()
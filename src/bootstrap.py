@@ -0,0 +1,208 @@
+"""
+Bootstrap Intervals:Percentile bootstrap CIs for every accuracy / refusal rate in the reports, in one vectorized pass.
+
+Report metrics are means of discrete per-sample values (correct 1 / partial 0.5 / incorrect 0,
+refused 1 / 0, and paired differences -1 / 0 / 1), so resampling n samples with replacement
+only changes how many land on each value: the resampled counts are Multinomial(n, observed
+frequencies). Drawing those counts directly is the same distribution as resampling indices,
+at a cost independent of n:
+1)compress: each group (a report cell) becomes (support values, counts) via np.unique
+2)draw: the multinomial is drawn as sequential binomials for ALL groups at once, in chunks of
+  groups so a draw never holds more than CHUNK_CELLS numbers
+3)paired: a model-vs-model delta is the bootstrap of the per-sample differences over samples
+  both runs scored (resampling pairs, so the correlation between the runs is kept)
+
+A rate observed at 0/n or n/n has no spread to resample (the percentile interval would be
+[0%, 0%] or [100%, 100%] however small n is), so those groups get a Wilson score interval
+instead; any other group without spread (e.g. two runs agreeing on every sample) is marked as
+such by format_ci. Groups with more than MAX_SUPPORT distinct values (continuous metrics)
+resample indices instead.
+Without NumPy the same intervals come from a slower pure-Python resampler with
+FALLBACK_RESAMPLES draws.
+
+Run: python bootstrap.py --bench 1000000 [--resamples 10000] [--groups 100]
+"""
+import argparse
+import math
+import random
+import time
+from statistics import NormalDist
+from typing import Dict, List, Any, Optional, Sequence
+
+RESAMPLES = 10000
+CONFIDENCE = 0.95
+SEED = 0  # fixed, so a report prints the same interval every time
+CHUNK_CELLS = 1 << 21  # groups x resamples per draw
+MAX_SUPPORT = 16
+FALLBACK_RESAMPLES = 1000
+
+
+def _numpy() -> Optional[Any]:
+    try:
+        import numpy as np
+        return np
+    except ImportError:
+        return None
+
+# INTERVALS
+def wilson(successes: float, n: int, confidence: float = CONFIDENCE) -> tuple:
+    """(low, high) Wilson score interval of a binomial rate"""
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    rate = successes / n
+    center = (rate + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(rate * (1 - rate) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def _boundary_rate(values: Sequence[float]) -> Optional[float]:
+    """0.0 / 1.0 when every value is 0 / every value is 1 (a rate at 0/n or n/n), else None"""
+    first = float(values[0])
+    if first not in (0.0, 1.0):
+        return None
+    return first if all(float(v) == first for v in values) else None
+
+
+def bootstrap_means(groups: Dict[Any, Sequence[float]], resamples: int = RESAMPLES, confidence: float = CONFIDENCE,
+                    seed: int = SEED, rates: bool = True) -> Dict[Any, tuple]:
+    """
+    key -> (mean, low, high, n) for every non-empty group of per-sample values. With rates
+    (values in [0, 1]), a group at 0/n or n/n gets its Wilson interval.
+    """
+    groups = {key: values for key, values in groups.items() if len(values)}
+    out = {}
+    for key in list(groups) if rates else []:
+        rate = _boundary_rate(groups[key])
+        if rate is not None:
+            n = len(groups.pop(key))
+            low, high = wilson(rate * n, n, confidence)
+            out[key] = (rate, 0.0 if rate == 0 else low, 1.0 if rate == 1 else high, n)
+    if not groups:
+        return out
+    np = _numpy()
+    if np is None:
+        return {**out, **_python_means(groups, min(resamples, FALLBACK_RESAMPLES), confidence, seed)}
+    rng = np.random.default_rng(seed)
+    quantiles = [(1 - confidence) / 2, 1 - (1 - confidence) / 2]
+    keys = list(groups)
+    compressed = [np.unique(np.asarray(groups[key], dtype=np.float64), return_counts=True) for key in keys]
+
+    discrete = [i for i, (support, _) in enumerate(compressed) if len(support) <= MAX_SUPPORT]
+    if discrete:
+        width = max(len(compressed[i][0]) for i in discrete)
+        support = np.zeros((len(discrete), width))
+        counts = np.zeros((len(discrete), width), dtype=np.int64)
+        for row, i in enumerate(discrete):
+            values, value_counts = compressed[i]
+            support[row, :len(values)] = values
+            counts[row, :len(values)] = value_counts
+        n = counts.sum(axis=1)
+        bounds = np.empty((len(discrete), 2))
+        rows = max(1, CHUNK_CELLS // resamples)
+        for start in range(0, len(discrete), rows):
+            chunk = slice(start, start + rows)
+            means = _multinomial_means(np, rng, support[chunk], counts[chunk], n[chunk], resamples)
+            bounds[chunk] = np.quantile(means, quantiles, axis=1).T
+        for row, i in enumerate(discrete):
+            mean = float(support[row] @ counts[row] / n[row])
+            out[keys[i]] = (mean, float(bounds[row, 0]), float(bounds[row, 1]), int(n[row]))
+
+    for i, (support, value_counts) in enumerate(compressed):
+        if len(support) > MAX_SUPPORT:
+            values = np.repeat(support, value_counts)
+            means = np.empty(resamples)
+            rows = max(1, CHUNK_CELLS // len(values))
+            for start in range(0, resamples, rows):
+                size = min(rows, resamples - start)
+                means[start:start + size] = values[rng.integers(0, len(values), size=(size, len(values)))].mean(axis=1)
+            low, high = np.quantile(means, quantiles)
+            out[keys[i]] = (float(values.mean()), float(low), float(high), len(values))
+    return out
+
+
+def _multinomial_means(np: Any, rng: Any, support: Any, counts: Any, n: Any, resamples: int) -> Any:
+    """(groups x resamples) resampled means: value counts drawn as sequential binomials per column"""
+    means = np.zeros((len(n), resamples))
+    remaining = np.repeat(n[:, None], resamples, axis=1)
+    left = n.astype(np.float64)  # observations not yet assigned to an earlier value
+    for j in range(support.shape[1] - 1):
+        p = np.divide(counts[:, j], left, out=np.zeros(len(n)), where=left > 0)
+        drawn = rng.binomial(remaining, np.clip(p, 0.0, 1.0)[:, None])
+        means += drawn * support[:, j:j + 1]
+        remaining -= drawn
+        left -= counts[:, j]
+    means += remaining * support[:, -1:]
+    return means / n[:, None]
+
+
+def _python_means(groups: Dict[Any, Sequence[float]], resamples: int, confidence: float, seed: int) -> Dict[Any, tuple]:
+    """Pure-Python resampling (no NumPy): index draws per resample, so O(n x resamples)"""
+    rng = random.Random(seed)
+    out = {}
+    for key, values in groups.items():
+        values = [float(v) for v in values]
+        n = len(values)
+        means = sorted(sum(rng.choices(values, k=n)) / n for _ in range(resamples))
+        low = means[int((1 - confidence) / 2 * (resamples - 1))]
+        high = means[int((1 - (1 - confidence) / 2) * (resamples - 1))]
+        out[key] = (sum(values) / n, low, high, n)
+    return out
+
+
+def paired_deltas(pairs: Dict[Any, List[tuple]], resamples: int = RESAMPLES, confidence: float = CONFIDENCE,
+                  seed: int = SEED) -> Dict[Any, tuple]:
+    """key -> (mean of a - b, low, high, n) over [(a, b)] values of the same samples in two runs"""
+    return bootstrap_means({key: [a - b for a, b in values] for key, values in pairs.items()},
+                           resamples, confidence, seed, rates=False)
+
+
+def format_ci(estimate: Optional[tuple], signed: bool = False) -> str:
+    """
+    '38% [12%, 75%]' (or '+12.5% [-3.1%, +28.0%]' for deltas); '' without an estimate.
+    A zero-width interval has no spread to bootstrap and is printed as such, not as certainty.
+    """
+    if not estimate:
+        return ""
+    mean, low, high = estimate[:3]
+    if low == high and len(estimate) > 3:
+        return f"{mean:+.1%} (no variation in {estimate[3]})" if signed else f"{mean:.0%} (no variation in {estimate[3]})"
+    if signed:
+        return f"{mean:+.1%} [{low:+.1%}, {high:+.1%}]"
+    return f"{mean:.0%} [{low:.0%}, {high:.0%}]"
+
+
+def excludes_zero(estimate: tuple) -> bool:
+    return estimate[1] > 0 or estimate[2] < 0
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="Time the vectorized bootstrap on synthetic per-sample arrays")
+    parser.add_argument("--bench", type=int, metavar="N", default=1000000, help="samples per run")
+    parser.add_argument("--resamples", type=int, default=RESAMPLES)
+    parser.add_argument("--groups", type=int, default=100, help="report cells (category x metric)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    np = _numpy()
+    print(f"{'NumPy' if np else 'pure Python'}: {args.bench:,} samples, {args.groups} groups, {args.resamples:,} resamples")
+    if np is not None:
+        generator = np.random.default_rng(0)
+        a = (generator.random(args.bench) < 0.7).astype(np.float64)
+        b = np.where(generator.random(args.bench) < 0.9, a, 1 - a)
+    else:
+        a = [float(rng.random() < 0.7) for _ in range(args.bench)]
+        b = [x if rng.random() < 0.9 else 1 - x for x in a]
+    size = args.bench // args.groups
+    groups = {g: a[g * size:(g + 1) * size] for g in range(args.groups)}
+    groups["ALL"] = a
+    start = time.perf_counter()
+    intervals = bootstrap_means(groups, args.resamples)
+    middle = time.perf_counter()
+    delta = bootstrap_means({"ALL": b - a if np is not None else [y - x for x, y in zip(a, b)]}, args.resamples,
+                            rates=False)
+    end = time.perf_counter()
+    print(f"  accuracy CIs ({len(intervals)} groups): {middle - start:.3f}s   ALL {format_ci(intervals['ALL'])}")
+    print(f"  paired delta CI: {end - middle:.3f}s   {format_ci(delta['ALL'], signed=True)}")
+
+
+if __name__ == "__main__":
+    main()
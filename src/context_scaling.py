@@ -0,0 +1,273 @@
+"""
+Context-Length Scaling:How accuracy, refusals, latency and cost change as the grounding context grows.
+
+Each hallucination sample's context (the key fact) is embedded in padding of a controlled size:
+1)padding: "filler" (irrelevant generated sentences) or "distractor" (other samples' contexts
+  with entities and numbers rewritten by perturb.py, i.e. same-shaped facts about other
+  entities); sizes are in cl100k tokens (the ~4 characters/token estimate without tiktoken)
+2)depth: the key fact is placed at that fraction of the padding (0 = first, 1 = last)
+3)cells: lengths x depths; padding is seeded by (sample, length, depth, mode), so a cell is
+  the same text on every run
+4)reuse: samples are fingerprinted as in incremental_eval.py, so only samples of cells not
+  already in the results store are sent; the report merges cached and fresh results
+5)skip: cells longer than a model's context window (token_budget.CONTEXT_WINDOWS) are skipped
+
+The report gives accuracy, refusal rate, p50 / p95 latency, mean input tokens and estimated
+cost per length x depth cell. Inspect does not stream responses, so time to first token is not
+recorded; latency is the sample's total time.
+
+Run: python context_scaling.py --model openai/gpt-4o-mini [--lengths 1000,4000,16000,64000,100000] [--depths 0,0.5,1]
+     python context_scaling.py --model openai/gpt-4o-mini --padding distractor --category FULL_CONTEXT --dry-run
+     inspect eval hallucination_eval.py@long_context_eval -T length=16000 -T depth=0.5 --model ...
+"""
+import argparse
+import random
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from text_features import is_refusal, split_input, text_features
+from token_budget import OUTPUT_RESERVE, context_window, tokenizer_for
+
+LENGTHS = [1000, 4000, 16000, 64000, 100000]
+DEPTHS = [0.0, 0.5, 1.0]
+PADDINGS = ["filler", "distractor"]
+TOKENIZER_MODEL = "gpt-4"  # padding sizes are measured in its tokens (cl100k) for every model
+POOL_SIZE = 4000  # padding sentences generated (and tokenized) once per process
+PRICES = [  # (model-name fragment, $ per 1M input tokens, $ per 1M output tokens), most specific first
+    ("gpt-4o-mini", 0.15, 0.60),
+    ("gpt-4o", 2.50, 10.00),
+    ("gpt-4-turbo", 10.00, 30.00),
+    ("gpt-4", 30.00, 60.00),
+    ("gpt-3.5-turbo", 0.50, 1.50),
+    ("claude-3-haiku", 0.25, 1.25),
+    ("claude-3-5-sonnet", 3.00, 15.00),
+    ("claude-3-sonnet", 3.00, 15.00),
+    ("claude-3-opus", 15.00, 75.00),
+]
+
+FILLER_SUBJECTS = ["The garden", "A river", "The old bridge", "The museum", "A mountain trail", "The library",
+                   "The market square", "A lighthouse", "The orchard", "The train station", "A quiet lake",
+                   "The observatory", "The harbor", "A bakery", "The city park"]
+FILLER_VERBS = ["was repainted", "attracts visitors", "is known for its", "was described as having",
+                "is surrounded by", "was photographed with", "is often compared to", "was restored with"]
+FILLER_OBJECTS = ["tall hedges", "morning fog", "stone arches", "wild flowers", "narrow paths", "wooden benches",
+                  "painted murals", "old maps", "quiet corners", "seasonal festivals", "migrating birds",
+                  "copper roofs", "winding stairs", "local music", "bright lanterns"]
+FILLER_TAILS = ["in the spring.", "during the evenings.", "according to local guides.", "for many years.",
+                "on most weekends.", "after the heavy rains.", "in travel brochures.", "since the last renovation."]
+
+# PADDING POOLS
+@lru_cache(maxsize=None)
+def padding_pool(mode: str) -> tuple:
+    """
+    (sentences, token counts, source context of each sentence) shared by every cell of a mode.
+    Counts are scaled so that they add up to the token count of the sentences joined by spaces.
+    """
+    rng = random.Random(f"padding:{mode}")
+    if mode == "filler":
+        sentences = [f"{rng.choice(FILLER_SUBJECTS)} {rng.choice(FILLER_VERBS)} {rng.choice(FILLER_OBJECTS)} "
+                     f"{rng.choice(FILLER_TAILS)}" for _ in range(POOL_SIZE)]
+        origins = [""] * len(sentences)
+    elif mode == "distractor":
+        from eval_common import load_rows
+        from perturb import base_variant
+
+        seeds = [split_input(row["input"]) for row in load_rows()
+                 if row["eval_type"] == "hallucination" and row["input"].startswith("Context:")]
+        sentences, origins = [], []
+        for i in range(POOL_SIZE):
+            context, question = seeds[i % len(seeds)]
+            sentences.append(base_variant(context, question, "", rng)[0])
+            origins.append(context)
+    else:
+        raise ValueError(f"Unknown padding '{mode}' ({', '.join(PADDINGS)})")
+    tokenizer = tokenizer_for(TOKENIZER_MODEL)
+    counts = tokenizer.count_batch(sentences)
+    scale = tokenizer.count_batch([" ".join(sentences)])[0] / sum(counts)
+    return tuple(sentences), tuple(n * scale for n in counts), tuple(origins)
+
+
+def pad_context(fact: str, question: str, length: int, depth: float, mode: str, key: str) -> str:
+    """fact embedded at depth in about length tokens of padding, drawn deterministically for key"""
+    sentences, counts, origins = padding_pool(mode)
+    avoid = text_features(question)["entities"]
+    # never pad with a variant of the sample's own context or with facts about the entity asked about
+    allowed = [i for i in range(len(sentences))
+               if origins[i] != fact and not avoid & text_features(sentences[i])["entities"]]
+    rng = random.Random(f"{key}:{length}:{depth}:{mode}")
+    budget = length - tokenizer_for(TOKENIZER_MODEL).count_batch([f"{fact} {question}"])[0]
+    chosen, total = [], 0
+    while total < budget:
+        i = rng.choice(allowed)
+        chosen.append(sentences[i])
+        total += counts[i]
+    position = round(depth * len(chosen))
+    return " ".join(chosen[:position] + [fact] + chosen[position:])
+
+
+def padded_samples(samples: List[Any], length: int, depth: float, mode: str = "filler") -> List[Any]:
+    """Samples with their context padded to length tokens, the original context at depth"""
+    built = []
+    for sample in samples:
+        context, question = split_input(sample.input if isinstance(sample.input, str) else str(sample.input))
+        padded = pad_context(context, question, length, depth, mode, f"{sample.metadata.get('eval_type')}:{sample.id}")
+        built.append(sample.model_copy(update={
+            "input": f"Context: {padded} Question: {question}",
+            "metadata": {**(sample.metadata or {}), "context_tokens": length, "fact_depth": depth, "padding": mode}
+        }))
+    return built
+
+# SWEEP
+def price(model: str) -> Optional[tuple]:
+    name = model.lower()
+    return next(((i, o) for fragment, i, o in PRICES if fragment in name), None)
+
+
+def scaling_config(model: str, scorers: List[Any]) -> Dict:
+    """Fingerprint config of long_context_eval (mirrors incremental_eval.log_config)"""
+    from inspect_ai._util.registry import registry_params, registry_unqualified_name
+    from hallucination_eval import STRICT_GROUNDING_PROMPT
+
+    return {"system_prompt": STRICT_GROUNDING_PROMPT, "tools": [], "model": model,
+            "scorers": [{"name": registry_unqualified_name(s), "options": registry_params(s)} for s in scorers]}
+
+
+def plan_sweep(models: List[str], lengths: List[int], depths: List[float], mode: str,
+               category: Optional[str], store: Any) -> List[Dict]:
+    """For every length x depth x model: fingerprints of the padded samples, split cached vs missing"""
+    from hallucination_eval import grounding_scorer, load_samples_by_category
+    from incremental_eval import sample_fingerprint
+
+    scorers = grounding_scorer(category)
+    scorers = scorers if isinstance(scorers, list) else [scorers]
+    base = list(load_samples_by_category(category))
+    plan = []
+    for length in lengths:
+        for depth in depths:
+            samples = padded_samples(base, length, depth, mode)
+            for model in models:
+                entry = {"length": length, "depth": depth, "model": model, "samples": samples,
+                         "fingerprints": [], "missing": [], "skipped": length + OUTPUT_RESERVE > context_window(model)}
+                if not entry["skipped"]:
+                    config = scaling_config(model, scorers)
+                    for sample in samples:
+                        fingerprint = sample_fingerprint(sample.input, sample.target, sample.metadata, config)
+                        entry["fingerprints"].append(fingerprint)
+                        if fingerprint not in store:
+                            entry["missing"].append(sample)
+                plan.append(entry)
+    return plan
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def model_usage(record: Dict, model: str) -> Dict:
+    """
+    Token usage of the evaluated model alone. model_usage also holds the model_graded_fact judge
+    calls, which re-send the padded context, so the sample's own generation usage is preferred;
+    records stored before it was kept fall back to the evaluated model's model_usage entry.
+    """
+    return record.get("output_usage") or (record.get("model_usage") or {}).get(model) or {}
+
+
+def cell_stats(records: List[Dict], model: str) -> Dict:
+    """accuracy, refusal rate, latency and token / cost figures of one cell's records"""
+    correct = refused = 0
+    latencies, input_tokens, output_tokens = [], [], []
+    for record in records:
+        score = next(iter(record["scores"].values()), {})
+        correct += score.get("value") in ("C", "CORRECT")
+        refused += is_refusal(score.get("answer") or "")
+        if record.get("total_time") is not None:
+            latencies.append(record["total_time"])
+        usage = model_usage(record, model)
+        input_tokens.append(usage.get("input_tokens") or 0)
+        output_tokens.append(usage.get("output_tokens") or 0)
+    n = len(records)
+    rates = price(model)
+    cost = None
+    if rates and n:
+        cost = (sum(input_tokens) * rates[0] + sum(output_tokens) * rates[1]) / 1e6 / n
+    return {"n": n, "accuracy": correct / n if n else 0.0, "refusal": refused / n if n else 0.0,
+            "p50": _percentile(latencies, 0.5), "p95": _percentile(latencies, 0.95),
+            "input_tokens": sum(input_tokens) / n if n else 0.0, "cost": cost}
+
+
+def sweep_report(plan: List[Dict], store: Any, mode: str) -> str:
+    lines = []
+    lines.append("=" * 104)
+    lines.append(f"CONTEXT-LENGTH SCALING ({mode} padding)")
+    lines.append("=" * 104)
+    lines.append(f"{'Model':<28} {'tokens':>7} {'depth':>6} {'N':>4} {'acc':>6} {'refuse':>7} "
+                 f"{'p50 s':>7} {'p95 s':>7} {'in tok':>8} {'$/sample':>9}")
+    lines.append("-" * 104)
+    for entry in plan:
+        prefix = f"{entry['model'][:28]:<28} {entry['length']:>7} {entry['depth']:>6.2f}"
+        if entry["skipped"]:
+            lines.append(f"{prefix}  skipped: over the {context_window(entry['model'])}-token context window")
+            continue
+        stats = cell_stats(store.records(entry["fingerprints"]), entry["model"])
+        cost = f"{stats['cost']:.5f}" if stats["cost"] is not None else "n/a"
+        lines.append(f"{prefix} {stats['n']:>4} {stats['accuracy']:>6.1%} {stats['refusal']:>7.1%} "
+                     f"{stats['p50']:>7.2f} {stats['p95']:>7.2f} {stats['input_tokens']:>8,.0f} {cost:>9}")
+    lines.append("=" * 104)
+    return "\n".join(lines)
+
+
+def run_sweep(models: List[str], lengths: List[int] = LENGTHS, depths: List[float] = DEPTHS, mode: str = "filler",
+              category: Optional[str] = None, log_dir: str = "logs", dry_run: bool = False, **eval_kwargs) -> List[Dict]:
+    """Evaluate the cells not yet in the results store (one interleaved eval call), then print the report"""
+    from incremental_eval import STORE_NAME, ResultsStore
+
+    store = ResultsStore(Path(log_dir) / STORE_NAME)
+    scanned = store.refresh(log_dir)
+    plan = plan_sweep(models, lengths, depths, mode, category, store)
+    pending = [entry for entry in plan if entry["missing"]]
+    total = sum(len(entry["fingerprints"]) for entry in plan)
+    todo = sum(len(entry["missing"]) for entry in pending)
+    print(f"Results store: {len(store.samples)} fingerprints ({scanned} logs scanned)")
+    print(f"Samples to evaluate: {todo} of {total} ({total - todo} reused, "
+          f"{sum(entry['skipped'] for entry in plan)} cells over a context window)")
+
+    if pending and not dry_run:
+        from inspect_ai import eval as inspect_eval
+        from inspect_ai.dataset import MemoryDataset
+        from eval_common import build_task
+        from hallucination_eval import STRICT_GROUNDING_PROMPT, grounding_scorer
+
+        tasks = [build_task(f"long_context_eval-{entry['length']}-d{entry['depth']:g}",
+                            dataset=MemoryDataset(entry["missing"]), prompt=STRICT_GROUNDING_PROMPT,
+                            scorer=grounding_scorer(category), model=entry["model"],
+                            metadata={"scaling_cell": {"length": entry["length"], "depth": entry["depth"],
+                                                       "padding": mode}})
+                 for entry in pending]
+        inspect_eval(tasks, log_dir=log_dir, log_format="json", max_tasks=len(tasks), **eval_kwargs)
+        store.refresh(log_dir)
+
+    print(sweep_report(plan, store, mode))
+    return plan
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="Context-length x fact-depth scaling sweep over the hallucination samples")
+    parser.add_argument("--model", action="append", default=[], help="model to evaluate (repeatable)")
+    parser.add_argument("--lengths", default=",".join(str(n) for n in LENGTHS), help="context sizes in tokens")
+    parser.add_argument("--depths", default=",".join(f"{d:g}" for d in DEPTHS), help="fact positions, 0 (start) - 1 (end)")
+    parser.add_argument("--padding", choices=PADDINGS, default="filler")
+    parser.add_argument("--category", default=None, help="only this hallucination category")
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--dry-run", action="store_true", help="only report cached cells and what would be sent")
+    args = parser.parse_args()
+
+    if not args.model:
+        parser.error("at least one --model is required")
+    run_sweep(args.model, [int(n) for n in args.lengths.split(",")], [float(d) for d in args.depths.split(",")],
+              args.padding, args.category, args.log_dir, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
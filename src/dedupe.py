@@ -0,0 +1,264 @@
+"""
+Near-Duplicate Detection:MinHash + LSH dedupe and cross-split leakage report for the sample corpus.
+
+Near-duplicate contexts inflate cost and skew per-category accuracy, and the same context in
+two eval_types (hallucination vs taxonomy, ...) is leakage between splits. One streaming pass:
+1)shingle: character 5-grams of the normalized context (whole input if it has no context)
+2)signature: one-permutation MinHash with densification, NUM_PERM bins; each shingle is hashed
+  once (crc32), so a row costs O(its length), not O(length x permutations)
+3)LSH: the signature is cut into bands sized for the Jaccard threshold; a row is only compared
+  with cluster representatives that share a band bucket, so the pass is sub-quadratic
+4)cluster: a row whose estimated Jaccard with a representative reaches the threshold joins its
+  cluster; otherwise it becomes a new representative (only those signatures are kept)
+
+Outputs: a deduped CSV (the first row of each cluster per eval_type, streamed as rows arrive)
+and a report of duplicates per eval_type / category and of clusters spanning several eval_types.
+
+Run: python dedupe.py [--data ../data/all_samples.csv] [--threshold 0.8] [--out ../data/all_samples.dedup.csv]
+     python dedupe.py --bench 100000
+"""
+import argparse
+import csv
+import hashlib
+import random
+import re
+import time
+import zlib
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional
+
+from eval_common import DATA_PATH
+from text_features import split_input
+
+NUM_PERM = 128
+SHINGLE = 5
+THRESHOLD = 0.8
+MAX_BUCKET = 64  # representatives compared per bucket (bounds the work on pathological corpora)
+MAX_EXAMPLES = 10  # leaking clusters shown in the report
+SPACE_RE = re.compile(r"\s+")
+EMPTY = 0xFFFFFFFF
+
+# SIGNATURES
+def normalize(text: str) -> str:
+    return SPACE_RE.sub(" ", text.lower()).strip()
+
+
+def shingles(text: str, k: int = SHINGLE) -> Iterator[str]:
+    if len(text) <= k:
+        yield text
+        return
+    for i in range(len(text) - k + 1):
+        yield text[i:i + k]
+
+
+def signature(text: str, num_perm: int = NUM_PERM) -> array:
+    """
+    One-permutation MinHash: a shingle's hash picks its bin and competes for that bin's
+    minimum; empty bins copy the next non-empty bin to their right (rotation densification).
+    """
+    bins = array("I", [EMPTY]) * num_perm
+    for shingle in shingles(text):
+        h = zlib.crc32(shingle.encode("utf-8"))
+        b = h % num_perm
+        value = h // num_perm
+        if value < bins[b]:
+            bins[b] = value
+    if EMPTY in bins and any(v != EMPTY for v in bins):
+        original = bins.tolist()
+        for i in range(num_perm):
+            if original[i] == EMPTY:
+                d = 1
+                while original[(i + d) % num_perm] == EMPTY:
+                    d += 1
+                bins[i] = (original[(i + d) % num_perm] + d * 0x9E3779B1) & 0x7FFFFFFF  # offset by distance
+    return bins
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM) -> tuple:
+    """(bands, rows) with bands x rows = num_perm whose S-curve midpoint (1/b)^(1/r) is closest to threshold from below"""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        midpoint = (1 / bands) ** (1 / rows)
+        score = abs(threshold - midpoint) + (0.05 if midpoint > threshold else 0.0)  # favour recall
+        if best is None or score < best[0]:
+            best = (score, bands, rows)
+    return best[1], best[2]
+
+# CLUSTERING
+def dedup_text(row: Dict, field: str = "context") -> str:
+    """The text compared for a row: its context (or the whole input) or the raw input"""
+    if field == "context":
+        context, _ = split_input(row["input"])
+        return normalize(context or row["input"])
+    return normalize(row[field])
+
+
+def text_digest(text: str) -> bytes:
+    """128-bit key for exact-duplicate lookups; 32-bit hashes collide at a million rows"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class NearDuplicateIndex:
+    """Streaming LSH index over cluster representatives."""
+
+    def __init__(self, threshold: float = THRESHOLD, num_perm: int = NUM_PERM):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(self.bands)]
+        self.representatives: Dict[int, array] = {}
+        self.exact: Dict[bytes, int] = {}  # 128-bit hash of the normalized text -> cluster (crc32 collides)
+        self.comparisons = 0
+
+    def add(self, index: int, text: str) -> tuple:
+        """(cluster id, similarity to its representative) for row index; new clusters are keyed by their first row"""
+        digest = text_digest(text)
+        if digest in self.exact:
+            return self.exact[digest], 1.0
+        sig = signature(text, self.num_perm)
+        keys = [sig[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+        seen = set()
+        for b, key in enumerate(keys):
+            for rep in self.buckets[b].get(key, ()):
+                if rep in seen:
+                    continue
+                seen.add(rep)
+                self.comparisons += 1
+                score = similarity(sig, self.representatives[rep])
+                if score >= self.threshold:
+                    self.exact[digest] = rep
+                    return rep, score
+        self.representatives[index] = sig
+        self.exact[digest] = index
+        for b, key in enumerate(keys):
+            bucket = self.buckets[b][key]
+            if len(bucket) < MAX_BUCKET:
+                bucket.append(index)
+        return index, 1.0
+
+
+def dedupe(rows: Iterator[Dict], threshold: float = THRESHOLD, field: str = "context",
+           writer: Optional[Any] = None) -> Dict:
+    """
+    Cluster a stream of rows; rows kept (first of their cluster within their eval_type) are
+    passed to writer.writerow as they arrive. Returns the counts needed by report().
+    """
+    index = NearDuplicateIndex(threshold)
+    cluster_types: Dict[int, Dict[str, int]] = defaultdict(dict)  # cluster -> eval_type -> CSV line of its first row
+    dropped = defaultdict(lambda: defaultdict(int))  # eval_type -> category -> duplicate rows
+    examples: Dict[int, List[tuple]] = {}  # first leaking clusters -> (line, eval_type, similarity, text)
+    total = kept = 0
+    for i, row in enumerate(rows):
+        total += 1
+        line = i + 2  # CSV header is line 1
+        cluster, score = index.add(i, dedup_text(row, field))
+        eval_type = row.get("eval_type", "")
+        types = cluster_types[cluster]
+        if eval_type in types:
+            dropped[eval_type][row.get("category", "")] += 1
+            continue
+        if types and (cluster in examples or len(examples) < MAX_EXAMPLES):
+            examples.setdefault(cluster, []).append((line, eval_type, score, row["input"][:70]))
+        types[eval_type] = line
+        kept += 1
+        if writer is not None:
+            writer.writerow(row)
+    leaks = {c: types for c, types in cluster_types.items() if len(types) > 1}
+    return {"total": total, "kept": kept, "clusters": len(index.representatives), "dropped": dropped,
+            "leaks": leaks, "examples": examples, "threshold": threshold,
+            "bands": index.bands, "rows": index.rows, "comparisons": index.comparisons}
+
+
+def report(result: Dict, seconds: Optional[float] = None) -> str:
+    lines = []
+    lines.append("=" * 100)
+    lines.append(f"NEAR-DUPLICATE REPORT (Jaccard >= {result['threshold']}, {NUM_PERM} bins, "
+                 f"LSH {result['bands']} bands x {result['rows']} rows)")
+    lines.append("=" * 100)
+    timing = f" in {seconds:.2f}s" if seconds is not None else ""
+    lines.append(f"Rows: {result['total']}  clusters: {result['clusters']}  kept: {result['kept']}  "
+                 f"candidate comparisons: {result['comparisons']}{timing}")
+    lines.append("")
+    lines.append("Duplicates removed within an eval_type:")
+    if not result["dropped"]:
+        lines.append("  none")
+    for eval_type, categories in sorted(result["dropped"].items()):
+        detail = ", ".join(f"{c or '-'} {n}" for c, n in sorted(categories.items()))
+        lines.append(f"  {eval_type:<20} {sum(categories.values()):>6}  ({detail})")
+    lines.append("")
+    lines.append(f"Cross-split leakage: {len(result['leaks'])} clusters span several eval_types")
+    pairs = defaultdict(int)
+    for types in result["leaks"].values():
+        names = sorted(types)
+        for a in range(len(names)):
+            for b in range(a + 1, len(names)):
+                pairs[(names[a], names[b])] += 1
+    for (a, b), n in sorted(pairs.items(), key=lambda item: -item[1]):
+        lines.append(f"  {a} <-> {b}: {n}")
+    for cluster, leaked in result["examples"].items():
+        first = ", ".join(f"{t} line {n}" for t, n in result["leaks"][cluster].items()
+                          if n not in {line for line, _, _, _ in leaked})
+        lines.append(f"  first seen: {first}")
+        for line, eval_type, score, text in leaked:
+            lines.append(f"    line {line:>7} {eval_type:<16} sim {score:.2f}  {text}")
+    lines.append("=" * 100)
+    return "\n".join(lines)
+
+# BENCHMARK
+def synthetic_rows(n: int, seed: int = 0) -> Iterator[Dict]:
+    """n rows over the real corpus vocabulary, ~10% near-duplicates (a word edited), some cross-split"""
+    rng = random.Random(seed)
+    with open(DATA_PATH, "r", encoding="utf-8") as f:
+        words = sorted({w for row in csv.DictReader(f) for w in row["input"].split()})
+    eval_types = ["hallucination", "taxonomy", "behavioral", "prompt_variation"]
+    recent: List[List[str]] = []
+    for i in range(n):
+        if recent and rng.random() < 0.1:
+            context = list(rng.choice(recent))
+            context[rng.randrange(len(context))] = rng.choice(words)
+        else:
+            context = [rng.choice(words) for _ in range(rng.randint(30, 60))]
+            recent = (recent + [context])[-1000:]
+        yield {"eval_type": rng.choice(eval_types), "category": "", "expected_behavior": "",
+               "input": f"Context: {' '.join(context)} Question: what is stated?", "target": "", "extra_metadata": "{}"}
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="MinHash/LSH near-duplicate and leakage detection")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Jaccard similarity of near-duplicates")
+    parser.add_argument("--field", choices=["context", "input"], default="context", help="text compared per row")
+    parser.add_argument("--out", default=None, help="write the deduped CSV here")
+    parser.add_argument("--bench", type=int, metavar="N", default=None, help="time N synthetic rows")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.bench:
+        result = dedupe(synthetic_rows(args.bench), args.threshold, args.field)
+        print(report(result, time.perf_counter() - start))
+        return
+    with open(args.data, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8", newline="") as out:
+                writer = csv.DictWriter(out, fieldnames=reader.fieldnames)
+                writer.writeheader()
+                result = dedupe(reader, args.threshold, args.field, writer)
+            print(f"Deduped dataset written to {Path(args.out)}")
+        else:
+            result = dedupe(reader, args.threshold, args.field)
+    print(report(result, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
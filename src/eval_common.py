@@ -0,0 +1,183 @@
+"""
+Shared Eval Building Blocks:Dataset loading and task construction reused by every eval module.
+
+Provides:
+1)load_rows: reads all_samples.csv ONCE per process and caches the rows
+2)load_samples: builds Sample objects for one eval_type, optionally filtered by category / requires_tool
+  and checked against a pre-flight token budget (token_budget.py)
+3)build_task: assembles a Task from a system prompt, optional tools (executed concurrently per turn) and scorers
+4)task / tool: lazy stand-ins for inspect_ai's decorators
+5)load_env: loads .env on first use instead of at import time
+6)profiling hooks: with GROUNDEDEVALS_PROFILE set, loading and every solver / scorer stage is timed (profiling.py)
+7)output budgets: optional per-category max_tokens and refusal early stop for generate() (output_budget.py)
+
+Every hand-written @task in the eval modules and every cell of task_matrix.py goes through
+these helpers, so a full grid shares a single parsed copy of the dataset.
+
+Importing an eval module must stay cheap (schedulers import them just to enumerate tasks),
+so nothing here imports inspect_ai, dotenv or a provider SDK at module level.
+"""
+import csv
+import json
+import sys
+from functools import lru_cache, wraps
+
+from profiling import profile_scorer, profile_solver, stage
+
+DATA_PATH = "../data/all_samples.csv"
+
+# module -> task function names, filled in by @task at import time
+TASK_REGISTRY = {}
+
+# ENVIRONMENT
+@lru_cache(maxsize=None)
+def load_env():
+    """Load API keys from .env once, the first time a task or runner actually needs them"""
+    from dotenv import load_dotenv
+    load_dotenv() # refer .env file example to know what all is needed
+    return True
+
+# LAZY DECORATORS
+def task(fn):
+    """
+    Drop-in for inspect_ai's @task.
+
+    When inspect_ai is already loaded (inspect eval / inspect list importing the file) the real
+    decorator is applied so registry lookup works as before. Otherwise the function is left
+    undecorated and only recorded in TASK_REGISTRY; calling it still returns a named Task.
+    """
+    TASK_REGISTRY.setdefault(fn.__module__, []).append(fn.__name__)
+    if "inspect_ai" in sys.modules:
+        from inspect_ai import task as inspect_task
+        from hedging import register
+        register()  # so `--model hedged/<model>` resolves under the inspect CLI
+        return inspect_task(fn)
+    return fn
+
+
+_TOOL_CACHE = {}
+
+
+def tool(factory):
+    """Drop-in for inspect_ai's @tool that registers the tool on first construction"""
+    if "inspect_ai" in sys.modules:
+        from inspect_ai.tool import tool as inspect_tool
+        return inspect_tool(factory)
+
+    @wraps(factory)
+    def lazy_factory(*args, **kwargs):
+        if factory not in _TOOL_CACHE:
+            from inspect_ai.tool import tool as inspect_tool
+            _TOOL_CACHE[factory] = inspect_tool(factory)
+        return _TOOL_CACHE[factory](*args, **kwargs)
+
+    return lazy_factory
+
+
+def registered_tasks(module_name=None):
+    """Task names recorded by @task, for one module or all imported eval modules"""
+    if module_name is not None:
+        return list(TASK_REGISTRY.get(module_name, []))
+    return {module: list(names) for module, names in TASK_REGISTRY.items()}
+
+# extra_metadata keys copied onto Sample.metadata per eval_type
+EXTRA_METADATA_FIELDS = {
+    "taxonomy": ["behavior_type", "potential_failure"],
+    "behavioral": ["behavior_type"],
+    "tool_agent": ["requires_tool", "difficulty"],
+}
+
+# DATA LOADER
+@lru_cache(maxsize=None)
+def load_rows(path=DATA_PATH):
+    """Read all_samples.csv once; later calls return the cached rows"""
+    with stage("dataset_load"), open(path, "r", encoding="utf-8") as f:
+        return tuple(csv.DictReader(f))
+
+
+@lru_cache(maxsize=None)
+def _samples_for_eval_type(eval_type, path=DATA_PATH):
+    """Build Sample objects for one eval_type (ids are 1-based row positions within the eval_type)"""
+    from inspect_ai.dataset import Sample
+
+    rows = load_rows(path)
+    with stage("sample_construction"):
+        samples = []
+        for row in rows:
+            if row["eval_type"] != eval_type:
+                continue
+            extra = json.loads(row.get("extra_metadata") or "{}")
+            metadata = {
+                "category": row["category"],
+                "expected_behavior": row["expected_behavior"],
+                "eval_type": row["eval_type"]
+            }
+            for field in EXTRA_METADATA_FIELDS.get(eval_type, []):
+                metadata[field] = extra.get(field, "")
+            if "perturbation" in extra:  # synthetic variant (perturb.py)
+                metadata["perturbation"] = extra["perturbation"]
+                metadata["seed_line"] = extra.get("seed_line")
+            samples.append(Sample(
+                id=len(samples) + 1,
+                input=row["input"],
+                target=row["target"],
+                metadata=metadata
+            ))
+    return tuple(samples)
+
+
+def load_samples(eval_type, category=None, requires_tool=None, path=DATA_PATH, budget=None, prompt="", name=""):
+    """
+    Load samples for eval_type, optionally filtered by category and/or requires_tool substring.
+
+    budget (token_budget.TokenBudget) runs the pre-flight token check: samples that cannot
+    fit the run's models next to prompt are trimmed or dropped before any call is made.
+    """
+    from inspect_ai.dataset import MemoryDataset
+
+    samples = [
+        s for s in _samples_for_eval_type(eval_type, path)
+        if (category is None or s.metadata["category"] == category)
+        and (requires_tool is None or requires_tool in s.metadata.get("requires_tool", ""))
+    ]
+    if budget is not None:
+        samples = budget.apply(samples, prompt, name or eval_type)
+    return MemoryDataset(samples)
+
+# TASK BUILDER
+def build_task(name, dataset, prompt, scorer, tools=None, metadata=None, model=None, output_budget=None,
+               prompt_name=None):
+    """
+    Build a Task: system_message(prompt) + generate(), scored by scorer.
+
+    With tools: use_tools(tools) + parallel_tool_generate(), which runs the tool calls of one
+    assistant turn concurrently (tool_execution.py).
+    output_budget (True or an output_budget.OutputBudget) gives generate() a max_tokens per sample
+    category, scaled for prompt_name, and stops right after a refusal sentence; ignored with tools.
+    """
+    from inspect_ai import Task
+    from inspect_ai.solver import generate, system_message, use_tools
+    from tool_execution import parallel_tool_generate
+
+    load_env()
+    with stage("task_build"):
+        solver = [profile_solver("system_message", system_message(prompt))]
+        if tools:
+            solver.append(profile_solver("tool_schema", use_tools(tools)))
+            solver.append(parallel_tool_generate())  # times its own generate / tool stages
+        elif output_budget:
+            if output_budget is True:
+                from output_budget import OutputBudget
+                output_budget = OutputBudget()
+            solver.append(output_budget.solver(prompt, prompt_name))  # times its own generate stage
+        else:
+            solver.append(profile_solver("generate", generate()))
+        scorers = [profile_scorer(s) for s in (scorer if isinstance(scorer, list) else [scorer])]
+        return Task(
+            name=name,
+            dataset=dataset,
+            solver=solver,
+            scorer=scorers if isinstance(scorer, list) else scorers[0],
+            metadata=metadata or {},
+            model=model
+        )
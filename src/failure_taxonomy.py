@@ -11,16 +11,17 @@ Failure Types:
 7)VERBOSE_REFUSAL: Model refuses with excessive explanation
 8)TERSE_REFUSAL: Model refuses without explanation
 
+classify_failure() assigns these labels locally from entity / year / quarter extraction,
+refusal detection and length signals; only UNRESOLVED cases can be escalated to an LLM judge.
+
 Run:inspect eval failure_taxonomy.py@taxonomy_eval --model bedrock/anthropic.claude-3-sonnet-20240229-v1:0
 """
 
-from dotenv import load_dotenv
-load_dotenv() # Load your API keys from .env file (refer .env file example to know what all is needed)
+import sys
+from collections import Counter
 
-from inspect_ai import Task, task
-from inspect_ai.dataset import Sample, MemoryDataset
-from inspect_ai.solver import generate, system_message
-from inspect_ai.scorer import model_graded_fact, includes
+from eval_common import task, load_env, load_samples, build_task
+from text_features import split_input, text_features, is_refusal
 
 # SYSTEM PROMPT
 TAXONOMY_PROMPT = """You are a precise assistant. Answer ONLY using the provided context.
@@ -33,50 +34,198 @@ Rules:
 
 Be concise but clear."""
 
+# MATRIX AXES (expanded by task_matrix.py)
+EVAL_TYPE = "taxonomy"
+PROMPTS = {"taxonomy": TAXONOMY_PROMPT}
+CATEGORIES = []
+REFUSAL_PATTERNS = ["cannot answer", "not in the context", "does not contain",
+                    "not mentioned", "not specified", "no information"]
+
+
+def taxonomy_scorer(category=None):
+    """Judge + refusal pattern matching"""
+    from inspect_ai.scorer import model_graded_fact, includes
+
+    return [model_graded_fact(), includes(REFUSAL_PATTERNS)]
+
 # TASKS
 
 def load_taxonomy_samples():
     """Load taxonomy samples from csv"""
-    import csv
-    import json
-    samples = []
-    with open("../data/all_samples.csv", "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row["eval_type"] == "taxonomy":
-                extra = json.loads(row.get("extra_metadata", "{}"))
-                samples.append(Sample(
-                    input=row["input"],
-                    target=row["target"],
-                    metadata={
-                        "category": row["category"],
-                        "expected_behavior": row["expected_behavior"],
-                        "eval_type": row["eval_type"],
-                        "behavior_type": extra.get("behavior_type", ""),
-                        "potential_failure": extra.get("potential_failure", "")
-                    }
-                ))
-    return MemoryDataset(samples)
+    return load_samples(EVAL_TYPE)
 
 
 @task
 def taxonomy_eval():
     """Behavioral evaluation with failure taxonomy classification."""
-    return Task(
+    return build_task(
+        "taxonomy_eval",
         dataset=load_taxonomy_samples(),
-        solver=[
-            system_message(TAXONOMY_PROMPT),
-            generate()
-        ],
-        scorer=[
-            model_graded_fact(),
-            includes(["cannot answer", "not in the context", "does not contain",
-                     "not mentioned", "not specified", "no information"])
-        ]
+        prompt=TAXONOMY_PROMPT,
+        scorer=taxonomy_scorer()
+    )
+
+# FAILURE CLASSIFIER
+FAILURE_TYPES = [
+    "HALLUCINATION", "OVER_REFUSAL", "UNDER_REFUSAL", "PARTIAL_GROUNDING",
+    "ENTITY_CONFUSION", "TEMPORAL_CONFUSION", "VERBOSE_REFUSAL", "TERSE_REFUSAL"
+]
+UNRESOLVED = "UNRESOLVED"
+
+VERBOSE_REFUSAL_WORDS = 50  # same threshold as log_analysis "verbose" refusals
+TERSE_REFUSAL_WORDS = 6
+
+
+def classify_failure(input_text, answer, expected_behavior):
+    """
+    Label one failed answer with a failure type using only local lexical signals.
+
+    Order matters: refusal style first, then wrong entity / wrong period (the answer reuses a
+    context value although the question names an entity or period the context lacks), then
+    unsupported numbers, periods or entities (hallucination), then the expected behavior.
+    Returns (label, reason); label is UNRESOLVED when no signal fires.
+    """
+    answer = answer or ""
+    context, question = split_input(input_text or "")
+    ctx, q, ans = text_features(context), text_features(question), text_features(answer)
+    words = len(answer.split())
+
+    if is_refusal(answer):
+        if expected_behavior == "answer":
+            return "OVER_REFUSAL", "refused although the context contains the answer"
+        if words > VERBOSE_REFUSAL_WORDS:
+            return "VERBOSE_REFUSAL", f"refusal is {words} words"
+        if words <= TERSE_REFUSAL_WORDS:
+            return "TERSE_REFUSAL", f"refusal is {words} words with no explanation"
+        return UNRESOLVED, "appropriate-looking refusal judged incorrect"
+
+    reused_values = (ans["numbers"] & ctx["numbers"]) | (ans["periods"] & ctx["periods"] - q["periods"])
+    missing_periods = q["periods"] - ctx["periods"]
+    missing_entities = q["entities"] - ctx["entities"]
+    if missing_periods and reused_values:
+        return "TEMPORAL_CONFUSION", f"question asks about {sorted(missing_periods)}, answer reuses context values"
+    if missing_entities and reused_values:
+        return "ENTITY_CONFUSION", f"question asks about {sorted(missing_entities)}, answer reuses context values"
+
+    unsupported = (
+        (ans["numbers"] - ctx["numbers"] - q["numbers"])
+        | (ans["periods"] - ctx["periods"] - q["periods"])
+        | (ans["entities"] - ctx["entities"] - q["entities"])
     )
+    if unsupported:
+        return "HALLUCINATION", f"unsupported spans {sorted(unsupported)[:5]}"
+    if expected_behavior == "qualify":
+        return "PARTIAL_GROUNDING", "answered without acknowledging missing information"
+    if expected_behavior == "refuse":
+        return "UNDER_REFUSAL", "answered when it should refuse"
+    return UNRESOLVED, "no lexical signal"
+
+
+def _classify_record(record):
+    return classify_failure(record["input"], record["answer"], record.get("expected_behavior", ""))
+
+
+def classify_failures(records, processes=1, chunksize=4096):
+    """
+    Label many failed answers. records: dicts with input, answer, expected_behavior.
+
+    Contexts/questions hit the feature cache, so one process handles tens of thousands of
+    answers per second; processes > 1 fans large historical batches out over a process pool.
+    """
+    if processes <= 1:
+        return [_classify_record(r) for r in records]
+    from multiprocessing import Pool
+    with Pool(processes) as pool:
+        return pool.map(_classify_record, records, chunksize=chunksize)
+
+
+JUDGE_TEMPLATE = """A model answered a question that must be answered ONLY from the given context.
+
+{input}
+
+Expected behavior: {expected_behavior}
+Model answer: {answer}
+
+Classify the failure with exactly one label from: {labels}.
+Reply with the label only."""
+
+
+def escalate_unresolved(records, labels, judge_model):
+    """Re-label only UNRESOLVED entries with an LLM judge; all other labels are kept as-is."""
+    import asyncio
+    from inspect_ai.model import get_model
+
+    load_env()
+    pending = [i for i, (label, _) in enumerate(labels) if label == UNRESOLVED]
+    if not pending:
+        return labels
+    model = get_model(judge_model)
+
+    async def judge_all():
+        prompts = [JUDGE_TEMPLATE.format(labels=", ".join(FAILURE_TYPES), **records[i]) for i in pending]
+        return await asyncio.gather(*[model.generate(p) for p in prompts])
+
+    labels = list(labels)
+    for i, output in zip(pending, asyncio.run(judge_all())):
+        reply = output.completion.upper()
+        label = next((t for t in FAILURE_TYPES if t in reply), UNRESOLVED)
+        labels[i] = (label, f"llm judge ({judge_model})")
+    return labels
+
+
+def classify_log_dir(log_dir, processes=1, judge_model=None):
+    """Stream every log in log_dir and label its failed samples; returns (record, label, reason) rows"""
+    from log_analysis import list_logs, iter_log_documents, is_sample_document, primary_score
+
+    records = []
+    for log_path in list_logs(log_dir):
+        task, model = "unknown", "unknown"
+        for doc in iter_log_documents(log_path, events=False):
+            if isinstance(doc, dict) and "eval" in doc:
+                task, model = doc["eval"].get("task", task), doc["eval"].get("model", model)
+                samples = doc.get("samples") or []
+            elif is_sample_document(doc):
+                samples = [doc]
+            else:
+                continue
+            for sample in samples:
+                score = primary_score(sample)
+                if not score or score.get("value") in ("C", "CORRECT"):
+                    continue
+                records.append({
+                    "log": str(log_path), "task": task, "model": model,
+                    "id": sample.get("id"), "epoch": sample.get("epoch", 1),
+                    "input": sample.get("input", "") if isinstance(sample.get("input"), str) else "",
+                    "answer": score.get("answer") or "",
+                    "expected_behavior": sample.get("metadata", {}).get("expected_behavior", "")
+                })
+
+    labels = classify_failures(records, processes=processes)
+    if judge_model:
+        labels = escalate_unresolved(records, labels, judge_model)
+    return [(record, label, reason) for record, (label, reason) in zip(records, labels)]
 
 # MAIN
-if __name__ == "__main__":
+def print_classification(log_dir, processes=1, judge_model=None):
+    """Bulk-label every failed sample in log_dir and print counts per task/model"""
+    rows = classify_log_dir(log_dir, processes=processes, judge_model=judge_model)
+    counts = Counter((record["task"], record["model"], label) for record, label, _ in rows)
+    print(f"Labelled {len(rows)} failed samples from {log_dir}\n")
+    for (task_name, model, label), count in sorted(counts.items()):
+        print(f"  {task_name} | {model} | {label}: {count}")
+    for record, label, reason in rows:
+        print(f"\n[{label}] {record['task']} | {record['model']} | id={record['id']}")
+        print(f"  Input: {record['input'][:80]}...")
+        print(f"  Answer: {record['answer'][:80]}...")
+        print(f"  Why: {reason}")
+
+
+if __name__ == "__main__" and len(sys.argv) > 2 and sys.argv[1] == "--classify":
+    # python failure_taxonomy.py --classify LOG_DIR [PROCESSES] [JUDGE_MODEL]
+    print_classification(sys.argv[2],
+                         processes=int(sys.argv[3]) if len(sys.argv) > 3 else 1,
+                         judge_model=sys.argv[4] if len(sys.argv) > 4 else None)
+elif __name__ == "__main__":
     print("""
 Failure Taxonomy Evaluation
 Failure Types Detected:
@@ -95,5 +244,8 @@ Refusal Styles Analyzed:
 
 Run:inspect eval failure_taxonomy.py@taxonomy_eval --model bedrock/anthropic.claude-3-sonnet-20240229-v1:0
 
+Label failed samples in existing logs (local classifier, optional LLM judge for unresolved):
+  python failure_taxonomy.py --classify logs [PROCESSES] [JUDGE_MODEL]
+
 View: inspect view
 """)
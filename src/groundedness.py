@@ -0,0 +1,103 @@
+"""
+Lexical Groundedness Scorer:Checks whether an answer's factual spans appear in the sample's Context.
+
+For every sample the input is split into context and question, and the context is indexed once
+(memoized) into:
+1)word n-grams (n = 1..3) used to match multi-word entities
+2)normalized numbers ($4.5 billion == 4.5B)
+3)years and quarters
+
+Each number, date and named entity in the answer is a claim; a claim is supported when the index
+(optionally extended with the question) contains it. The per-sample result is the support ratio
+(supported / claims, 1.0 when there are no claims) plus the unsupported spans.
+
+No model call is made, so it runs at tens of thousands of samples per second and works both as a
+pre-filter over logged answers and as a free second scorer next to model_graded_fact.
+"""
+import re
+from functools import lru_cache
+
+from text_features import split_input, text_features, claim_spans
+
+MAX_NGRAM = 3
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.-][a-z0-9]+)*")
+
+# CONTEXT INDEX
+@lru_cache(maxsize=65536)
+def context_index(context: str) -> dict:
+    """n-gram / number / period index of one context (cached: contexts repeat across models and runs)"""
+    tokens = TOKEN_RE.findall(context.lower())
+    ngrams = set()
+    for n in range(1, MAX_NGRAM + 1):
+        ngrams.update(zip(*(tokens[i:] for i in range(n))))
+    features = text_features(context)
+    return {"ngrams": frozenset(ngrams), "numbers": features["numbers"], "periods": features["periods"]}
+
+
+def _entity_supported(entity: str, indexes: list) -> bool:
+    tokens = tuple(TOKEN_RE.findall(entity))
+    if not tokens:
+        return True
+    for index in indexes:
+        if len(tokens) <= MAX_NGRAM:
+            if tokens in index["ngrams"]:
+                return True
+        elif all((t,) in index["ngrams"] for t in tokens):
+            return True
+    return False
+
+
+def check_groundedness(input_text: str, answer: str, allow_question: bool = True) -> dict:
+    """Support ratio and unsupported spans of answer against the context of input_text"""
+    context, question = split_input(input_text or "")
+    indexes = [context_index(context)]
+    if allow_question:
+        indexes.append(context_index(question))
+
+    claims, unsupported = 0, []
+    for kind, surface, value in claim_spans(answer or ""):
+        claims += 1
+        if kind == "number":
+            supported = any(value in index["numbers"] for index in indexes)
+        elif kind == "date":
+            supported = any(value in index["periods"] for index in indexes)
+        else:
+            supported = _entity_supported(value, indexes)
+        if not supported:
+            unsupported.append({"kind": kind, "text": surface})
+
+    return {
+        "support_ratio": (claims - len(unsupported)) / claims if claims else 1.0,
+        "claims": claims,
+        "unsupported": unsupported
+    }
+
+
+def prefilter(records, threshold: float = 1.0):
+    """Split (input, answer) records into (grounded, suspect) by support ratio, e.g. before paying a judge"""
+    grounded, suspect = [], []
+    for record in records:
+        result = check_groundedness(record["input"], record["answer"])
+        (grounded if result["support_ratio"] >= threshold else suspect).append((record, result))
+    return grounded, suspect
+
+# INSPECT SCORER
+def groundedness(allow_question: bool = True):
+    """Inspect scorer: value = support ratio, metadata = claims + unsupported spans"""
+    from inspect_ai.scorer import Score, mean, stderr, scorer
+
+    @scorer(metrics=[mean(), stderr()], name="groundedness")
+    def groundedness_scorer():
+        async def score(state, target):
+            answer = state.output.completion
+            result = check_groundedness(state.input_text, answer, allow_question)
+            unsupported = ", ".join(span["text"] for span in result["unsupported"]) or "none"
+            return Score(
+                value=result["support_ratio"],
+                answer=answer,
+                explanation=f"{result['claims']} claims, unsupported: {unsupported}",
+                metadata=result
+            )
+        return score
+
+    return groundedness_scorer()
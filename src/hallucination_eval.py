@@ -9,13 +9,7 @@ Categories:
 
 Run: inspect eval hallucination_eval.py@hallucination_full_eval --model  bedrock/anthropic.claude-3-sonnet-20240229-v1:0
 """
-from dotenv import load_dotenv
-load_dotenv() # Load your API keys from .env file (refer .env file example to know what all is needed)
-
-from inspect_ai import Task, task
-from inspect_ai.dataset import Sample, MemoryDataset
-from inspect_ai.solver import generate, system_message
-from inspect_ai.scorer import model_graded_fact, includes
+from eval_common import task, load_samples, build_task
 
 # SYSTEM PROMPT
 
@@ -30,94 +24,113 @@ RULES:
 
 Be concise in your response."""
 
+# MATRIX AXES (expanded by task_matrix.py)
+EVAL_TYPE = "hallucination"
+PROMPTS = {"strict_grounding": STRICT_GROUNDING_PROMPT}
+CATEGORIES = ["FULL_CONTEXT", "PARTIAL_CONTEXT", "NO_CONTEXT", "MISLEADING_CONTEXT"]
+REFUSAL_PATTERNS = ["cannot answer", "not in the context", "does not contain",
+                    "not mentioned", "not specified", "no information"]
+
+
+def grounding_scorer(category=None):
+    """Category tasks use the judge only; the full run adds refusal pattern matching"""
+    from inspect_ai.scorer import model_graded_fact, includes
+
+    if category is not None:
+        return model_graded_fact()
+    return [model_graded_fact(), includes(REFUSAL_PATTERNS)]
+
 #DATA LOADER
 def load_samples_by_category(category=None):
     """Load hallucination samples from all_samples.csv, optionally filtered by category"""
-    import csv
-    samples = []
-    with open("../data/all_samples.csv", "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row["eval_type"] == "hallucination":
-                if category is None or row["category"] == category:
-                    samples.append(Sample(
-                        input=row["input"],
-                        target=row["target"],
-                        metadata={
-                            "category": row["category"],
-                            "expected_behavior": row["expected_behavior"],
-                            "eval_type": row["eval_type"]
-                        }
-                    ))
-    return MemoryDataset(samples)
+    return load_samples(EVAL_TYPE, category=category)
+
+
+def grounding_task(name, category=None, prompt=STRICT_GROUNDING_PROMPT, output_budget=False):
+    """One hallucination task: strict grounding prompt over one category (or all), optionally output-budgeted"""
+    return build_task(
+        name,
+        dataset=load_samples_by_category(category),
+        prompt=prompt,
+        scorer=grounding_scorer(category),
+        output_budget=output_budget,
+        prompt_name="strict_grounding"
+    )
 
 # TASKS
 @task
-def full_context_eval():
+def full_context_eval(output_budget=False):
     """checks if model answers correctly when context has everything"""
-    return Task(
-        dataset=load_samples_by_category("FULL_CONTEXT"),
-        solver=[
-            system_message(STRICT_GROUNDING_PROMPT),
-            generate()
-        ],
-        scorer=model_graded_fact()
-    )
+    return grounding_task("full_context_eval", "FULL_CONTEXT", output_budget=output_budget)
 
 
 @task
-def partial_context_eval():
+def partial_context_eval(output_budget=False):
     """partial context - model should say info is missing"""
-    return Task(
-       dataset=load_samples_by_category("PARTIAL_CONTEXT"),
-        solver=[
-            system_message(STRICT_GROUNDING_PROMPT),
-            generate()
-        ],
-        scorer=model_graded_fact()
-    )
+    return grounding_task("partial_context_eval", "PARTIAL_CONTEXT", output_budget=output_budget)
 
 
 @task
-def no_context_eval():
+def no_context_eval(output_budget=False):
     """no relevant context given, should refuse to answer"""
-    return Task(
-        dataset=load_samples_by_category("NO_CONTEXT"),
-        solver=[
-            system_message(STRICT_GROUNDING_PROMPT),
-            generate()
-        ],
-        scorer=model_graded_fact()
-    )
+    return grounding_task("no_context_eval", "NO_CONTEXT", output_budget=output_budget)
 
 
 @task
-def misleading_context_eval():
+def misleading_context_eval(output_budget=False):
     """misleading context test - makes sure model doesn't use wrong entity's data"""
-    return Task(
-        dataset=load_samples_by_category("MISLEADING_CONTEXT"),
-        solver=[
-            system_message(STRICT_GROUNDING_PROMPT),
-            generate()
-        ],
-        scorer=model_graded_fact()
-    )
+    return grounding_task("misleading_context_eval", "MISLEADING_CONTEXT", output_budget=output_budget)
 
 
 @task
-def hallucination_full_eval():
+def hallucination_full_eval(output_budget=False):
     """Complete evaluation: All 4 categories (32 samples) - loads from CSV"""
-    return Task(
+    return grounding_task("hallucination_full_eval", output_budget=output_budget)
+
+
+@task
+def lexical_grounding_eval():
+    """All 4 categories scored by the local groundedness scorer only (no judge calls)"""
+    from groundedness import groundedness
+
+    return build_task(
+        "lexical_grounding_eval",
         dataset=load_samples_by_category(),
-        solver=[
-            system_message(STRICT_GROUNDING_PROMPT),
-            generate()
-        ],
-        scorer=[
-            model_graded_fact(),
-            includes(["cannot answer", "not in the context", "does not contain",
-                     "not mentioned", "not specified", "no information"])
-        ]
+        prompt=STRICT_GROUNDING_PROMPT,
+        scorer=groundedness()
+    )
+
+
+@task
+def rag_grounding_eval(corpus="../data/corpus", k=3, distractors=0):
+    """All 4 categories with each Context replaced by BM25 passages retrieved from corpus (retrieval.py)"""
+    from pathlib import Path
+    from inspect_ai.dataset import MemoryDataset
+    from retrieval import Retriever
+
+    samples = Retriever(Path(corpus)).apply(list(load_samples_by_category()), int(k), int(distractors))
+    return build_task(
+        "rag_grounding_eval",
+        dataset=MemoryDataset(samples),
+        prompt=STRICT_GROUNDING_PROMPT,
+        scorer=grounding_scorer(),
+        metadata={"corpus": str(corpus), "k": int(k), "distractors": int(distractors)}
+    )
+
+
+@task
+def long_context_eval(length=4000, depth=0.5, padding="filler", category=None):
+    """Samples with the context padded to length tokens, the original fact at depth (context_scaling.py)"""
+    from inspect_ai.dataset import MemoryDataset
+    from context_scaling import padded_samples
+
+    length, depth = int(length), float(depth)
+    return build_task(
+        "long_context_eval",
+        dataset=MemoryDataset(padded_samples(list(load_samples_by_category(category)), length, depth, padding)),
+        prompt=STRICT_GROUNDING_PROMPT,
+        scorer=grounding_scorer(category),
+        metadata={"scaling_cell": {"length": length, "depth": depth, "padding": padding}}
     )
 
 # MAIN
@@ -131,9 +144,21 @@ Tasks:
   no_context_eval         - 8 samples (should refuse)
   misleading_context_eval - 8 samples (should refuse)
   hallucination_full_eval - 32 samples (all categories)
+  lexical_grounding_eval  - 32 samples, local groundedness scorer only
+  rag_grounding_eval      - 32 samples, contexts retrieved from a document corpus (-T corpus=DIR -T k=3 -T distractors=0)
+  long_context_eval       - 32 samples, context padded to -T length tokens with the fact at -T depth
+
+Category tasks and hallucination_full_eval take -T output_budget=true: per-category max_tokens
+(tight for NO_CONTEXT) and generation stops after "I cannot answer this question." (output_budget.py)
+
+Context-length x depth sweep (cached cells are reused):
+  python context_scaling.py --model openai/gpt-4o-mini --lengths 1000,16000,100000 --depths 0,0.5,1
 
 Run: inspect eval hallucination_eval.py@hallucination_full_eval --model  bedrock/anthropic.claude-3-sonnet-20240229-v1:0
 
+All variants as one interleaved run:
+  python task_matrix.py --run-all --model openai/gpt-4o-mini
+
 View:
   inspect view
 """)
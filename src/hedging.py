@@ -0,0 +1,307 @@
+"""
+Hedged Requests:Tail-latency control for model calls (opt-in).
+
+A few model calls take many times the median, and in 8-32 sample suites those stragglers set the
+wall time. With hedging, a call that has not answered after a percentile-based delay gets a
+duplicate request; the first response wins and the loser is cancelled.
+
+1)delay: the HEDGE_PERCENTILE of this model's recent call latencies (seeded from prior logs, so
+  the first calls of a run are covered too); only primary requests that completed are recorded,
+  never a backup's earlier finish
+2)spend cap: at most max_extra of all calls may be hedged, and hedging stops once wasted tokens
+  reach max_wasted_tokens
+3)stats: every hedge is recorded as an info event in the sample transcript; after the run the
+  per-log totals (calls, hedges, wins, wasted tokens) are written to the log header under
+  eval.metadata.hedging and shown by log_analysis.py
+
+Enabled by prefixing the model: hedged/openai/gpt-4o-mini (options via -M percentile=95 -M max_extra=0.05)
+or python task_matrix.py --run-all --model openai/gpt-4o-mini --hedge
+
+Run: python hedging.py --simulate [--log-dir logs] [--percentile 90] [--max-extra 0.1]
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict, deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+PROVIDER = "hedged"
+HEDGE_PERCENTILE = 90
+MAX_EXTRA = 0.10  # fraction of calls that may be duplicated
+MIN_OBSERVATIONS = 20  # latencies needed before the percentile is trusted
+WINDOW = 500  # recent latencies kept per model
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+# POLICY
+class HedgePolicy:
+    """Latency window, hedge delay and spend cap for one model (shared by all its API instances)."""
+
+    def __init__(self, pct: float = HEDGE_PERCENTILE, max_extra: float = MAX_EXTRA,
+                 max_wasted_tokens: Optional[int] = None, seed: Optional[List[float]] = None):
+        self.pct = pct
+        self.max_extra = max_extra
+        self.max_wasted_tokens = max_wasted_tokens
+        self.latencies = deque(seed or [], maxlen=WINDOW)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.wasted_tokens = 0
+        self.capped = 0  # calls past the delay that the spend cap kept from hedging
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little history"""
+        if len(self.latencies) < MIN_OBSERVATIONS:
+            return None
+        return percentile(list(self.latencies), self.pct)
+
+    def allow(self) -> bool:
+        """Whether one more hedge stays within the spend cap"""
+        if self.hedges + 1 > self.max_extra * self.calls:
+            return False
+        return self.max_wasted_tokens is None or self.wasted_tokens < self.max_wasted_tokens
+
+    def stats(self) -> Dict:
+        return {"calls": self.calls, "hedges": self.hedges, "hedge_wins": self.hedge_wins,
+                "wasted_tokens": self.wasted_tokens, "capped": self.capped}
+
+
+_POLICIES: Dict[str, HedgePolicy] = {}
+
+
+def _output_of(result: Any) -> Any:
+    """ModelAPI.generate returns an output or (output, call)"""
+    return result[0] if isinstance(result, tuple) else result
+
+
+def _tokens(output: Any, field: str = "total_tokens") -> int:
+    usage = getattr(output, "usage", None)
+    return getattr(usage, field, 0) or 0 if usage is not None else 0
+
+# MODEL PROVIDER
+@lru_cache(maxsize=None)
+def register():
+    """Register the hedged/<model> provider with inspect (idempotent, imports inspect_ai lazily)"""
+    from inspect_ai.model import ModelAPI, get_model, modelapi
+
+    class HedgedModelAPI(ModelAPI):
+        """Wraps another model's API and hedges its slow calls."""
+
+        def __init__(self, model_name, base_url=None, api_key=None, config=None,
+                     percentile=HEDGE_PERCENTILE, max_extra=MAX_EXTRA, max_wasted_tokens=None,
+                     log_dir="logs", **model_args):
+            from inspect_ai.model import GenerateConfig
+
+            config = config or GenerateConfig()
+            super().__init__(model_name=model_name, base_url=base_url, api_key=api_key, config=config)
+            self.inner = get_model(model_name, config=config, base_url=base_url, api_key=api_key, **model_args)
+            if model_name not in _POLICIES:
+                seed = historical_latencies(log_dir).get(model_name, [])[-WINDOW:]
+                _POLICIES[model_name] = HedgePolicy(float(percentile), float(max_extra),
+                                                    int(max_wasted_tokens) if max_wasted_tokens else None, seed)
+            self.policy = _POLICIES[model_name]
+
+        def max_tokens(self):
+            return self.inner.api.max_tokens()
+
+        def max_connections(self):
+            return self.inner.api.max_connections()
+
+        def connection_key(self):
+            return self.inner.api.connection_key()
+
+        def should_retry(self, ex):
+            return self.inner.api.should_retry(ex)
+
+        async def generate(self, input, tools, tool_choice, config):
+            policy = self.policy
+            policy.calls += 1
+
+            def call():
+                return asyncio.ensure_future(self.inner.api.generate(input, tools, tool_choice, config))
+
+            def primary_done(future):
+                # the primary's own latency, hedged or not: a backup's earlier finish would pull the delay down
+                if not future.cancelled() and future.exception() is None:
+                    policy.latencies.append(time.monotonic() - start)
+
+            start = time.monotonic()
+            primary = call()
+            primary.add_done_callback(primary_done)
+            backup = None
+            try:
+                delay = policy.delay()
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if done:
+                    return primary.result()
+                if not policy.allow():
+                    policy.capped += 1
+                    return await primary
+
+                policy.hedges += 1
+                backup = call()
+                done, pending = await asyncio.wait({primary, backup}, return_when=asyncio.FIRST_COMPLETED)
+                winner = primary if primary in done else backup
+                if winner.exception() is not None and pending:
+                    winner = pending.pop()  # the other request may still succeed
+                    await asyncio.wait({winner})
+                loser = backup if winner is primary else primary
+                if loser.done() and not loser.cancelled() and loser.exception() is None:
+                    wasted, estimated = _tokens(_output_of(loser.result())), False
+                else:
+                    loser.cancel()
+                    # a cancelled request still paid for its prompt
+                    wasted, estimated = _tokens(_output_of(winner.result()), "input_tokens"), True
+                policy.wasted_tokens += wasted
+                policy.hedge_wins += winner is backup
+                _record_hedge({"model": self.model_name, "delay": round(delay, 3),
+                               "elapsed": round(time.monotonic() - start, 3),
+                               "winner": "backup" if winner is backup else "primary",
+                               "wasted_tokens": wasted, "estimated": estimated})
+                return winner.result()
+            finally:
+                # the caller may be cancelled (sample timeout, limits): stop requests that are still running
+                for future in (primary, backup):
+                    if future is not None and not future.done():
+                        future.cancel()
+
+    @modelapi(name=PROVIDER)
+    def hedged():
+        return HedgedModelAPI
+
+    return True
+
+
+def _record_hedge(data: Dict):
+    """Info event in the current sample's transcript (picked up by attach_hedge_stats)"""
+    from inspect_ai.log import transcript
+
+    transcript().info({"hedge": data}, source="hedging")
+
+
+def hedged_model(model: str) -> str:
+    """openai/gpt-4 -> hedged/openai/gpt-4"""
+    return model if model.startswith(f"{PROVIDER}/") else f"{PROVIDER}/{model}"
+
+
+def attach_hedge_stats(logs: List[Any]) -> List[Dict]:
+    """Sum the hedge events of each finished EvalLog into eval.metadata.hedging and rewrite the log"""
+    from inspect_ai.log import write_eval_log
+
+    summaries = []
+    for log in logs:
+        stats = {"calls": 0, "hedges": 0, "hedge_wins": 0, "wasted_tokens": 0}
+        for sample in log.samples or []:
+            for event in sample.events:
+                if event.event == "model":
+                    stats["calls"] += 1
+                elif event.event == "info" and getattr(event, "source", None) == "hedging":
+                    hedge = event.data["hedge"]
+                    stats["hedges"] += 1
+                    stats["hedge_wins"] += hedge["winner"] == "backup"
+                    stats["wasted_tokens"] += hedge["wasted_tokens"]
+        log.eval.metadata = {**(log.eval.metadata or {}), "hedging": stats}
+        write_eval_log(log, log.location)
+        summaries.append({"task": log.eval.task, "model": log.eval.model, **stats})
+    return summaries
+
+# HISTORY & SIMULATION
+def historical_calls(log_dir: str = "logs") -> Dict[str, List[tuple]]:
+    """model -> [(seconds, input tokens)] of every logged model call, in log order"""
+    from log_analysis import is_sample_document, iter_log_documents, list_logs
+
+    calls = defaultdict(list)
+    if not Path(log_dir).exists():
+        return calls
+    for log_path in list_logs(log_dir):
+        for doc in iter_log_documents(log_path):
+            samples = [doc] if is_sample_document(doc) else (doc.get("samples") or []) if isinstance(doc, dict) else []
+            for sample in samples:
+                for event in sample.get("events") or []:
+                    output = event.get("output") or {} if event.get("event") == "model" else {}
+                    if output.get("time"):
+                        usage = output.get("usage") or {}
+                        calls[event.get("model", "unknown")].append((output["time"], usage.get("input_tokens", 0)))
+    return calls
+
+
+def historical_latencies(log_dir: str = "logs") -> Dict[str, List[float]]:
+    """model -> logged call latencies (seeds each model's hedge delay)"""
+    return {model: [t for t, _ in calls] for model, calls in historical_calls(log_dir).items()}
+
+
+def simulate_hedging(calls: List[tuple], pct: float = HEDGE_PERCENTILE, max_extra: float = MAX_EXTRA,
+                     seed: int = 0) -> Dict:
+    """
+    Replay logged calls under the policy: a call slower than the current delay gets a backup
+    whose latency is drawn from the same model's history; it finishes at min(primary, delay + backup).
+    """
+    rng = random.Random(seed)
+    latencies = [t for t, _ in calls]
+    policy = HedgePolicy(pct, max_extra)
+    after, total_tokens = [], 0
+    for latency, input_tokens in calls:
+        policy.calls += 1
+        total_tokens += input_tokens
+        delay = policy.delay()
+        finish = latency
+        if delay is not None and latency > delay:
+            if policy.allow():
+                policy.hedges += 1
+                backup = delay + rng.choice(latencies)
+                finish = min(latency, backup)
+                policy.hedge_wins += backup < latency
+                policy.wasted_tokens += input_tokens
+            else:
+                policy.capped += 1
+        policy.latencies.append(latency)  # the primary's latency, as the live model records it
+        after.append(finish)
+    return {"before": latencies, "after": after, "extra_tokens": policy.wasted_tokens / total_tokens if total_tokens else 0.0,
+            **policy.stats()}
+
+
+def simulation_report(log_dir: str = "logs", pct: float = HEDGE_PERCENTILE, max_extra: float = MAX_EXTRA) -> str:
+    lines = []
+    lines.append("=" * 110)
+    lines.append(f"HEDGING SIMULATION (delay = p{pct:g} of recent calls, max {max_extra:.0%} extra requests)")
+    lines.append("=" * 110)
+    lines.append(f"{'Model':<58} {'calls':>6} {'hedged':>7} {'won':>5} {'p50 s':>6} "
+                 f"{'p95 s':>13} {'max s':>13} {'+tokens':>8}")
+    lines.append("-" * 110)
+    for model, calls in sorted(historical_calls(log_dir).items()):
+        if len(calls) <= MIN_OBSERVATIONS:
+            continue
+        sim = simulate_hedging(calls, pct, max_extra)
+        before, after = sim["before"], sim["after"]
+        lines.append(
+            f"{model[-58:]:<58} {sim['calls']:>6} {sim['hedges']:>7} {sim['hedge_wins']:>5} "
+            f"{percentile(after, 50):>6.1f} {percentile(before, 95):>6.1f}->{percentile(after, 95):<5.1f} "
+            f"{max(before):>6.1f}->{max(after):<5.1f} {sim['extra_tokens']:>8.1%}"
+        )
+    lines.append("=" * 110)
+    return "\n".join(lines)
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="Hedged model requests")
+    parser.add_argument("--simulate", action="store_true", help="replay logged call latencies under the policy")
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--percentile", type=float, default=HEDGE_PERCENTILE)
+    parser.add_argument("--max-extra", type=float, default=MAX_EXTRA, help="max fraction of calls hedged")
+    args = parser.parse_args()
+
+    if args.simulate:
+        print(simulation_report(args.log_dir, args.percentile, args.max_extra))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Shared HTTP Pool:One keep-alive connection pool per runner process for every provider, task and judge call.
+
+Each inspect eval() call builds fresh provider clients, so a script that evaluates many small
+task x model runs one after another pays TCP + TLS setup again and again. With pooling:
+1)client: one httpx.AsyncClient per event loop (HTTP/2 when the h2 package is installed,
+  HTTP/1.1 keep-alive otherwise) is handed to every httpx-based provider SDK (openai and the
+  OpenAI-compatible providers, anthropic, groq); provider close() calls do not close it
+2)runner: PooledRunner keeps ONE event loop open across sequential eval_async() calls, so the
+  pooled connections outlive each run (plain eval() starts a new loop every call)
+3)stats: per host, requests vs new TCP connections and TLS handshakes (httpcore trace
+  events) and the HTTP versions used; reuse = requests that needed no new connection
+
+Enabled by prefixing the model: pooled/openai/gpt-4o-mini (judge calls of model-graded scorers
+go through the same model), or python task_matrix.py --run-all --model openai/gpt-4o-mini --pool.
+Providers that do not use httpx (bedrock, google) pass through unpooled.
+
+Run: python multi_model_eval.py --run-all --pool
+     python work_queue.py --work --pool
+"""
+import asyncio
+import importlib.util
+import os
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+
+PROVIDER = "pooled"
+HTTPX_PROVIDERS = {"openai", "anthropic", "groq", "together", "fireworks", "openrouter", "grok", "ollama", "vllm"}
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE = 40
+KEEPALIVE_SECONDS = 90.0
+TIMEOUT_SECONDS = 600.0  # long generations; the SDKs' own per-request timeouts still apply
+
+
+class HostStats:
+    """Requests, new connections and TLS handshakes to one host."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.versions = Counter()
+
+    def reuse(self) -> float:
+        return 1 - self.connections / self.requests if self.requests else 0.0
+
+
+STATS: Dict[str, HostStats] = defaultdict(HostStats)
+_CLIENTS: Dict[int, Any] = {}  # id(event loop) -> (loop, client)
+
+# CLIENT
+@lru_cache(maxsize=None)
+def _client_classes() -> tuple:
+    """(transport, client) classes, defined on first use so httpx is only imported when pooling"""
+    import httpx
+
+    class CountingTransport(httpx.AsyncHTTPTransport):
+        """Counts requests, new connections and TLS handshakes per host via httpcore trace events."""
+
+        async def handle_async_request(self, request):
+            stats = STATS[request.url.host]
+            stats.requests += 1
+            outer = request.extensions.get("trace")
+
+            async def trace(event, info):
+                if event == "connection.connect_tcp.complete":
+                    stats.connections += 1
+                elif event == "connection.start_tls.complete":
+                    stats.tls_handshakes += 1
+                if outer is not None:
+                    result = outer(event, info)
+                    if asyncio.iscoroutine(result):
+                        await result
+
+            request.extensions["trace"] = trace
+            response = await super().handle_async_request(request)
+            version = response.extensions.get("http_version", b"")
+            stats.versions[version.decode() if isinstance(version, bytes) else str(version)] += 1
+            return response
+
+    class SharedClient(httpx.AsyncClient):
+        """AsyncClient that survives the provider SDKs closing it at the end of each run."""
+
+        async def aclose(self):
+            pass
+
+        async def close_pool(self):
+            await super().aclose()
+
+    return CountingTransport, SharedClient
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def shared_client() -> Any:
+    """The pooled client of the running event loop (created on first use)"""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    for key, (other, _) in list(_CLIENTS.items()):
+        if other.is_closed():
+            del _CLIENTS[key]  # its connections died with the loop
+    if id(loop) not in _CLIENTS:
+        transport_class, client_class = _client_classes()
+        limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE,
+                              keepalive_expiry=KEEPALIVE_SECONDS)
+        http2 = http2_available()
+        client = client_class(transport=transport_class(http2=http2, limits=limits), http2=http2,
+                              limits=limits, timeout=httpx.Timeout(TIMEOUT_SECONDS, connect=10.0))
+        _CLIENTS[id(loop)] = (loop, client)
+    return _CLIENTS[id(loop)][1]
+
+
+async def close_clients():
+    """Close the pooled clients of the running loop"""
+    loop = asyncio.get_running_loop()
+    entry = _CLIENTS.pop(id(loop), None)
+    if entry is not None:
+        await entry[1].close_pool()
+
+# MODEL PROVIDER
+@lru_cache(maxsize=None)
+def register():
+    """Register the pooled/<model> provider with inspect (idempotent, imports inspect_ai lazily)"""
+    from inspect_ai.model import ModelAPI, get_model, modelapi
+
+    class PooledModelAPI(ModelAPI):
+        """Another model's API built on the process-wide pooled HTTP client."""
+
+        def __init__(self, model_name, base_url=None, api_key=None, config=None, **model_args):
+            from inspect_ai.model import GenerateConfig
+
+            config = config or GenerateConfig()
+            super().__init__(model_name=model_name, base_url=base_url, api_key=api_key, config=config)
+            if model_name.split("/", 1)[0] in HTTPX_PROVIDERS and "http_client" not in model_args:
+                try:
+                    model_args["http_client"] = shared_client()
+                except RuntimeError:
+                    pass  # built outside an event loop: nothing to bind a pool to
+            self.inner = get_model(model_name, config=config, base_url=base_url, api_key=api_key, **model_args)
+
+        def max_tokens(self):
+            return self.inner.api.max_tokens()
+
+        def max_connections(self):
+            return self.inner.api.max_connections()
+
+        def connection_key(self):
+            return self.inner.api.connection_key()
+
+        def should_retry(self, ex):
+            return self.inner.api.should_retry(ex)
+
+        async def generate(self, input, tools, tool_choice, config):
+            return await self.inner.api.generate(input, tools, tool_choice, config)
+
+    @modelapi(name=PROVIDER)
+    def pooled():
+        return PooledModelAPI
+
+    return True
+
+
+def pooled_model(model: str) -> str:
+    """openai/gpt-4 -> pooled/openai/gpt-4 (hedged/openai/gpt-4 -> hedged/pooled/openai/gpt-4)"""
+    if model.startswith(f"{PROVIDER}/") or f"/{PROVIDER}/" in model:
+        return model
+    if model.startswith("hedged/"):
+        return f"hedged/{PROVIDER}/{model[len('hedged/'):]}"
+    return f"{PROVIDER}/{model}"
+
+def unpooled_model(model: str) -> str:
+    """pooled/openai/gpt-4 -> openai/gpt-4 (hedged/pooled/openai/gpt-4 -> hedged/openai/gpt-4)"""
+    return model.replace(f"{PROVIDER}/", "", 1) if model.startswith(f"{PROVIDER}/") or f"/{PROVIDER}/" in model \
+        else model
+
+
+def restore_model_names(logs: List[Any], rewrite: bool = True) -> List[Any]:
+    """
+    Put the unpooled model name back into each EvalLog header (and its log file when rewrite), so
+    history, compare_models, diff and incremental fingerprints see pooled and unpooled runs of a
+    model as the same model
+    """
+    from inspect_ai.log import write_eval_log
+
+    for log in logs:
+        model = unpooled_model(log.eval.model)
+        if model == log.eval.model:
+            continue
+        log.eval.model = model
+        if rewrite and log.location:
+            write_eval_log(log, log.location)
+    return logs
+
+# RUNNER
+def init_display(display: str):
+    """Set inspect's display type ("none", "plain", "rich", ...) the way eval() does"""
+    try:
+        from inspect_ai._util.display import init_display_type
+    except ImportError:  # moved in this inspect version; the env var is read on first display use
+        os.environ["INSPECT_DISPLAY"] = display
+    else:
+        init_display_type(display)
+
+
+class PooledRunner:
+    """Sequential eval() calls on one long-lived event loop, so pooled connections are reused."""
+
+    def __init__(self):
+        register()
+        self.loop = asyncio.new_event_loop()
+        self.runs = 0
+
+    def eval(self, tasks: Any, model: Any = None, display: Optional[str] = None, **eval_kwargs) -> List[Any]:
+        """inspect eval() with every model routed through the pool; returns the EvalLogs"""
+        from inspect_ai import eval_async
+
+        if display is not None:
+            init_display(display)  # eval() does this itself; eval_async() has no display argument
+        if model is not None:
+            model = [pooled_model(m) for m in model] if isinstance(model, list) else pooled_model(model)
+        self.runs += 1
+        return restore_model_names(self.loop.run_until_complete(eval_async(tasks, model=model, **eval_kwargs)))
+
+    def close(self):
+        if not self.loop.is_closed():
+            self.loop.run_until_complete(close_clients())
+            self.loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def pool_stats() -> Dict[str, Dict]:
+    return {host: {"requests": s.requests, "connections": s.connections, "tls_handshakes": s.tls_handshakes,
+                   "reuse": round(s.reuse(), 4), "versions": dict(s.versions)} for host, s in STATS.items()}
+
+
+def pool_report(runs: Optional[int] = None) -> str:
+    """Per-host connection reuse since the process started"""
+    lines = []
+    lines.append("=" * 90)
+    protocol = "HTTP/2 + keep-alive" if http2_available() else "HTTP/1.1 keep-alive (install h2 for HTTP/2)"
+    lines.append(f"HTTP CONNECTION POOL ({protocol}{f', {runs} eval runs' if runs is not None else ''})")
+    lines.append("=" * 90)
+    lines.append(f"{'Host':<36} {'requests':>9} {'new conns':>10} {'TLS':>6} {'reuse':>7}  versions")
+    lines.append("-" * 90)
+    for host, stats in sorted(STATS.items(), key=lambda item: -item[1].requests):
+        versions = ", ".join(f"{v} {n}" for v, n in stats.versions.most_common())
+        lines.append(f"{host[:36]:<36} {stats.requests:>9} {stats.connections:>10} {stats.tls_handshakes:>6} "
+                     f"{stats.reuse():>7.1%}  {versions}")
+    if not STATS:
+        lines.append("  no pooled requests (non-httpx providers pass through unpooled)")
+    lines.append("=" * 90)
+    return "\n".join(lines)
@@ -0,0 +1,245 @@
+"""
+Incremental Re-Evaluation:Re-runs ONLY the samples whose result is not already in prior logs.
+
+Every sample result is fingerprinted over everything that can change its outcome:
+1)input, target and metadata of the sample
+2)system prompt and tool names of the task
+3)model
+4)scorer config (scorer names + options, as recorded in the log header)
+
+A results store (.results_store in the log directory) maps fingerprint -> scored sample and
+is refreshed incrementally: only logs that are new or changed since the last scan are read.
+Editing a few rows of all_samples.csv or one prompt therefore re-evaluates just the affected
+samples; the report is then merged from cached + fresh results.
+
+Run: python incremental_eval.py --model openai/gpt-4o-mini [--log-dir logs] [--dry-run]
+"""
+import argparse
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from log_analysis import LogAnalyzer, changed_logs, iter_log_documents, is_sample_document
+
+STORE_NAME = ".results_store"  # JSON, but not *.json so log globs skip it
+
+# FINGERPRINTS
+def _canonical(value: Any) -> str:
+    """Order-independent JSON encoding used for hashing"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def sample_fingerprint(sample_input: Any, target: Any, metadata: Dict, config: Dict) -> str:
+    """sha256 over the sample fields + the task config (system prompt, tools, model, scorers)"""
+    payload = {
+        "input": sample_input,
+        "target": target,
+        "metadata": metadata or {},
+        "system_prompt": config["system_prompt"],
+        "tools": config["tools"],
+        "model": config["model"],
+        "scorers": config["scorers"]
+    }
+    return hashlib.sha256(_canonical(payload).encode("utf-8")).hexdigest()
+
+
+def log_config(header: Dict) -> Dict:
+    """Fingerprint config recorded in a log header (eval + plan)"""
+    system_prompt, tools = [], []
+    for step in header.get("plan", {}).get("steps", []):
+        params = step.get("params", {})
+        if step.get("solver") == "system_message":
+            system_prompt.append(params.get("template", ""))
+        elif step.get("solver") == "use_tools":
+            for group in params.get("tools", []):
+                group = group if isinstance(group, list) else [group]
+                tools.extend(t.get("name", "") for t in group if isinstance(t, dict))
+    eval_info = header.get("eval", {})
+    return {
+        "system_prompt": "\n".join(system_prompt),
+        "tools": tools,
+        "model": eval_info.get("model", "unknown"),
+        "scorers": [{"name": s.get("name", ""), "options": s.get("options", {})}
+                    for s in eval_info.get("scorers", [])]
+    }
+
+
+def task_config(cell: Dict, model: str, scorers: List[Any]) -> Dict:
+    """Fingerprint config of a matrix cell that is about to run (mirrors log_config)"""
+    from inspect_ai._util.registry import registry_params, registry_unqualified_name
+    from task_matrix import SUITES
+
+    module = SUITES[cell["suite"]]["module"]
+    tools = []
+    if cell["tool_set"] is not None:
+        tools = [factory.__name__ for factory in module.TOOL_SETS[cell["tool_set"]]["tools"]]
+    return {
+        "system_prompt": module.PROMPTS[cell["prompt"]],
+        "tools": tools,
+        "model": model,
+        "scorers": [{"name": registry_unqualified_name(s), "options": registry_params(s)}
+                    for s in scorers]
+    }
+
+# RESULTS STORE
+class ResultsStore:
+    """fingerprint -> {epoch: scored sample record}, persisted as JSON next to the logs."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.logs: Dict[str, List] = {}
+        self.samples: Dict[str, Dict[str, Dict]] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.logs = data.get("logs", {})
+            self.samples = data.get("samples", {})
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return fingerprint in self.samples
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"logs": self.logs, "samples": self.samples}, f)
+
+    def refresh(self, log_dir: Path) -> int:
+        """Scan only logs that are new or changed since the last refresh; returns logs scanned"""
+        scanned = 0
+        for log_path, signature in changed_logs(log_dir, self.logs, skip=self.path):
+            self._index_log(log_path)
+            self.logs[str(log_path)] = signature
+            scanned += 1
+        if scanned:
+            self.save()
+        return scanned
+
+    def _index_log(self, log_path: Path):
+        """Stream one log and record every scored sample under its fingerprint"""
+        config, task = None, "unknown"
+        try:
+            for doc in iter_log_documents(log_path, events=False):
+                if isinstance(doc, dict) and "eval" in doc and "plan" in doc:
+                    config = log_config(doc)
+                    task = doc["eval"].get("task", task)
+                    samples = doc.get("samples") or []  # plain JSON logs carry samples inline
+                elif is_sample_document(doc):
+                    samples = [doc]
+                else:
+                    continue
+                for sample in samples:
+                    if config is not None and sample.get("scores"):
+                        self._add(sample, config, task, log_path)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Warning: Could not index {log_path}: {e}")
+
+    def _add(self, sample: Dict, config: Dict, task: str, log_path: Path):
+        fingerprint = sample_fingerprint(sample.get("input"), sample.get("target"),
+                                         sample.get("metadata"), config)
+        self.samples.setdefault(fingerprint, {})[str(sample.get("epoch", 1))] = {
+            "log": str(log_path),
+            "task": task,
+            "model": config["model"],
+            "id": sample.get("id"),
+            "epoch": sample.get("epoch", 1),
+            "input": sample.get("input"),
+            "target": sample.get("target"),
+            "metadata": sample.get("metadata", {}),
+            "scores": {name: {k: score.get(k) for k in ("value", "answer", "explanation")}
+                       for name, score in sample.get("scores", {}).items()},
+            "total_time": sample.get("total_time"),
+            "model_usage": sample.get("model_usage", {}),
+            "output_usage": (sample.get("output") or {}).get("usage") or {}  # the evaluated model's generation
+        }
+
+    def records(self, fingerprints: List[str]) -> List[Dict]:
+        """All stored records (every epoch) for the given fingerprints"""
+        out = []
+        for fingerprint in fingerprints:
+            out.extend(self.samples.get(fingerprint, {}).values())
+        return out
+
+# RUNNER
+def plan_incremental(models: List[str], store: ResultsStore, spec: Optional[Dict] = None) -> List[Dict]:
+    """For every cell x model: fingerprint the current samples and split cached vs missing"""
+    from task_matrix import SUITES, expand_matrix, build_cell_task
+
+    plan = []
+    for cell in expand_matrix(spec):
+        scorers = SUITES[cell["suite"]]["scorer"](cell["category"])
+        scorers = scorers if isinstance(scorers, list) else [scorers]
+        full_task = build_cell_task(cell)
+        for model in models:
+            config = task_config(cell, model, scorers)
+            fingerprints, missing = [], []
+            for sample in full_task.dataset:
+                fingerprint = sample_fingerprint(sample.input, sample.target, sample.metadata, config)
+                fingerprints.append(fingerprint)
+                if fingerprint not in store:
+                    missing.append(sample)
+            plan.append({"cell": cell, "model": model, "fingerprints": fingerprints, "missing": missing})
+    return plan
+
+
+def merged_report(entry: Dict, store: ResultsStore) -> str:
+    """Report over cached + freshly evaluated samples for one cell x model"""
+    records = store.records(entry["fingerprints"])
+    primary = [next(iter(r["scores"].values()), {}).get("value") for r in records]
+    accuracy = sum(1 for v in primary if v in ("C", "CORRECT")) / len(primary) if primary else 0.0
+    log_data = {
+        "eval": {"model": entry["model"], "task": entry["cell"]["name"]},
+        "results": {"metrics": {"accuracy": {"value": accuracy}}},
+        "samples": records
+    }
+    return LogAnalyzer(log_data).generate_report()
+
+
+def run_incremental(models: List[str], spec: Optional[Dict] = None, log_dir: str = "logs",
+                    dry_run: bool = False) -> List[Dict]:
+    """Evaluate only un-fingerprinted samples (one interleaved eval call), then print merged reports"""
+    from inspect_ai import eval as inspect_eval
+    from inspect_ai.dataset import MemoryDataset
+    from task_matrix import build_cell_task
+
+    store = ResultsStore(Path(log_dir) / STORE_NAME)
+    scanned = store.refresh(log_dir)
+    print(f"Results store: {len(store.samples)} fingerprints ({scanned} logs scanned)")
+
+    plan = plan_incremental(models, store, spec)
+    total = sum(len(entry["fingerprints"]) for entry in plan)
+    pending = [entry for entry in plan if entry["missing"]]
+    todo = sum(len(entry["missing"]) for entry in pending)
+    print(f"Samples to evaluate: {todo} of {total} ({total - todo} reused)")
+    for entry in pending:
+        print(f"  {entry['cell']['name']} @ {entry['model']}: {len(entry['missing'])} new")
+
+    if dry_run:
+        return plan
+
+    if pending:
+        tasks = [
+            build_cell_task(entry["cell"], dataset=MemoryDataset(entry["missing"]), model=entry["model"])
+            for entry in pending
+        ]
+        inspect_eval(tasks, log_dir=log_dir, log_format="json", max_tasks=len(tasks))
+        store.refresh(log_dir)
+
+    for entry in plan:
+        print(merged_report(entry, store))
+    return plan
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="Re-evaluate only samples whose fingerprint changed")
+    parser.add_argument("--model", action="append", default=[], help="model to evaluate (repeatable)")
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be re-run")
+    args = parser.parse_args()
+
+    if not args.model:
+        parser.error("at least one --model is required")
+    run_incremental(args.model, log_dir=args.log_dir, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
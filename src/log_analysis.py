@@ -7,19 +7,47 @@ Features:
 3)Identify failure patterns
 4)Compare model behaviors
 5)Generate analysis reports
+6)Track every run per task/model over time and flag regressions
+7)Paired per-sample diff between runs
+8)Label failures with the failure taxonomy (failure_taxonomy.classify_failure)
+9)Lexical groundedness of answers against their context (groundedness.check_groundedness)
+10)Reads compact .glog logs (log_compact.py) as well as plain dumps
+11)Drill down into single samples through a per-log offset index (log_index.py)
+12)Live monitor that tails in-flight logs (--follow)
+13)Export per-sample spans as Chrome trace / OTLP JSON, one track per concurrent sample slot (--trace)
+14)95% bootstrap CIs on every accuracy / refusal rate, and paired deltas between models (bootstrap.py)
+15)Output-budget outcomes of budgeted runs: early stops after a refusal, samples cut at max_tokens (output_budget.py)
 
 Usage: python log_analysis.py [log_directory]
+       python log_analysis.py [log_directory] --history [--baseline first|previous|pooled]
+       python log_analysis.py --diff LOG_A LOG_B [LOG_C ...] [--align id|input]
+       python log_analysis.py --show LOG [ID [EPOCH]]
+       python log_analysis.py [log_directory] --follow [--interval SECONDS]
+       python log_analysis.py --trace LOG [LOG ...] [--trace-out PREFIX]
 """
 
+import argparse
 import json
-import os
-import sys
+import math
+import statistics
+import time
 from pathlib import Path
 from datetime import datetime
-from collections import defaultdict
-from typing import Dict, List, Any, Optional
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Any, Iterator, Optional
 import re
 
+from bootstrap import CONFIDENCE, bootstrap_means, excludes_zero, format_ci, paired_deltas
+from failure_taxonomy import classify_failure, classify_failures
+from groundedness import check_groundedness
+from log_compact import COMPACT_SUFFIX, iter_compact_documents, source_path
+from log_index import read_sample, sample_outcomes
+from text_features import is_apologetic, is_refusal, split_input
+
+# plain JSON logs, multi-document dumps (.txt) and their compact copies (log_compact.py)
+LOG_PATTERNS = ("*.json", "*.txt", f"*{COMPACT_SUFFIX}")
+
+
 # LOG PARSING
 def find_log_directory() -> Path:
     """Find the Inspect AI logs directory."""
@@ -36,23 +64,126 @@ def find_log_directory() -> Path:
     return Path.home() / ".inspect_ai" / "logs"
 
 
+def iter_log_documents(log_path: Path, chunk_size: int = 1 << 20, events: bool = True) -> Iterator[Any]:
+    """
+    Stream the JSON documents of a log dump one at a time.
+
+    A dump is the concatenation of an .eval archive's entries (start header, one document per
+    sample, summary lists, final header), so it is NOT a single JSON value. Reads chunk_size
+    characters at a time and never holds more than one partial document in memory.
+
+    Compact (.glog) logs are read through their block index; events=False skips the sample
+    event transcripts there, which nothing in this module looks at.
+    """
+    if str(log_path).endswith(COMPACT_SUFFIX):
+        yield from iter_compact_documents(log_path, events=events)
+        return
+    decoder = json.JSONDecoder()
+    buffer = ""
+    with open(log_path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buffer += chunk
+            pos = 0
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos >= len(buffer):
+                    break
+                try:
+                    doc, pos_end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    break  # document continues in the next chunk
+                yield doc
+                pos = pos_end
+            buffer = buffer[pos:]
+            if not chunk:
+                return
+
+
+def is_sample_document(doc: Any) -> bool:
+    """True for a per-sample document (as opposed to headers and summary lists)."""
+    return isinstance(doc, dict) and "id" in doc and "epoch" in doc and "scores" in doc
+
+
 def load_log_file(log_path: Path) -> Optional[Dict]:
-    """Load and parse a single log file."""
+    """Load and parse a single log file (plain JSON log or multi-document dump)."""
     try:
-        with open(log_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        docs = list(iter_log_documents(log_path, events=False))
     except (json.JSONDecodeError, IOError) as e:
         print(f"Warning: Could not parse {log_path}: {e}")
         return None
 
+    if len(docs) == 1 and isinstance(docs[0], dict):
+        return docs[0]
+
+    # Dump: merge the headers (final one wins) and collect the sample documents
+    log_data = {"samples": []}
+    for doc in docs:
+        if is_sample_document(doc):
+            log_data["samples"].append(doc)
+        elif isinstance(doc, dict) and "eval" in doc:
+            log_data.update({k: v for k, v in doc.items() if k != "samples"})
+    return log_data
+
+
+def list_logs(log_dir: Path) -> List[Path]:
+    """Every log under log_dir; a compact copy is skipped while its source dump still exists."""
+    log_files = []
+    for pattern in LOG_PATTERNS:
+        for log_path in sorted(Path(log_dir).glob(f"**/{pattern}")):
+            if str(log_path).endswith(COMPACT_SUFFIX) and source_path(log_path).exists():
+                continue
+            log_files.append(log_path)
+    return log_files
+
+
+def changed_logs(log_dir: Path, seen: Dict[str, List], skip: Optional[Path] = None) -> Iterator[tuple]:
+    """Yield (path, signature) for logs that are new or changed compared to seen[path] = [size, mtime]."""
+    for log_path in list_logs(log_dir):
+        if skip is not None and log_path.resolve() == Path(skip).resolve():
+            continue
+        stat = log_path.stat()
+        signature = [stat.st_size, stat.st_mtime]
+        if seen.get(str(log_path)) != signature:
+            yield log_path, signature
+
 
 def get_recent_logs(log_dir: Path, limit: int = 10) -> List[Path]:
     """Get the most recent log files."""
-    log_files = list(log_dir.glob("**/*.json"))
+    log_files = list_logs(log_dir)
     log_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
     return log_files[:limit]
 
 # METRICS EXTRACTION
+def primary_score(sample: Dict) -> Dict:
+    """Score dict of the first (primary) scorer, or {} for unscored samples."""
+    for score_data in sample.get("scores", {}).values():
+        return score_data
+    return {}
+
+
+def metric_groups(values: List[Dict], prefix: tuple = ()) -> Dict[tuple, List[float]]:
+    """Per-sample values behind every reported rate, keyed prefix + (metric, category)."""
+    groups = defaultdict(list)
+    for v in values:
+        groups[prefix + ("accuracy", "ALL")].append(v["credit"])
+        groups[prefix + ("correct", v["category"])].append(v["correct"])
+        groups[prefix + ("refusal", "ALL")].append(v["refused"])
+        if v["expected"] == "answer":
+            groups[prefix + ("over_refusal", "ALL")].append(v["refused"])
+        elif v["expected"] == "refuse":
+            groups[prefix + ("under_refusal", "ALL")].append(1 - v["refused"])
+    return groups
+
+
+def _rate_ci(estimate: Optional[tuple]) -> str:
+    """' (25% [0%, 50%] of 8)' after a count; the rate among the samples it could happen to"""
+    return f" ({format_ci(estimate)} of {estimate[3]})" if estimate else ""
+
+
 class LogAnalyzer:
     """Analyzes Inspect AI evaluation logs."""
 
@@ -77,6 +208,9 @@ class LogAnalyzer:
     def get_overall_accuracy(self) -> float:
         """Get overall accuracy score."""
         metrics = self.results.get("metrics", {})
+        # version 2 logs keep metrics per scorer; the first scorer is the primary one
+        if not metrics and self.results.get("scores"):
+            metrics = self.results["scores"][0].get("metrics", {})
         accuracy = metrics.get("accuracy", {})
         return accuracy.get("value", 0.0)
 
@@ -144,9 +278,6 @@ class LogAnalyzer:
             "verbose_refusals": 0
         }
 
-        refusal_phrases = ["cannot answer", "can't answer", "not in", "not provided"]
-        apology_phrases = ["sorry", "apologize", "unfortunately"]
-
         for sample in self.samples:
             scores = sample.get("scores", {})
             metadata = sample.get("metadata", {})
@@ -155,12 +286,12 @@ class LogAnalyzer:
             for scorer_name, score_data in scores.items():
                 answer = score_data.get("answer", "").lower()
 
-                has_refusal = any(p in answer for p in refusal_phrases)
+                has_refusal = is_refusal(answer)
 
                 if has_refusal:
                     refusal_patterns["total_refusals"] += 1
 
-                    if any(p in answer for p in apology_phrases):
+                    if is_apologetic(answer):
                         refusal_patterns["apologetic_refusals"] += 1
 
                     if len(answer.split()) > 50:
@@ -178,6 +309,96 @@ class LogAnalyzer:
 
         return refusal_patterns
 
+    def get_sample_values(self) -> List[Dict]:
+        """Compact 0/1 (0.5 for partial credit) outcomes of every scored sample, for interval estimates."""
+        values = []
+        for sample in self.samples:
+            score = primary_score(sample)
+            if not score:
+                continue
+            metadata = sample.get("metadata", {})
+            value = score.get("value", "")
+            values.append({
+                "key": (self.task, sample.get("id"), sample.get("epoch", 1)),  # ids restart per eval_type
+                "category": metadata.get("category", "UNKNOWN"),
+                "expected": metadata.get("expected_behavior", ""),
+                "correct": 1.0 if value in ("C", "CORRECT") else 0.0,
+                "credit": 1.0 if value in ("C", "CORRECT") else 0.5 if value in ("P", "PARTIAL") else 0.0,
+                "refused": 1.0 if is_refusal(score.get("answer") or "") else 0.0
+            })
+        return values
+
+    def get_confidence_intervals(self) -> Dict[tuple, tuple]:
+        """(metric, category) -> (rate, low, high, n): bootstrap CIs of every rate in the report, one pass."""
+        return bootstrap_means(metric_groups(self.get_sample_values()))
+
+    def get_failure_taxonomy(self) -> Dict[str, int]:
+        """Label every failed sample with the local failure-taxonomy classifier; counts per label."""
+        records = []
+        for sample in self.samples:
+            score = primary_score(sample)
+            if score and score.get("value") not in ("C", "CORRECT"):
+                input_text = sample.get("input", "")
+                records.append({
+                    "input": input_text if isinstance(input_text, str) else "",
+                    "answer": score.get("answer") or "",
+                    "expected_behavior": sample.get("metadata", {}).get("expected_behavior", "")
+                })
+        counts = defaultdict(int)
+        for label, _ in classify_failures(records):
+            counts[label] += 1
+        return dict(counts)
+
+    def get_groundedness(self) -> Dict:
+        """Lexical groundedness of every answer against its context; inputs without one (tool tasks) are skipped."""
+        ratios, flagged, skipped = [], [], 0
+        for sample in self.samples:
+            score = primary_score(sample)
+            input_text = sample.get("input", "")
+            if not score or not isinstance(input_text, str):
+                continue
+            if not split_input(input_text)[0]:
+                skipped += 1
+                continue
+            result = check_groundedness(input_text, score.get("answer") or "")
+            ratios.append(result["support_ratio"])
+            if result["unsupported"]:
+                flagged.append({"input": input_text, "unsupported": result["unsupported"],
+                                "category": sample.get("metadata", {}).get("category", "UNKNOWN")})
+        return {
+            "mean_support": sum(ratios) / len(ratios) if ratios else 1.0,
+            "answers": len(ratios),
+            "flagged": flagged,
+            "skipped": skipped
+        }
+
+    def get_tool_parallelism(self) -> Dict:
+        """Per-turn speedup of concurrently executed tool calls (recorded by tool_execution.py)."""
+        turns = [turn for sample in self.samples
+                 for turn in (sample.get("store") or {}).get("tool_turns", [])]
+        serial = sum(turn["serial"] for turn in turns)
+        wall = sum(turn["wall"] for turn in turns)
+        return {
+            "turns": len(turns),
+            "calls": sum(turn["calls"] for turn in turns),
+            "serial": serial,
+            "wall": wall,
+            "speedup": serial / wall if wall else 1.0
+        }
+
+    def get_output_budget(self) -> Dict:
+        """Early stops and max_tokens cuts of runs generated with output budgets (output_budget.py)."""
+        records = [(sample, (sample.get("store") or {}).get("output_budget")) for sample in self.samples]
+        records = [(sample, record) for sample, record in records if record]
+        return {
+            "samples": len(records),
+            "output_tokens": sum(record.get("output_tokens") or 0 for _, record in records),
+            "early_stops": sum(record.get("early_stop") is True for _, record in records),
+            "unknown_stops": sum(record.get("early_stop", False) is None for _, record in records),
+            "truncated": [sample.get("metadata", {}).get("category", "UNKNOWN")
+                          for sample, record in records if record.get("truncated")]
+        }
+
     def generate_report(self) -> str:
         """Generate a comprehensive analysis report."""
         lines = []
@@ -187,7 +408,14 @@ class LogAnalyzer:
         lines.append(f"\nModel: {self.model}")
         lines.append(f"Task: {self.task}")
         lines.append(f"Total Samples: {len(self.samples)}")
-        lines.append(f"Overall Accuracy: {self.get_overall_accuracy():.2%}")
+        intervals = self.get_confidence_intervals()
+        overall = intervals.get(("accuracy", "ALL"))
+        ci = f"  ({CONFIDENCE:.0%} CI {overall[1]:.1%}-{overall[2]:.1%})" if overall else ""
+        lines.append(f"Overall Accuracy: {self.get_overall_accuracy():.2%}{ci}")
+        hedging = (self.log.get("eval", {}).get("metadata") or {}).get("hedging")
+        if hedging:
+            lines.append(f"Hedged Calls: {hedging['hedges']}/{hedging['calls']} "
+                         f"(backup won {hedging['hedge_wins']}, {hedging['wasted_tokens']} wasted tokens)")
 
         # Category breakdown
         lines.append("\n" + "-" * 40)
@@ -201,7 +429,8 @@ class LogAnalyzer:
             acc = correct / total if total > 0 else 0
             lines.append(f"\n{category}:")
             lines.append(f"  Total: {total}")
-            lines.append(f"  Correct: {correct} ({acc:.0%})")
+            estimate = intervals.get(("correct", category))
+            lines.append(f"  Correct: {correct} ({format_ci(estimate) if estimate else f'{acc:.0%}'})")
             lines.append(f"  Incorrect: {stats['incorrect']}")
             lines.append(f"  Partial: {stats['partial']}")
 
@@ -213,11 +442,59 @@ class LogAnalyzer:
         refusals = self.get_refusal_metrics()
         lines.append(f"\nTotal Refusals: {refusals['total_refusals']}")
         lines.append(f"Appropriate Refusals: {refusals['appropriate_refusals']}")
-        lines.append(f"Over-Refusals: {refusals['over_refusals']}")
-        lines.append(f"Under-Refusals (Hallucinations): {refusals['under_refusals']}")
+        lines.append(f"Over-Refusals: {refusals['over_refusals']}{_rate_ci(intervals.get(('over_refusal', 'ALL')))}")
+        lines.append(f"Under-Refusals (Hallucinations): {refusals['under_refusals']}"
+                     f"{_rate_ci(intervals.get(('under_refusal', 'ALL')))}")
         lines.append(f"Apologetic Refusals: {refusals['apologetic_refusals']}")
         lines.append(f"Verbose Refusals: {refusals['verbose_refusals']}")
 
+        # Failure taxonomy
+        lines.append("\n" + "-" * 40)
+        lines.append("FAILURE TAXONOMY (local classifier)")
+        lines.append("-" * 40)
+
+        taxonomy = self.get_failure_taxonomy()
+        if not taxonomy:
+            lines.append("\nNo failed samples.")
+        for label, count in sorted(taxonomy.items(), key=lambda x: -x[1]):
+            lines.append(f"  {label}: {count}")
+
+        # Lexical groundedness
+        lines.append("\n" + "-" * 40)
+        lines.append("LEXICAL GROUNDEDNESS")
+        lines.append("-" * 40)
+
+        grounding = self.get_groundedness()
+        lines.append(f"\nMean Support Ratio: {grounding['mean_support']:.2f} over {grounding['answers']} answers")
+        lines.append(f"Answers With Unsupported Spans: {len(grounding['flagged'])}")
+        if grounding["skipped"]:
+            lines.append(f"Skipped (no Context: in the input): {grounding['skipped']}")
+        for item in grounding["flagged"][:3]:
+            spans = ", ".join(span["text"] for span in item["unsupported"][:5])
+            lines.append(f"  {item['category']}: {spans}")
+
+        # Tool parallelism
+        parallel = self.get_tool_parallelism()
+        if parallel["turns"]:
+            lines.append("\n" + "-" * 40)
+            lines.append("TOOL PARALLELISM (multi-call turns)")
+            lines.append("-" * 40)
+            lines.append(f"\nTurns: {parallel['turns']}  Calls: {parallel['calls']}")
+            lines.append(f"Tool time: {parallel['serial']:.2f}s serial -> {parallel['wall']:.2f}s wall "
+                         f"({parallel['speedup']:.2f}x)")
+
+        # Output budget
+        budget = self.get_output_budget()
+        if budget["samples"]:
+            lines.append("\n" + "-" * 40)
+            lines.append("OUTPUT BUDGET (per-category max_tokens)")
+            lines.append("-" * 40)
+            lines.append(f"\nOutput Tokens: {budget['output_tokens']} over {budget['samples']} samples")
+            unknown = f" (+{budget['unknown_stops']} unknown)" if budget["unknown_stops"] else ""
+            lines.append(f"Stopped After Refusal Sentence: {budget['early_stops']}{unknown}")
+            cut = ", ".join(f"{category}: {count}" for category, count in sorted(Counter(budget["truncated"]).items()))
+            lines.append(f"Cut At Budget: {len(budget['truncated'])}{f' ({cut})' if cut else ''}")
+
         # Failure examples
         lines.append("\n" + "-" * 40)
         lines.append("FAILURE EXAMPLES (First per category)")
@@ -236,11 +513,812 @@ class LogAnalyzer:
 
         return "\n".join(lines)
 
+# RUN HISTORY & REGRESSION DETECTION
+HISTORY_NAME = ".run_history"  # JSON, but not *.json so log globs skip it
+
+
+def summarize_run(log_path: Path) -> Optional[Dict]:
+    """Stream one log into a compact per-run summary (never holds more than one sample in memory)."""
+    summary = {
+        "log": str(log_path), "task": "unknown", "model": "unknown", "started_at": "",
+        "n": 0, "correct": 0, "categories": {}, "refusals": 0,
+        "under_refusals": 0, "over_refusals": 0, "expected_refuse": 0, "expected_answer": 0,
+        "latency": [], "tokens": []
+    }
+    first_sample_start = None
+    try:
+        for doc in iter_log_documents(log_path, events=False):
+            if isinstance(doc, dict) and "eval" in doc:
+                summary["task"] = doc["eval"].get("task", summary["task"])
+                summary["model"] = doc["eval"].get("model", summary["model"])
+                summary["started_at"] = doc.get("stats", {}).get("started_at", summary["started_at"])
+                samples = doc.get("samples") or []
+            elif is_sample_document(doc):
+                samples = [doc]
+            else:
+                continue
+            for sample in samples:
+                if first_sample_start is None:
+                    first_sample_start = sample.get("started_at")
+                _add_sample_to_summary(summary, sample)
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"Warning: Could not summarize {log_path}: {e}")
+        return None
+    summary["started_at"] = summary["started_at"] or first_sample_start or ""
+    return summary if summary["n"] else None
+
+
+def _add_sample_to_summary(summary: Dict, sample: Dict):
+    score = primary_score(sample)
+    if not score:
+        return
+    metadata = sample.get("metadata", {})
+    category = metadata.get("category", "UNKNOWN")
+    expected = metadata.get("expected_behavior", "")
+    correct = 1 if score.get("value") in ("C", "CORRECT") else 0
+    refused = is_refusal(score.get("answer") or "")
+
+    summary["n"] += 1
+    summary["correct"] += correct
+    cat = summary["categories"].setdefault(category, [0, 0])
+    cat[0] += correct
+    cat[1] += 1
+    summary["refusals"] += refused
+    if expected == "refuse":
+        summary["expected_refuse"] += 1
+        summary["under_refusals"] += not refused
+    elif expected == "answer":
+        summary["expected_answer"] += 1
+        summary["over_refusals"] += refused
+    if sample.get("total_time") is not None:
+        summary["latency"].append(sample["total_time"])
+    usage = sample.get("model_usage", {})
+    summary["tokens"].append(sum(u.get("total_tokens", 0) for u in usage.values()))
+
+
+def _one_sided_proportion_p(c_base: int, n_base: int, c_new: int, n_new: int) -> float:
+    """
+    P-value that the new success rate is LOWER than the baseline rate.
+
+    Exact one-sided Fisher test for small tables (our 8-32 sample runs), pooled two-proportion
+    z-test once both runs are large.
+    """
+    if n_base == 0 or n_new == 0:
+        return 1.0
+    if n_base + n_new <= 400:
+        total_c, total_n = c_base + c_new, n_base + n_new
+        denom = math.comb(total_n, n_new)
+        lo = max(0, total_c - n_base)
+        return sum(math.comb(total_c, k) * math.comb(total_n - total_c, n_new - k)
+                   for k in range(lo, c_new + 1)) / denom
+    p_pool = (c_base + c_new) / (n_base + n_new)
+    se = math.sqrt(p_pool * (1 - p_pool) * (1 / n_base + 1 / n_new))
+    if se == 0:
+        return 1.0
+    z = (c_new / n_new - c_base / n_base) / se
+    return 0.5 * math.erfc(-z / math.sqrt(2))
+
+
+def _one_sided_mean_increase_p(base: List[float], new: List[float]) -> float:
+    """P-value that the new mean is HIGHER than the baseline mean (Welch, normal approximation)."""
+    if len(base) < 2 or len(new) < 2:
+        return 1.0
+    var_b, var_n = statistics.variance(base), statistics.variance(new)
+    se = math.sqrt(var_b / len(base) + var_n / len(new))
+    if se == 0:
+        return 1.0
+    z = (statistics.mean(new) - statistics.mean(base)) / se
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def detect_change_point(series: List[tuple]) -> Optional[Dict]:
+    """
+    Single change point in a sequence of (correct, total) runs.
+
+    Picks the split that maximises the binomial log-likelihood ratio of two segments vs one;
+    reported only when 2*LLR exceeds the chi-square(1) 95% critical value (3.84).
+    """
+    def loglik(c, n):
+        if n == 0 or c == 0 or c == n:
+            return 0.0
+        p = c / n
+        return c * math.log(p) + (n - c) * math.log(1 - p)
+
+    if len(series) < 3:
+        return None
+    total_c = sum(c for c, _ in series)
+    total_n = sum(n for _, n in series)
+    best = None
+    left_c = left_n = 0
+    for k in range(1, len(series)):
+        left_c += series[k - 1][0]
+        left_n += series[k - 1][1]
+        right_c, right_n = total_c - left_c, total_n - left_n
+        llr = loglik(left_c, left_n) + loglik(right_c, right_n) - loglik(total_c, total_n)
+        if best is None or llr > best["llr"]:
+            best = {"index": k, "llr": llr,
+                    "before": left_c / left_n if left_n else 0.0,
+                    "after": right_c / right_n if right_n else 0.0}
+    return best if best and 2 * best["llr"] > 3.84 else None
+
+
+class RunHistory:
+    """Per-run summaries for every log, grouped into (task, model) time series; refreshed incrementally."""
+
+    def __init__(self, log_dir: Path, path: Optional[Path] = None):
+        self.log_dir = Path(log_dir)
+        self.path = Path(path) if path else self.log_dir / HISTORY_NAME
+        self.logs: Dict[str, List] = {}
+        self.runs: Dict[str, Dict] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.logs = data.get("logs", {})
+            self.runs = data.get("runs", {})
+
+    def refresh(self) -> int:
+        """Summarize only logs that are new or changed since the last refresh."""
+        scanned = 0
+        for log_path, signature in changed_logs(self.log_dir, self.logs, skip=self.path):
+            summary = summarize_run(log_path)
+            if summary:
+                self.runs[str(log_path)] = summary
+            self.logs[str(log_path)] = signature
+            scanned += 1
+        if scanned:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"logs": self.logs, "runs": self.runs}, f)
+        return scanned
+
+    def series(self) -> Dict[tuple, List[Dict]]:
+        """(task, model) -> runs ordered by start time."""
+        grouped = defaultdict(list)
+        for run in self.runs.values():
+            grouped[(run["task"], run["model"])].append(run)
+        for runs in grouped.values():
+            runs.sort(key=lambda r: r["started_at"])
+        return dict(grouped)
+
+
+def find_regressions(baseline: Dict, run: Dict, alpha: float = 0.05) -> List[str]:
+    """Metrics of run that are significantly worse than baseline."""
+    flagged = []
+
+    def check_rate(label, c_base, n_base, c_new, n_new):
+        p = _one_sided_proportion_p(c_base, n_base, c_new, n_new)
+        if p < alpha:
+            flagged.append(f"{label}: {c_base / n_base:.0%} -> {c_new / n_new:.0%} (p={p:.3f})")
+
+    check_rate("accuracy", baseline["correct"], baseline["n"], run["correct"], run["n"])
+    for category, (c_new, n_new) in sorted(run["categories"].items()):
+        if category in baseline["categories"]:
+            c_base, n_base = baseline["categories"][category]
+            check_rate(f"{category} accuracy", c_base, n_base, c_new, n_new)
+    # appropriate refusal rate: refusing when the sample expects a refusal
+    if baseline["expected_refuse"] and run["expected_refuse"]:
+        check_rate("refusal when expected",
+                   baseline["expected_refuse"] - baseline["under_refusals"], baseline["expected_refuse"],
+                   run["expected_refuse"] - run["under_refusals"], run["expected_refuse"])
+    if baseline["expected_answer"] and run["expected_answer"]:
+        check_rate("answering when expected",
+                   baseline["expected_answer"] - baseline["over_refusals"], baseline["expected_answer"],
+                   run["expected_answer"] - run["over_refusals"], run["expected_answer"])
+    for label, key, unit in (("latency", "latency", "s"), ("tokens/sample", "tokens", "")):
+        p = _one_sided_mean_increase_p(baseline[key], run[key])
+        if p < alpha:
+            flagged.append(f"{label}: {statistics.mean(baseline[key]):.1f}{unit} -> "
+                           f"{statistics.mean(run[key]):.1f}{unit} (p={p:.3f})")
+    return flagged
+
+
+def _pool_runs(runs: List[Dict]) -> Dict:
+    """Merge several run summaries into one (used for the pooled baseline)."""
+    pooled = {"n": 0, "correct": 0, "categories": {}, "refusals": 0, "under_refusals": 0,
+              "over_refusals": 0, "expected_refuse": 0, "expected_answer": 0, "latency": [], "tokens": []}
+    for run in runs:
+        for key in ("n", "correct", "refusals", "under_refusals", "over_refusals",
+                    "expected_refuse", "expected_answer"):
+            pooled[key] += run[key]
+        pooled["latency"].extend(run["latency"])
+        pooled["tokens"].extend(run["tokens"])
+        for category, (c, n) in run["categories"].items():
+            cat = pooled["categories"].setdefault(category, [0, 0])
+            cat[0] += c
+            cat[1] += n
+    return pooled
+
+
+def history_report(history: RunHistory, baseline: str = "first", alpha: float = 0.05) -> str:
+    """Time-series table per (task, model) with regressions of the latest run and change points."""
+    lines = []
+    lines.append("=" * 70)
+    lines.append("RUN HISTORY & REGRESSION REPORT")
+    lines.append("=" * 70)
+
+    series = history.series()
+    if not series:
+        lines.append("\nNo runs found.")
+        return "\n".join(lines)
+
+    for (task, model), runs in sorted(series.items()):
+        lines.append(f"\n{task} | {model} ({len(runs)} runs)")
+        lines.append(f"  {'started':<26}{'acc':>6}{'refusal':>9}{'p50 lat':>9}{'tok/sample':>12}")
+        for run in runs:
+            refusal_rate = run["refusals"] / run["n"] if run["n"] else 0
+            p50 = f"{statistics.median(run['latency']):.1f}s" if run["latency"] else "-"
+            tokens = f"{statistics.mean(run['tokens']):.0f}" if run["tokens"] else "-"
+            lines.append(f"  {run['started_at'][:25]:<26}{run['correct'] / run['n']:>6.0%}"
+                         f"{refusal_rate:>9.0%}{p50:>9}{tokens:>12}")
+
+        if len(runs) < 2:
+            continue
+        latest = runs[-1]
+        if baseline == "previous":
+            base = runs[-2]
+        elif baseline == "pooled":
+            base = _pool_runs(runs[:-1])
+        else:
+            base = runs[0]
+        regressions = find_regressions(base, latest, alpha)
+        lines.append(f"  Latest vs {baseline} baseline: " + ("no significant regressions" if not regressions else ""))
+        for regression in regressions:
+            lines.append(f"    REGRESSION {regression}")
+
+        change = detect_change_point([(r["correct"], r["n"]) for r in runs])
+        if change:
+            lines.append(f"  Change point before run {change['index'] + 1}: "
+                         f"accuracy {change['before']:.0%} -> {change['after']:.0%}")
+
+    lines.append("\n" + "=" * 70)
+    return "\n".join(lines)
+
+# PAIRED RUN DIFF
+def iter_sample_outcomes(log_path: Path) -> Iterator[Dict]:
+    """Stream compact per-sample outcomes (id, epoch, score, refusal, category) from one log."""
+    for doc in iter_log_documents(log_path, events=False):
+        if is_sample_document(doc):
+            samples = [doc]
+        elif isinstance(doc, dict) and doc.get("samples"):
+            samples = doc["samples"]  # plain JSON log
+        else:
+            continue
+        for sample in samples:
+            score = primary_score(sample)
+            metadata = sample.get("metadata", {})
+            input_text = sample.get("input", "")
+            if not isinstance(input_text, str):
+                input_text = json.dumps(input_text)
+            yield {
+                "id": sample.get("id"),
+                "epoch": sample.get("epoch", 1),
+                "input": input_text,
+                "value": score.get("value", "?"),
+                "state": "refusal" if is_refusal(score.get("answer") or "") else "answer",
+                "category": metadata.get("category", "UNKNOWN"),
+                "behavior_type": metadata.get("behavior_type", "")
+            }
+
+
+def _align_key(outcome: Dict, align: str) -> tuple:
+    if align == "input":
+        return (outcome["input"], outcome["epoch"])
+    return (outcome["id"], outcome["epoch"])
+
+
+def mcnemar_p(b: int, c: int) -> float:
+    """Exact two-sided McNemar p-value from the discordant counts b (C->I) and c (I->C)."""
+    n = b + c
+    if n == 0:
+        return 1.0
+    k = min(b, c)
+    tail = sum(math.comb(n, i) for i in range(k + 1)) / 2 ** n
+    return min(1.0, 2 * tail)
+
+
+def diff_runs(reference: Path, other: Path, align: str = "id") -> Dict:
+    """
+    Pair the samples of two runs and collect transitions.
+
+    Only the reference run is kept in memory, and only as compact outcomes; the other run is
+    streamed document by document and matched on the fly.
+    """
+    ref = {_align_key(o, align): o for o in iter_sample_outcomes(reference)}
+    transitions = defaultdict(list)
+    table = {"CC": 0, "CI": 0, "IC": 0, "II": 0}
+    matched = 0
+    for outcome in iter_sample_outcomes(other):
+        base = ref.pop(_align_key(outcome, align), None)
+        if base is None:
+            continue
+        matched += 1
+        before = "C" if base["value"] in ("C", "CORRECT") else "I"
+        after = "C" if outcome["value"] in ("C", "CORRECT") else "I"
+        table[before + after] += 1
+        if before != after:
+            transitions[f"{before}->{after}"].append((base, outcome))
+        if base["state"] != outcome["state"]:
+            transitions[f"{base['state']}->{outcome['state']}"].append((base, outcome))
+    return {
+        "reference": str(reference), "other": str(other), "matched": matched,
+        "unmatched": len(ref), "table": table, "transitions": dict(transitions),
+        "p_value": mcnemar_p(table["CI"], table["IC"])
+    }
+
+
+def diff_report(log_paths: List[Path], align: str = "id") -> str:
+    """Per-sample paired diff of each log against the first one."""
+    lines = []
+    lines.append("=" * 70)
+    lines.append("PAIRED RUN DIFF")
+    lines.append("=" * 70)
+    reference = log_paths[0]
+    lines.append(f"\nReference: {reference}")
+
+    for other in log_paths[1:]:
+        diff = diff_runs(reference, other, align)
+        table = diff["table"]
+        lines.append("\n" + "-" * 50)
+        lines.append(f"vs {other}")
+        lines.append("-" * 50)
+        lines.append(f"Paired samples: {diff['matched']} (unmatched in reference: {diff['unmatched']})")
+        lines.append(f"  both correct: {table['CC']}  both incorrect: {table['II']}")
+        lines.append(f"  C->I: {table['CI']}  I->C: {table['IC']}")
+        verdict = "significant" if diff["p_value"] < 0.05 else "not significant"
+        lines.append(f"  McNemar exact p = {diff['p_value']:.3f} ({verdict})")
+
+        for name, pairs in sorted(diff["transitions"].items()):
+            lines.append(f"\n{name} ({len(pairs)}):")
+            for base, outcome in sorted(pairs, key=lambda pair: (str(pair[0]["id"]), pair[0]["epoch"])):
+                behavior = f" [{base['behavior_type']}]" if base["behavior_type"] else ""
+                lines.append(f"  id={base['id']} epoch={base['epoch']} {base['category']}{behavior}: "
+                             f"{base['input'][:60]}...")
+
+    lines.append("\n" + "=" * 70)
+    return "\n".join(lines)
+
+# SAMPLE DRILL-DOWN
+def failures_report(log_path: Path) -> str:
+    """Failed samples of one log, listed from its offset index (no sample is decoded)."""
+    outcomes = sample_outcomes(log_path)
+    failed = [(sid, epoch, value) for sid, epoch, value in outcomes if value not in ("C", "CORRECT")]
+    lines = [f"{log_path}", f"Samples: {len(outcomes)}  Failed: {len(failed)}", ""]
+    for sid, epoch, value in sorted(failed, key=lambda f: (str(f[0]), f[1])):
+        lines.append(f"  id={sid} epoch={epoch} score={value}")
+    lines.append(f"\nShow one: python log_analysis.py --show {log_path} <id> [epoch]")
+    return "\n".join(lines)
+
+
+def show_sample(log_path: Path, sample_id: str, epoch: int = 1) -> str:
+    """Everything needed to debug one sample, decoded alone from its byte range."""
+    sample = read_sample(log_path, sample_id, epoch)
+    if sample is None:
+        return f"No sample id={sample_id} epoch={epoch} in {log_path}"
+    score = primary_score(sample)
+    metadata = sample.get("metadata", {})
+    input_text = sample.get("input", "")
+    if not isinstance(input_text, str):
+        input_text = json.dumps(input_text, indent=2)
+    answer = score.get("answer") or sample.get("output", {}).get("completion", "")
+
+    lines = []
+    lines.append("=" * 70)
+    lines.append(f"SAMPLE id={sample.get('id')} epoch={sample.get('epoch', 1)}")
+    lines.append("=" * 70)
+    lines.append(f"Log: {log_path}")
+    for key in ("category", "expected_behavior", "behavior_type", "requires_tool"):
+        if metadata.get(key):
+            lines.append(f"{key}: {metadata[key]}")
+    lines.append(f"\nINPUT:\n{input_text}")
+    lines.append(f"\nTARGET:\n{sample.get('target', '')}")
+    lines.append(f"\nANSWER:\n{answer}")
+    for name, score_data in sample.get("scores", {}).items():
+        lines.append(f"\nSCORE [{name}]: {score_data.get('value')}")
+        if score_data.get("explanation"):
+            lines.append(f"  {score_data['explanation'][:500]}")
+
+    if score and score.get("value") not in ("C", "CORRECT") and isinstance(sample.get("input"), str):
+        label, reason = classify_failure(input_text, answer, metadata.get("expected_behavior", ""))
+        lines.append(f"\nFAILURE TYPE: {label} ({reason})")
+    if isinstance(sample.get("input"), str):
+        grounding = check_groundedness(input_text, answer)
+        lines.append(f"GROUNDEDNESS: {grounding['support_ratio']:.0%} of {grounding['claims']} claims supported")
+        for span in grounding["unsupported"]:
+            lines.append(f"  unsupported {span['kind']}: {span['text']}")
+    lines.append(f"\nTime: {sample.get('total_time', '?')}s  Tokens: "
+                 f"{sum(u.get('total_tokens', 0) for u in sample.get('model_usage', {}).values())}")
+    lines.append("=" * 70)
+    return "\n".join(lines)
+
+# LIVE MONITOR
+DOC_TOKENS = re.compile(rb'[{}\[\]"]')  # structural bytes outside strings
+STRING_TOKENS = re.compile(rb'["\\]')     # bytes that can end a string
+RECENT_SECONDS = 600  # logs modified this recently are followed from the start
+WINDOW = 50  # samples in the rolling accuracy / latency window
+
+
+class LogTail:
+    """
+    Incremental decoder for one growing dump.
+
+    Each poll reads only the bytes appended since the previous poll. A byte-level scanner
+    (brace depth + string state, carried across polls) finds where top-level documents end,
+    so only complete documents are ever handed to json and a partial one is never re-parsed.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.bytes_read = 0
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0  # bytes consumed from the file
+        self.buffer = bytearray()  # read but not yet part of a complete document
+        self.scan = 0  # position in buffer the scanner has reached
+        self.start = 0
+        self.depth = 0
+        self.in_string = False
+
+    def poll(self) -> List[Any]:
+        """Documents completed by the bytes appended since the last poll."""
+        size = self.path.stat().st_size
+        if size < self.offset:  # truncated or rewritten: start over
+            self._reset()
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset += len(data)
+        self.bytes_read += len(data)
+        self.buffer += data
+        return self._scan()
+
+    def _scan(self) -> List[Any]:
+        docs, consumed = [], 0
+        buf, pos = self.buffer, self.scan
+        while True:
+            if self.in_string:
+                match = STRING_TOKENS.search(buf, pos)
+                if not match:
+                    pos = len(buf)
+                    break
+                if match.group() == b"\\":
+                    if match.end() >= len(buf):
+                        pos = match.start()  # escaped byte not read yet
+                        break
+                    pos = match.end() + 1
+                    continue
+                self.in_string = False
+                pos = match.end()
+                continue
+            match = DOC_TOKENS.search(buf, pos)
+            if not match:
+                pos = len(buf)
+                break
+            token = match.group()
+            pos = match.end()
+            if token == b'"':
+                self.in_string = True
+            elif token in (b"{", b"["):
+                if self.depth == 0:
+                    self.start = match.start()
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    docs.append(json.loads(bytes(buf[self.start:pos])))
+                    consumed = pos
+        del buf[:consumed]
+        self.scan = pos - consumed
+        self.start = max(self.start - consumed, 0)
+        return docs
+
+
+class LiveMonitor:
+    """Rolling accuracy / refusal / latency / throughput per task x model over tailed logs."""
+
+    def __init__(self, log_dir: Path, since: Optional[float] = None):
+        self.log_dir = Path(log_dir)
+        self.since = since if since is not None else datetime.now().timestamp() - RECENT_SECONDS
+        self.tails: Dict[str, LogTail] = {}
+        self.sources: Dict[str, tuple] = {}  # log -> (task, model)
+        self.stats: Dict[tuple, Dict] = {}
+
+    def _followed(self) -> Iterator[Path]:
+        """Dumps in the log directory that changed since the monitor's horizon (.glog files are immutable)."""
+        for pattern in LOG_PATTERNS:
+            if pattern.endswith(COMPACT_SUFFIX):
+                continue
+            for log_path in Path(self.log_dir).glob(f"**/{pattern}"):
+                if str(log_path) in self.tails or log_path.stat().st_mtime >= self.since:
+                    yield log_path
+
+    def poll(self) -> int:
+        """Read newly appended bytes of every followed log; returns new samples"""
+        added = 0
+        for log_path in self._followed():
+            tail = self.tails.setdefault(str(log_path), LogTail(log_path))
+            try:
+                docs = tail.poll()
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Warning: Could not follow {log_path}: {e}")
+                del self.tails[str(log_path)]
+                continue
+            for doc in docs:
+                if isinstance(doc, dict) and "eval" in doc:
+                    self.sources[str(log_path)] = (doc["eval"].get("task", "unknown"),
+                                                   doc["eval"].get("model", "unknown"))
+                    samples = doc.get("samples") or []
+                elif is_sample_document(doc):
+                    samples = [doc]
+                else:
+                    continue
+                for sample in samples:
+                    self._add(self.sources.get(str(log_path), ("unknown", "unknown")), sample)
+                    added += 1
+        return added
+
+    def _add(self, key: tuple, sample: Dict):
+        score = primary_score(sample)
+        if not score:
+            return
+        now = datetime.now().timestamp()
+        stats = self.stats.setdefault(key, {"n": 0, "correct": 0, "refusals": 0,
+                                            "window": deque(maxlen=WINDOW), "seen_at": deque()})
+        correct = score.get("value") in ("C", "CORRECT")
+        refused = is_refusal(score.get("answer") or "")
+        stats["n"] += 1
+        stats["correct"] += correct
+        stats["refusals"] += refused
+        stats["window"].append((correct, refused, sample.get("total_time")))
+        stats["seen_at"].append(now)
+        while now - stats["seen_at"][0] >= 60:
+            stats["seen_at"].popleft()
+
+    def render(self) -> str:
+        now = datetime.now().timestamp()
+        lines = [f"LIVE MONITOR  {self.log_dir}  {datetime.now():%H:%M:%S}  "
+                 f"logs followed: {len(self.tails)}  "
+                 f"bytes read: {sum(t.bytes_read for t in self.tails.values()):,}", ""]
+        lines.append(f"{'Task':<28} {'Model':<34} {'N':>5} {'Acc':>6} {f'Acc@{WINDOW}':>7} "
+                     f"{'Refuse':>7} {'p50 s':>6} {'p95 s':>6} {'/min':>6}")
+        lines.append("-" * 112)
+        for (task, model), stats in sorted(self.stats.items()):
+            window = stats["window"]
+            latencies = sorted(t for _, _, t in window if t is not None)
+            p50 = latencies[len(latencies) // 2] if latencies else 0.0
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+            per_min = len([t for t in stats["seen_at"] if now - t < 60])
+            lines.append(
+                f"{task[:28]:<28} {model[-34:]:<34} {stats['n']:>5} "
+                f"{stats['correct'] / stats['n']:>6.1%} {sum(c for c, _, _ in window) / len(window):>7.1%} "
+                f"{stats['refusals'] / stats['n']:>7.1%} {p50:>6.1f} {p95:>6.1f} {per_min:>6}"
+            )
+        if not self.stats:
+            lines.append("(waiting for samples)")
+        return "\n".join(lines)
+
+
+def follow(log_dir: Path, interval: float = 2.0, once: bool = False):
+    """Tail every in-flight log in log_dir and redraw the rolling stats until interrupted."""
+    monitor = LiveMonitor(log_dir)
+    try:
+        while True:
+            monitor.poll()
+            if once:
+                print(monitor.render())
+                return
+            print("\033[H\033[J" + monitor.render(), flush=True)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print()
+
+# TRACE EXPORT
+# Chrome trace (chrome://tracing, ui.perfetto.dev) and OTLP JSON (OpenTelemetry collectors, Jaeger)
+
+def _micros(timestamp: Optional[str]) -> Optional[int]:
+    """ISO timestamp -> microseconds since the epoch"""
+    if not timestamp:
+        return None
+    return int(datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp() * 1_000_000)
+
+
+def sample_spans(sample: Dict) -> Dict:
+    """
+    The timed spans of one sample, small enough to keep for a whole log while the
+    sample documents themselves are streamed and dropped.
+
+    Spans are (name, category, start us, end us, span id, parent id, args); end is None for
+    instant events (scores). A model call whose wall time exceeds its working time waited
+    for a connection slot first; that wait becomes its own "waiting" span.
+    """
+    spans, open_spans = [], {}
+    events = sample.get("events") or []
+    first = next((_micros(e.get("timestamp")) for e in events if e.get("timestamp")), None)
+    start = _micros(sample.get("started_at")) or first
+    end = _micros(sample.get("completed_at"))
+    for event in events:
+        kind, at = event.get("event"), _micros(event.get("timestamp"))
+        if at is None:
+            continue
+        if kind == "span_begin":
+            open_spans[event["id"]] = (event.get("name", ""), event.get("type") or "span", at, event.get("parent_id"))
+        elif kind == "span_end" and event.get("id") in open_spans:
+            name, category, begin, parent = open_spans.pop(event["id"])
+            spans.append((name, category, begin, at, event["id"], parent, {}))
+        elif kind in ("model", "tool"):
+            done = _micros(event.get("completed"))
+            working = event.get("working_time")
+            if done is None:
+                done = at + int((working or 0) * 1_000_000)
+            if kind == "model":
+                usage = (event.get("output") or {}).get("usage") or {}
+                name = f"model {event.get('model', '')}"
+                args = {"input_tokens": usage.get("input_tokens"), "output_tokens": usage.get("output_tokens")}
+            else:
+                name = f"tool {event.get('function', '')}"
+                args = {"error": (event.get("error") or {}).get("message")} if event.get("error") else {}
+            span_id = event.get("uuid") or f"{kind}-{at}"
+            spans.append((name, kind, at, done, span_id, event.get("span_id"), args))
+            wait = (done - at) - int((working or 0) * 1_000_000) if working is not None else 0
+            if wait > 1000:
+                spans.append(("waiting", "wait", at, at + wait, f"{span_id}-wait", span_id, {}))
+        elif kind == "score":
+            score = event.get("score") or {}
+            spans.append(("score", "score", at, None, event.get("uuid") or f"score-{at}", event.get("span_id"),
+                          {"value": score.get("value")}))
+        end = max(end or at, at)
+    for span_id, (name, category, begin, parent) in open_spans.items():
+        spans.append((name, category, begin, end, span_id, parent, {}))  # never closed: ends with the sample
+    score = primary_score(sample)
+    return {"id": sample.get("id"), "epoch": sample.get("epoch", 1), "uuid": sample.get("uuid"),
+            "start": start, "end": end, "spans": spans,
+            "args": {"score": score.get("value"), "total_time": sample.get("total_time"),
+                     "working_time": sample.get("working_time")}}
+
+
+def assign_slots(samples: List[Dict]) -> int:
+    """Give each sample the lowest slot free at its start (interval partitioning); returns slots used"""
+    import heapq
+
+    free, busy, slots = [], [], 0  # free slot numbers; (end, slot) of running samples
+    for sample in sorted(samples, key=lambda s: (s["start"] or 0, s["end"] or 0)):
+        while busy and busy[0][0] <= (sample["start"] or 0):
+            heapq.heappush(free, heapq.heappop(busy)[1])
+        slot = heapq.heappop(free) if free else slots
+        slots = max(slots, slot + 1)
+        sample["slot"] = slot
+        heapq.heappush(busy, (sample["end"] or sample["start"] or 0, slot))
+    return slots
+
+
+def iter_log_traces(log_paths: List[Path]) -> Iterator[Dict]:
+    """One entry per log: task, model and the slotted spans of every sample (documents are streamed)"""
+    for log_path in log_paths:
+        task, model, samples = None, None, []
+        for doc in iter_log_documents(log_path):
+            if is_sample_document(doc):
+                samples.append(sample_spans(doc))
+                continue
+            if not isinstance(doc, dict):
+                continue
+            if isinstance(doc.get("eval"), dict):
+                task, model = doc["eval"].get("task", task), doc["eval"].get("model", model)
+            for sample in doc.get("samples") or []:
+                samples.append(sample_spans(sample))
+        samples = [s for s in samples if s["start"] is not None]
+        slots = assign_slots(samples)
+        yield {"log": log_path.name, "task": task or log_path.stem, "model": model or "unknown",
+               "samples": samples, "slots": slots}
+
+
+class _JsonArrayWriter:
+    """Writes the elements of one JSON array as they come, so output never sits in memory."""
+
+    def __init__(self, f):
+        self.f = f
+        self.first = True
+
+    def write(self, item: Any):
+        self.f.write(("" if self.first else ",\n") + json.dumps(item, ensure_ascii=False))
+        self.first = False
+
+
+def _chrome_events(trace: Dict, pid: int) -> Iterator[Dict]:
+    yield {"ph": "M", "name": "process_name", "pid": pid, "args": {"name": f"{trace['task']} @ {trace['model']}"}}
+    for slot in range(trace["slots"]):
+        yield {"ph": "M", "name": "thread_name", "pid": pid, "tid": slot, "args": {"name": f"slot {slot}"}}
+    for sample in trace["samples"]:
+        tid = sample["slot"]
+        yield {"ph": "X", "name": f"sample {sample['id']} (epoch {sample['epoch']})", "cat": "sample",
+               "pid": pid, "tid": tid, "ts": sample["start"], "dur": max(0, sample["end"] - sample["start"]),
+               "args": sample["args"]}
+        for name, category, begin, end, _, _, args in sample["spans"]:
+            if end is None:
+                yield {"ph": "i", "s": "t", "name": name, "cat": category, "pid": pid, "tid": tid, "ts": begin,
+                       "args": args}
+            else:
+                yield {"ph": "X", "name": name, "cat": category, "pid": pid, "tid": tid, "ts": begin,
+                       "dur": max(0, end - begin), "args": args}
+
+
+def _otlp_id(value: Any, length: int) -> str:
+    """Deterministic hex trace/span id of the given length"""
+    import hashlib
+
+    return hashlib.sha1(str(value).encode("utf-8")).hexdigest()[:length]
+
+
+def _otlp_attributes(values: Dict) -> List[Dict]:
+    attributes = []
+    for key, value in values.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        attributes.append({"key": key, "value": typed})
+    return attributes
+
+
+def _otlp_spans(trace: Dict) -> Iterator[Dict]:
+    for sample in trace["samples"]:
+        trace_id = _otlp_id(f"{trace['log']}:{sample['uuid'] or (sample['id'], sample['epoch'])}", 32)
+        root = _otlp_id(f"{trace_id}:sample", 16)
+        yield {"traceId": trace_id, "spanId": root, "name": f"sample {sample['id']}", "kind": 1,
+               "startTimeUnixNano": str(sample["start"] * 1000), "endTimeUnixNano": str(sample["end"] * 1000),
+               "attributes": _otlp_attributes({"eval.sample_id": sample["id"], "eval.epoch": sample["epoch"],
+                                               "eval.slot": sample["slot"], **sample["args"]})}
+        known = {span[4] for span in sample["spans"]}
+        for name, category, begin, end, span_id, parent, args in sample["spans"]:
+            yield {"traceId": trace_id, "spanId": _otlp_id(f"{trace_id}:{span_id}", 16),
+                   "parentSpanId": _otlp_id(f"{trace_id}:{parent}", 16) if parent in known else root,
+                   "name": name, "kind": 1, "startTimeUnixNano": str(begin * 1000),
+                   "endTimeUnixNano": str((begin if end is None else end) * 1000),
+                   "attributes": _otlp_attributes({"eval.category": category, "eval.slot": sample["slot"], **args})}
+
+
+def export_traces(log_paths: List[Path], out_prefix: str = "trace") -> tuple:
+    """
+    Write <out_prefix>.chrome.json and <out_prefix>.otlp.json for the given logs.
+
+    Each log is one process (Chrome) / resource (OTLP); each concurrent sample slot is one
+    thread track, so idle gaps, connection waits and serialized scoring line up across the run.
+    Returns (chrome path, otlp path, samples exported).
+    """
+    chrome_path, otlp_path = Path(f"{out_prefix}.chrome.json"), Path(f"{out_prefix}.otlp.json")
+    exported = 0
+    with open(chrome_path, "w", encoding="utf-8") as chrome, open(otlp_path, "w", encoding="utf-8") as otlp:
+        chrome.write('{"displayTimeUnit": "ms", "traceEvents": [\n')
+        otlp.write('{"resourceSpans": [\n')
+        events = _JsonArrayWriter(chrome)
+        for pid, trace in enumerate(iter_log_traces(log_paths), start=1):
+            for event in _chrome_events(trace, pid):
+                events.write(event)
+            resource = {"attributes": _otlp_attributes({"service.name": "groundedevals", "eval.log": trace["log"],
+                                                        "eval.task": trace["task"], "eval.model": trace["model"]})}
+            otlp.write(("" if pid == 1 else ",\n") + '{"resource": ' + json.dumps(resource) +
+                       ', "scopeSpans": [{"scope": {"name": "log_analysis"}, "spans": [\n')
+            spans = _JsonArrayWriter(otlp)
+            for span in _otlp_spans(trace):
+                spans.write(span)
+            otlp.write("\n]}]}")
+            exported += len(trace["samples"])
+        chrome.write("\n]}\n")
+        otlp.write("\n]}\n")
+    return chrome_path, otlp_path, exported
+
 # MULTI-MODEL COMPARISON
 
 def compare_models(log_files: List[Path]) -> str:
     """Compare results across multiple model evaluation logs."""
     model_results = {}
+    skipped_runs = defaultdict(int)
 
     for log_path in log_files:
         log_data = load_log_file(log_path)
@@ -250,10 +1328,15 @@ def compare_models(log_files: List[Path]) -> str:
 
             if model not in model_results:
                 model_results[model] = {
+                    "task": analyzer.task,
                     "accuracy": analyzer.get_overall_accuracy(),
                     "breakdown": analyzer.get_category_breakdown(),
-                    "refusals": analyzer.get_refusal_metrics()
+                    "refusals": analyzer.get_refusal_metrics(),
+                    "taxonomy": analyzer.get_failure_taxonomy(),
+                    "values": analyzer.get_sample_values()
                 }
+            else:
+                skipped_runs[model] += 1
 
     # Generate comparison report
     lines = []
@@ -270,8 +1353,17 @@ def compare_models(log_files: List[Path]) -> str:
     lines.append("OVERALL ACCURACY")
     lines.append("-" * 50)
 
-    for model, results in sorted(model_results.items(), key=lambda x: x[1]["accuracy"], reverse=True):
-        lines.append(f"  {model}: {results['accuracy']:.2%}")
+    # every model's intervals in one resampling pass
+    groups = {}
+    for model, results in model_results.items():
+        groups.update(metric_groups(results["values"], prefix=(model,)))
+    intervals = bootstrap_means(groups)
+
+    ranked = sorted(model_results.items(), key=lambda x: x[1]["accuracy"], reverse=True)
+    for model, results in ranked:
+        overall = intervals.get((model, "accuracy", "ALL"))
+        ci = f"  ({CONFIDENCE:.0%} CI {overall[1]:.1%}-{overall[2]:.1%})" if overall else ""
+        lines.append(f"  {model}: {results['accuracy']:.2%}{ci}")
 
     # Category comparison
     lines.append("\n" + "-" * 50)
@@ -287,7 +1379,8 @@ def compare_models(log_files: List[Path]) -> str:
         for model, results in model_results.items():
             bd = results["breakdown"].get(category, {"total": 0, "correct": 0})
             acc = bd["correct"] / bd["total"] if bd["total"] > 0 else 0
-            lines.append(f"  {model}: {acc:.0%}")
+            estimate = intervals.get((model, "correct", category))
+            lines.append(f"  {model}: {format_ci(estimate) if estimate else f'{acc:.0%}'}")
 
     # Refusal behavior comparison
     lines.append("\n" + "-" * 50)
@@ -297,22 +1390,128 @@ def compare_models(log_files: List[Path]) -> str:
     for model, results in model_results.items():
         ref = results["refusals"]
         lines.append(f"\n{model}:")
-        lines.append(f"  Over-refusal rate: {ref['over_refusals']}")
-        lines.append(f"  Under-refusal rate: {ref['under_refusals']}")
+        lines.append(f"  Over-refusals: {ref['over_refusals']}{_rate_ci(intervals.get((model, 'over_refusal', 'ALL')))}")
+        lines.append(f"  Under-refusals: {ref['under_refusals']}"
+                     f"{_rate_ci(intervals.get((model, 'under_refusal', 'ALL')))}")
         lines.append(f"  Apologetic: {ref['apologetic_refusals']}")
 
+    # Paired deltas against the most accurate model
+    if len(ranked) > 1:
+        best = ranked[0][0]
+        reference = {}
+        for v in model_results[best]["values"]:
+            reference.setdefault(v["key"], v)
+        pairs = defaultdict(list)
+        for model, results in ranked[1:]:
+            if results["task"] != model_results[best]["task"]:
+                continue
+            for v in results["values"]:
+                base = reference.get(v["key"])
+                if base is None:
+                    continue
+                pairs[(model, "accuracy", "ALL")].append((v["credit"], base["credit"]))
+                pairs[(model, "refusal", "ALL")].append((v["refused"], base["refused"]))
+                if v["category"] == base["category"]:
+                    pairs[(model, "correct", v["category"])].append((v["correct"], base["correct"]))
+        deltas = paired_deltas(pairs)
+
+        def flag(delta):
+            return " *" if excludes_zero(delta) else ""
+
+        lines.append("\n" + "-" * 50)
+        lines.append(f"PAIRED DELTAS vs {best} ({CONFIDENCE:.0%} bootstrap CI, * = excludes 0)")
+        lines.append("-" * 50)
+        for model, results in ranked[1:]:
+            if results["task"] != model_results[best]["task"]:
+                lines.append(f"\n{model}: skipped, compared log is task {results['task']}, "
+                             f"reference is {model_results[best]['task']}")
+                continue
+            accuracy = deltas.get((model, "accuracy", "ALL"))
+            if accuracy is None:
+                lines.append(f"\n{model}: no samples in common (matched on task + id + epoch)")
+                continue
+            lines.append(f"\n{model} ({accuracy[3]} paired samples):")
+            lines.append(f"  Accuracy: {format_ci(accuracy, signed=True)}{flag(accuracy)}")
+            refusal = deltas[(model, "refusal", "ALL")]
+            lines.append(f"  Refusal rate: {format_ci(refusal, signed=True)}{flag(refusal)}")
+            for category in sorted(categories):
+                delta = deltas.get((model, "correct", category))
+                if delta:
+                    lines.append(f"  {category}: {format_ci(delta, signed=True)}{flag(delta)}")
+
+    # Failure taxonomy comparison
+    lines.append("\n" + "-" * 50)
+    lines.append("FAILURE TAXONOMY")
+    lines.append("-" * 50)
+
+    for model, results in model_results.items():
+        taxonomy = results["taxonomy"]
+        summary = ", ".join(f"{label}: {count}" for label, count in sorted(taxonomy.items())) or "no failures"
+        lines.append(f"  {model}: {summary}")
+
+    if skipped_runs:
+        lines.append("\nOnly the first log per model is compared; other runs per model:")
+        for model, count in sorted(skipped_runs.items()):
+            lines.append(f"  {model}: {count} (see --history for every run)")
+
     lines.append("\n" + "=" * 70)
 
     return "\n".join(lines)
 
 # MAIN
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Inspect AI Log Analysis Tool")
+    parser.add_argument("log_dir", nargs="?", default=None, help="log directory (auto-detected if omitted)")
+    parser.add_argument("--history", action="store_true",
+                        help="time series of every run per task/model with regression flags")
+    parser.add_argument("--baseline", choices=["first", "previous", "pooled"], default="first",
+                        help="baseline the latest run is tested against (with --history)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level for regressions")
+    parser.add_argument("--diff", nargs="+", metavar="LOG", default=None,
+                        help="paired per-sample diff of each LOG against the first one")
+    parser.add_argument("--align", choices=["id", "input"], default="id",
+                        help="pair samples by (id, epoch) or by (input text, epoch) (with --diff)")
+    parser.add_argument("--show", nargs="+", metavar=("LOG", "ID"), default=None,
+                        help="LOG: list failed samples; LOG ID [EPOCH]: show one sample (indexed lookup)")
+    parser.add_argument("--follow", action="store_true",
+                        help="tail in-flight logs and keep rolling stats per task/model on screen")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between polls (with --follow)")
+    parser.add_argument("--once", action="store_true", help="with --follow: poll once, print and exit")
+    parser.add_argument("--trace", nargs="+", metavar="LOG", default=None,
+                        help="export the sample spans of LOG(s) as Chrome trace and OTLP JSON")
+    parser.add_argument("--trace-out", default="trace",
+                        help="output prefix: PREFIX.chrome.json and PREFIX.otlp.json (with --trace)")
+    return parser.parse_args(argv)
+
+
 def main():
+    args = parse_args()
     print("Inspect AI Log Analysis Tool")
     print("=" * 40)
 
+    if args.diff:
+        if len(args.diff) < 2:
+            print("--diff needs at least two logs")
+            return
+        print(diff_report([Path(p) for p in args.diff], align=args.align))
+        return
+
+    if args.trace:
+        chrome_path, otlp_path, exported = export_traces([Path(p) for p in args.trace], args.trace_out)
+        print(f"Exported {exported} samples to {chrome_path} (chrome://tracing, ui.perfetto.dev) and {otlp_path}")
+        return
+
+    if args.show:
+        log_path = Path(args.show[0])
+        if len(args.show) == 1:
+            print(failures_report(log_path))
+        else:
+            print(show_sample(log_path, args.show[1], int(args.show[2]) if len(args.show) > 2 else 1))
+        return
+
     # Find log directory
-    if len(sys.argv) > 1:
-        log_dir = Path(sys.argv[1])
+    if args.log_dir:
+        log_dir = Path(args.log_dir)
     else:
         log_dir = find_log_directory()
 
@@ -324,6 +1523,17 @@ def main():
         print("  inspect eval hallucination_eval.py@hallucination_full_eval --model bedrock/anthropic.claude-3-sonnet-20240229-v1:0")
         return
 
+    if args.follow:
+        follow(log_dir, interval=args.interval, once=args.once)
+        return
+
+    if args.history:
+        history = RunHistory(log_dir)
+        scanned = history.refresh()
+        print(f"Run history: {len(history.runs)} runs ({scanned} new/changed logs scanned)\n")
+        print(history_report(history, baseline=args.baseline, alpha=args.alpha))
+        return
+
     # Get recent logs
     recent_logs = get_recent_logs(log_dir, limit=10)
 
@@ -0,0 +1,491 @@
+"""
+Compact Log Storage:Deduplicated, compressed, randomly-accessible copies of Inspect log dumps.
+
+A .glog file stores the same JSON documents as the dump it was made from, but:
+1)interned strings: system prompts, tool schemas, model names, attachment ids ... every string
+  of INTERN_MIN_LEN+ characters that occurs more than once is stored ONCE in a string table
+2)delta-encoded events: each transcript event (state, model, span_begin ...) only keeps the fields
+  that differ from the previous event of the same type
+3)per-document compression: every document (header, sample, summary) is its own zlib block
+4)offset index: block offsets keyed by kind / sample id / epoch, so one sample is read with a
+  single seek + decompress instead of parsing the whole dump
+
+Trade-off (--bench on src/logs): the .glog is ~10x smaller and a one-sample lookup is ~5x faster,
+readers that skip events (report, history, diff) parse ~25% faster, but a FULL parse including
+events is ~1.6x SLOWER than the raw dump, since every interned string and event delta is resolved.
+Prefer the raw dump for tools that walk every transcript event.
+
+The round trip is byte-exact: every document records how the dump serialized it, and documents
+that json.dumps cannot reproduce exactly are kept verbatim (compressed) instead of re-encoded.
+
+Layout: MAGIC | block ... | footer (zlib JSON: strings, layouts, index) | footer offset (8 bytes) | MAGIC
+
+Run: python log_compact.py --compact logs [--replace]
+     python log_compact.py --expand logs
+     python log_compact.py --verify logs
+     python log_compact.py --bench logs
+"""
+import argparse
+import io
+import json
+import struct
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional
+
+MAGIC = b"GLOG\x01"
+COMPACT_SUFFIX = ".glog"
+INTERN_MIN_LEN = 16
+COMPRESS_LEVEL = 6
+
+# markers inside encoded documents (NUL-prefixed keys never occur in Inspect logs, and every
+# encoded document is verified against its source text anyway)
+REF = "\x00s"    # {REF: i}              -> strings[i]
+DELTA = "\x00d"  # {DELTA: [layout, diff]} -> event rebuilt from the previous event of its type
+
+# modes: how the document text is reproduced
+ASCII, UNICODE, RAW = "a", "u", "r"
+
+# RAW SPANS
+def iter_raw_documents(log_path: Path, chunk_size: int = 1 << 20, offset: int = 0) -> Iterator[tuple]:
+    """
+    Stream (leading whitespace, raw text, parsed document) for every document of a log.
+
+    Same streaming as log_analysis.iter_log_documents, but the file is read without newline
+    translation so the raw text is exactly what is on disk. offset is a byte position at a
+    document boundary to start from.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    with open(log_path, "rb") as binary:
+        binary.seek(offset)
+        f = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+        while True:
+            chunk = f.read(chunk_size)
+            buffer += chunk
+            pos = 0
+            while True:
+                start = pos
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos >= len(buffer):
+                    pos = start  # keep trailing whitespace for the next chunk / the trailer
+                    break
+                try:
+                    doc, pos_end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    pos = start
+                    break  # document continues in the next chunk
+                yield buffer[start:pos], buffer[pos:pos_end], doc
+                pos = pos_end
+            buffer = buffer[pos:]
+            if not chunk:
+                if buffer:
+                    yield buffer, "", None  # trailing whitespace
+                return
+
+
+def document_kind(doc: Any) -> str:
+    """header / sample / other, as recorded in the index"""
+    if isinstance(doc, dict) and "id" in doc and "epoch" in doc and "scores" in doc:
+        return "sample"
+    if isinstance(doc, dict) and "eval" in doc:
+        return "header"
+    return "other"
+
+# ENCODING
+def _count_strings(value: Any, counts: Counter):
+    if isinstance(value, str):
+        if len(value) >= INTERN_MIN_LEN:
+            counts[value] += 1
+    elif isinstance(value, dict):
+        for v in value.values():
+            _count_strings(v, counts)
+    elif isinstance(value, list):
+        for v in value:
+            _count_strings(v, counts)
+
+
+class Encoder:
+    """Interns repeated strings and delta-encodes event lists of one log."""
+
+    def __init__(self, strings: List[str]):
+        self.strings = strings
+        self.string_ids = {s: i for i, s in enumerate(strings)}
+        self.layouts: List[List[str]] = []
+        self.layout_ids: Dict[tuple, int] = {}
+
+    def encode(self, value: Any) -> Any:
+        if isinstance(value, str):
+            i = self.string_ids.get(value)
+            return value if i is None else {REF: i}
+        if isinstance(value, dict):
+            out = {}
+            for k, v in value.items():
+                out[k] = self._encode_events(v) if k == "events" and isinstance(v, list) else self.encode(v)
+            return out
+        if isinstance(value, list):
+            return [self.encode(v) for v in value]
+        return value
+
+    def _encode_events(self, events: List[Any]) -> List[Any]:
+        """Each event keeps only the fields that changed since the previous event of its type"""
+        previous: Dict[Any, Dict] = {}
+        out = []
+        for event in events:
+            if not isinstance(event, dict) or not isinstance(event.get("event"), str):
+                out.append(self.encode(event))
+                continue
+            keys = tuple(event)
+            layout = self.layout_ids.get(keys)
+            if layout is None:
+                layout = self.layout_ids[keys] = len(self.layouts)
+                self.layouts.append(list(keys))
+            prev = previous.get(event["event"], {})
+            diff = {k: self.encode(v) for k, v in event.items()
+                    if k == "event" or k not in prev or prev[k] != v}
+            out.append({DELTA: [layout, diff]})
+            previous[event["event"]] = event
+        return out
+
+
+def decoder(strings: List[str], layouts: List[List[str]]):
+    """
+    json.loads object_hook inverting Encoder.encode.
+
+    Hooks run bottom-up, so references inside an event are already resolved when the dict
+    holding its "events" list is rebuilt.
+    """
+    def hook(obj: Dict) -> Any:
+        if len(obj) == 1 and REF in obj:
+            return strings[obj[REF]]
+        events = obj.get("events")
+        if isinstance(events, list):
+            obj["events"] = _decode_events(events, layouts)
+        return obj
+    return hook
+
+
+def _decode_events(events: List[Any], layouts: List[List[str]]) -> List[Any]:
+    previous: Dict[Any, Dict] = {}
+    out = []
+    for item in events:
+        if not (isinstance(item, dict) and len(item) == 1 and DELTA in item):
+            out.append(item)
+            continue
+        layout, diff = item[DELTA]
+        prev = previous.get(diff["event"], {})
+        event = {k: diff[k] if k in diff else prev[k] for k in layouts[layout]}
+        out.append(event)
+        previous[event["event"]] = event
+    return out
+
+
+def _dumps(doc: Any, mode: str) -> str:
+    """How Inspect's dump serializes a document"""
+    return json.dumps(doc, indent=2, ensure_ascii=(mode == ASCII))
+
+# COMPACTION
+def compact_path(log_path: Path) -> Path:
+    """x.txt -> x.txt.glog"""
+    return Path(str(log_path) + COMPACT_SUFFIX)
+
+
+def source_path(glog_path: Path) -> Path:
+    """x.txt.glog -> x.txt"""
+    return Path(str(glog_path)[:-len(COMPACT_SUFFIX)])
+
+
+def _write_block(out, payload: str) -> List[int]:
+    """Compress payload at the current position; returns [offset, length]"""
+    block = zlib.compress(payload.encode("utf-8"), COMPRESS_LEVEL)
+    offset = out.tell()
+    out.write(block)
+    return [offset, len(block)]
+
+
+def _rebuild(payload: str, events_payload: Optional[str], events_at: Optional[int], hook, layouts) -> Any:
+    """Decode a document block, re-inserting its event transcript at its original key position"""
+    doc = json.loads(payload, object_hook=hook)
+    if events_payload is not None:
+        events = _decode_events(json.loads(events_payload, object_hook=hook), layouts)
+        items = list(doc.items())
+        items.insert(events_at, ("events", events))
+        doc = dict(items)
+    return doc
+
+
+def compact_log(log_path: Path, out_path: Optional[Path] = None) -> Dict:
+    """Write the compact copy of one log; returns size stats"""
+    log_path = Path(log_path)
+    out_path = Path(out_path) if out_path else compact_path(log_path)
+
+    # pass 1: which long strings repeat
+    counts: Counter = Counter()
+    for _, raw, doc in iter_raw_documents(log_path):
+        if raw:
+            _count_strings(doc, counts)
+    encoder = Encoder([s for s, n in counts.items() if n > 1])
+
+    # pass 2: compressed blocks per document (a sample's event transcript gets its own block)
+    entries, trailer, modes = [], "", Counter()
+    hook = decoder(encoder.strings, encoder.layouts)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    with open(tmp_path, "wb") as out:
+        out.write(MAGIC)
+        for lead, raw, doc in iter_raw_documents(log_path):
+            if not raw:
+                trailer = lead
+                continue
+            entry = {"mode": next((m for m in (ASCII, UNICODE) if _dumps(doc, m) == raw), RAW),
+                     "kind": document_kind(doc)}
+            payload, events_payload = raw, None
+            if entry["mode"] != RAW:
+                encoded = encoder.encode(doc)
+                if isinstance(encoded, dict) and isinstance(encoded.get("events"), list):
+                    entry["events_at"] = list(encoded).index("events")
+                    events_payload = json.dumps(encoded.pop("events"), separators=(",", ":"), ensure_ascii=False)
+                payload = json.dumps(encoded, separators=(",", ":"), ensure_ascii=False)
+                rebuilt = _rebuild(payload, events_payload, entry.get("events_at"), hook, encoder.layouts)
+                if _dumps(rebuilt, entry["mode"]) != raw:
+                    entry = {"mode": RAW, "kind": entry["kind"]}
+                    payload, events_payload = raw, None
+            if lead:
+                entry["lead"] = lead
+            if entry["kind"] == "sample":
+                entry["id"], entry["epoch"] = doc["id"], doc["epoch"]
+            entry["block"] = _write_block(out, payload)
+            if events_payload is not None:
+                entry["events"] = _write_block(out, events_payload)
+            entries.append(entry)
+            modes[entry["mode"]] += 1
+
+        footer_offset = out.tell()
+        footer = {
+            "version": 1,
+            "source": log_path.name,
+            "strings": encoder.strings,
+            "layouts": encoder.layouts,
+            "entries": entries,
+            "trailer": trailer
+        }
+        out.write(zlib.compress(json.dumps(footer, separators=(",", ":"), ensure_ascii=False).encode("utf-8"),
+                                COMPRESS_LEVEL))
+        out.write(struct.pack("<Q", footer_offset))
+        out.write(MAGIC)
+    tmp_path.replace(out_path)
+
+    return {
+        "log": str(log_path),
+        "compact": str(out_path),
+        "documents": len(entries),
+        "strings": len(encoder.strings),
+        "raw_documents": modes[RAW],
+        "bytes_before": log_path.stat().st_size,
+        "bytes_after": out_path.stat().st_size
+    }
+
+# READING
+class CompactLog:
+    """Random access to the documents of a .glog file."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._file.seek(-(8 + len(MAGIC)), 2)
+        tail = self._file.read()
+        if tail[8:] != MAGIC:
+            self._file.close()
+            raise ValueError(f"{self.path} is not a compact log")
+        footer_offset = struct.unpack("<Q", tail[:8])[0]
+        self._file.seek(footer_offset)
+        footer = json.loads(zlib.decompress(self._file.read()[:-(8 + len(MAGIC))]).decode("utf-8"))
+        self.source = footer["source"]
+        self.strings = footer["strings"]
+        self.layouts = footer["layouts"]
+        self.entries = footer["entries"]
+        self.trailer = footer["trailer"]
+        self._hook = decoder(self.strings, self.layouts)
+        self._samples = {(e["id"], e["epoch"]): i for i, e in enumerate(self.entries) if e["kind"] == "sample"}
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read(self, block: List[int]) -> str:
+        offset, length = block
+        self._file.seek(offset)
+        return zlib.decompress(self._file.read(length)).decode("utf-8")
+
+    def document(self, index: int, events: bool = True) -> Any:
+        """Parsed document at position index; events=False skips a sample's event transcript block"""
+        entry = self.entries[index]
+        payload = self._read(entry["block"])
+        if entry["mode"] == RAW:
+            return json.loads(payload)
+        events_payload = self._read(entry["events"]) if events and "events" in entry else None
+        return _rebuild(payload, events_payload, entry.get("events_at"), self._hook, self.layouts)
+
+    def text(self, index: int) -> str:
+        """Exact source text of the document at position index (leading whitespace included)"""
+        entry = self.entries[index]
+        if entry["mode"] == RAW:
+            return entry.get("lead", "") + self._read(entry["block"])
+        return entry.get("lead", "") + _dumps(self.document(index), entry["mode"])
+
+    def documents(self, kinds: Optional[tuple] = None, events: bool = True) -> Iterator[Any]:
+        """Every document in order, optionally only the given kinds (skipped blocks are never read)"""
+        for i, entry in enumerate(self.entries):
+            if kinds is None or entry["kind"] in kinds:
+                yield self.document(i, events)
+
+    def sample(self, sample_id: Any, epoch: int = 1, events: bool = True) -> Optional[Dict]:
+        """One sample by id / epoch: a seek + decompress per block, nothing else is read"""
+        index = self._samples.get((sample_id, epoch))
+        return None if index is None else self.document(index, events)
+
+
+def iter_compact_documents(path: Path, events: bool = True) -> Iterator[Any]:
+    """Stream the documents of a .glog file (drop-in for log_analysis.iter_log_documents)"""
+    with CompactLog(path) as log:
+        yield from log.documents(events=events)
+
+
+def expand_log(path: Path, out_path: Optional[Path] = None) -> Path:
+    """Rebuild the original dump from a .glog file, byte for byte"""
+    path = Path(path)
+    out_path = Path(out_path) if out_path else source_path(path)
+    with CompactLog(path) as log, open(out_path, "w", encoding="utf-8", newline="") as out:
+        for i in range(len(log.entries)):
+            out.write(log.text(i))
+        out.write(log.trailer)
+    return out_path
+
+
+def verify_log(path: Path) -> bool:
+    """Whether a .glog file expands to exactly the bytes of its source dump"""
+    path = Path(path)
+    with CompactLog(path) as log, open(source_path(path), "r", encoding="utf-8", newline="") as source:
+        for i in range(len(log.entries)):
+            text = log.text(i)
+            if source.read(len(text)) != text:
+                return False
+        return source.read() == log.trailer
+
+# DIRECTORY TOOLS
+def _source_logs(log_dir: Path) -> List[Path]:
+    from log_analysis import LOG_PATTERNS
+
+    return sorted(p for pattern in LOG_PATTERNS if not pattern.endswith(COMPACT_SUFFIX)
+                  for p in Path(log_dir).glob(f"**/{pattern}"))
+
+
+def compact_dir(log_dir: Path, replace: bool = False):
+    """Compact every log in log_dir; with replace, delete each source once its copy verifies"""
+    before = after = 0
+    for log_path in _source_logs(log_dir):
+        stats = compact_log(log_path)
+        before += stats["bytes_before"]
+        after += stats["bytes_after"]
+        ratio = stats["bytes_after"] / stats["bytes_before"] if stats["bytes_before"] else 0.0
+        print(f"{log_path.name}: {stats['bytes_before']:,} -> {stats['bytes_after']:,} bytes "
+              f"({ratio:.1%}, {stats['strings']} strings, {stats['raw_documents']} verbatim docs)")
+        if replace:
+            if verify_log(compact_path(log_path)):
+                log_path.unlink()
+            else:
+                print(f"  kept {log_path.name}: compact copy did not verify")
+    if before:
+        print(f"\nTotal: {before:,} -> {after:,} bytes ({after / before:.1%})")
+
+
+def expand_dir(log_dir: Path):
+    """Restore every source dump that only exists as a .glog file"""
+    for glog in sorted(Path(log_dir).glob(f"**/*{COMPACT_SUFFIX}")):
+        if not source_path(glog).exists():
+            print(f"restored {expand_log(glog)}")
+
+
+def verify_dir(log_dir: Path) -> bool:
+    """Check every .glog file whose source still exists"""
+    ok = True
+    for glog in sorted(Path(log_dir).glob(f"**/*{COMPACT_SUFFIX}")):
+        if source_path(glog).exists():
+            match = verify_log(glog)
+            ok = ok and match
+            print(f"{'OK  ' if match else 'FAIL'} {glog.name}")
+    return ok
+
+
+def bench_dir(log_dir: Path):
+    """Disk size and full-parse time of every source log vs its .glog copy"""
+    from log_analysis import iter_log_documents
+
+    rows = []
+    for log_path in _source_logs(log_dir):
+        glog = compact_path(log_path)
+        if not glog.exists():
+            continue
+        start = time.perf_counter()
+        n = sum(1 for _ in iter_log_documents(log_path))
+        raw_s = time.perf_counter() - start
+        start = time.perf_counter()
+        sum(1 for _ in iter_compact_documents(glog))
+        compact_s = time.perf_counter() - start
+        start = time.perf_counter()
+        sum(1 for _ in iter_compact_documents(glog, events=False))
+        no_events_s = time.perf_counter() - start
+        start = time.perf_counter()
+        with CompactLog(glog) as log:
+            first = next((e for e in log.entries if e["kind"] == "sample"), None)
+            if first:
+                log.sample(first["id"], first["epoch"])
+        lookup_s = time.perf_counter() - start
+        rows.append((log_path.stat().st_size, glog.stat().st_size, n, raw_s, compact_s, lookup_s, no_events_s))
+
+    if not rows:
+        print("No compacted logs found (run --compact first)")
+        return
+    size_raw, size_compact = sum(r[0] for r in rows), sum(r[1] for r in rows)
+    raw_s, compact_s = sum(r[3] for r in rows), sum(r[4] for r in rows)
+    no_events_s, lookup_s = sum(r[6] for r in rows), sum(r[5] for r in rows) / len(rows)
+    print(f"Logs: {len(rows)}  Documents: {sum(r[2] for r in rows)}")
+    print(f"Disk:       {size_raw:>12,} -> {size_compact:>12,} bytes ({size_compact / size_raw:.1%})")
+    print(f"Full parse: {raw_s * 1000:>12.1f} -> {compact_s * 1000:>12.1f} ms ({compact_s / raw_s:.2f}x, events resolved)")
+    print(f"No events:  {raw_s * 1000:>12.1f} -> {no_events_s * 1000:>12.1f} ms ({no_events_s / raw_s:.2f}x, "
+          f"what report / history / diff read)")
+    print(f"One sample: {raw_s / len(rows) * 1000:>12.1f} -> {lookup_s * 1000:>12.1f} ms "
+          f"({lookup_s / (raw_s / len(rows)):.2f}x, mean per log: full parse vs indexed lookup)")
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="Compact / expand / verify Inspect log dumps")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--compact", metavar="LOG_DIR", help="write a .glog copy of every log")
+    group.add_argument("--expand", metavar="LOG_DIR", help="restore dumps that only exist as .glog")
+    group.add_argument("--verify", metavar="LOG_DIR", help="check .glog copies against their sources")
+    group.add_argument("--bench", metavar="LOG_DIR", help="disk size and parse time, source vs .glog")
+    parser.add_argument("--replace", action="store_true", help="with --compact: delete verified sources")
+    args = parser.parse_args()
+
+    if args.compact:
+        compact_dir(args.compact, replace=args.replace)
+    elif args.expand:
+        expand_dir(args.expand)
+    elif args.verify:
+        raise SystemExit(0 if verify_dir(args.verify) else 1)
+    else:
+        bench_dir(args.bench)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Sample Offset Index:Random access to single samples of large log dumps.
+
+Debugging one sample used to mean parsing the whole dump. Instead:
+1)build: one streaming pass records the byte range of every sample document, keyed by
+  (id, epoch), plus its primary score value, in a sidecar next to the log (.<log name>.idx)
+2)extend: dumps only grow, so a later build resumes from the last indexed byte instead of
+  starting over (the bytes before it are checked against a stored fingerprint)
+3)lookup: the dump is memory-mapped and only the requested byte range is decoded
+
+Compact logs (.glog) carry their own block index (log_compact.CompactLog); single-document
+.json logs have no per-sample byte ranges and are loaded whole.
+
+Run: python log_analysis.py --show logs/<log>.txt          # failed samples, from the index
+     python log_analysis.py --show logs/<log>.txt 7 [EPOCH] # one sample
+"""
+import hashlib
+import json
+import mmap
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from log_compact import COMPACT_SUFFIX, CompactLog, document_kind, iter_raw_documents
+
+INDEX_SUFFIX = ".idx"
+TAIL_BYTES = 4096  # bytes before the resume point that must be unchanged to extend an index
+
+
+def index_path(log_path: Path) -> Path:
+    """logs/x.txt -> logs/.x.txt.idx (hidden, so log globs skip it)"""
+    log_path = Path(log_path)
+    return log_path.with_name(f".{log_path.name}{INDEX_SUFFIX}")
+
+
+def _tail_hash(f, end: int) -> str:
+    start = max(0, end - TAIL_BYTES)
+    f.seek(start)
+    return hashlib.sha1(f.read(end - start)).hexdigest()
+
+
+def _score_value(sample: Dict) -> Any:
+    for score in (sample.get("scores") or {}).values():
+        return score.get("value") if isinstance(score, dict) else None
+    return None
+
+
+class OffsetIndex:
+    """(id, epoch) -> byte range of every sample document in one log dump."""
+
+    def __init__(self, log_path: Path):
+        self.log_path = Path(log_path)
+        self.path = index_path(self.log_path)
+        self.scanned = 0
+        self.tail = ""
+        self.entries: List[List] = []  # [id, epoch, start, end, score value]
+        self.inline = False  # a plain JSON log: samples live inside one document
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.scanned, self.tail, self.entries = data["scanned"], data["tail"], data["entries"]
+            self.inline = data.get("inline", False)
+        self._by_key = {(e[0], e[1]): e for e in self.entries}
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"scanned": self.scanned, "tail": self.tail, "entries": self.entries,
+                       "inline": self.inline}, f)
+
+    def refresh(self) -> int:
+        """Index bytes appended since the last refresh (rebuild if the indexed part changed); returns new samples"""
+        size = self.log_path.stat().st_size
+        if self.scanned:
+            with open(self.log_path, "rb") as f:
+                unchanged = size >= self.scanned and _tail_hash(f, self.scanned) == self.tail
+            if not unchanged:
+                self.scanned, self.tail, self.entries, self.inline = 0, "", [], False
+        if size == self.scanned:
+            return 0
+
+        added, position = 0, self.scanned
+        try:
+            for lead, raw, doc in iter_raw_documents(self.log_path, offset=self.scanned):
+                if not raw:
+                    break  # trailing whitespace
+                start = position + len(lead.encode("utf-8"))
+                position = start + len(raw.encode("utf-8"))
+                if document_kind(doc) == "sample":
+                    self.entries.append([doc["id"], doc["epoch"], start, position, _score_value(doc)])
+                    added += 1
+                elif isinstance(doc, dict) and doc.get("samples"):
+                    self.inline = True
+                self.scanned = position
+        except json.JSONDecodeError:
+            pass  # last document is still being written; resume from it next time
+        with open(self.log_path, "rb") as f:
+            self.tail = _tail_hash(f, self.scanned)
+        self._by_key = {(e[0], e[1]): e for e in self.entries}
+        self.save()
+        return added
+
+    def find(self, sample_id: Any, epoch: int = 1) -> Optional[List]:
+        """Index entry for (id, epoch); ids given as text also match numeric ids"""
+        entry = self._by_key.get((sample_id, epoch))
+        if entry is None:
+            entry = next((e for e in self.entries if str(e[0]) == str(sample_id) and e[1] == epoch), None)
+        return entry
+
+    def read(self, entry: List) -> Dict:
+        """Decode one sample document by memory-mapping the dump and slicing its byte range"""
+        with open(self.log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return json.loads(mm[entry[2]:entry[3]].decode("utf-8"))
+
+
+def _inline_samples(log_path: Path) -> List[Dict]:
+    """Samples of a single-document JSON log (no per-sample byte ranges to index)"""
+    with open(log_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("samples") or []
+
+
+def read_sample(log_path: Path, sample_id: Any, epoch: int = 1) -> Optional[Dict]:
+    """One sample of any log format, reading as little of the file as the format allows"""
+    if str(log_path).endswith(COMPACT_SUFFIX):
+        with CompactLog(log_path) as log:
+            index = next((i for i, e in enumerate(log.entries) if e["kind"] == "sample"
+                          and str(e["id"]) == str(sample_id) and e["epoch"] == epoch), None)
+            return None if index is None else log.document(index)
+    index = OffsetIndex(log_path)
+    index.refresh()
+    if index.inline:
+        return next((s for s in _inline_samples(log_path)
+                     if str(s.get("id")) == str(sample_id) and s.get("epoch", 1) == epoch), None)
+    entry = index.find(sample_id, epoch)
+    return None if entry is None else index.read(entry)
+
+
+def sample_outcomes(log_path: Path) -> List[tuple]:
+    """(id, epoch, primary score value) of every sample, from the index where there is one"""
+    if str(log_path).endswith(COMPACT_SUFFIX):
+        with CompactLog(log_path) as log:
+            return [(s["id"], s["epoch"], _score_value(s)) for s in log.documents(kinds=("sample",), events=False)]
+    index = OffsetIndex(log_path)
+    index.refresh()
+    if index.inline:
+        return [(s.get("id"), s.get("epoch", 1), _score_value(s)) for s in _inline_samples(log_path)]
+    return [(e[0], e[1], e[4]) for e in index.entries]
@@ -10,16 +10,10 @@ Run: python multi_model_eval.py --run-all
 Or individually:  inspect eval multi_model_eval.py@behavioral_eval --model bedrock/anthropic.claude-3-sonnet-20240229-v1:0
 """
 
-from dotenv import load_dotenv
-load_dotenv() # Load your API keys from .env file (refer .env file example to know what all is needed)
-
-from inspect_ai import Task, task, eval
-from inspect_ai.dataset import Sample, MemoryDataset
-from inspect_ai.solver import generate, system_message
-from inspect_ai.scorer import model_graded_fact, includes, Score, scorer, Target, CORRECT, INCORRECT, PARTIAL
-from inspect_ai.model import get_model
 import sys
 
+from eval_common import task, load_samples, build_task
+
 # MODELS TO COMPARE
 
 MODELS_TO_EVALUATE = [
@@ -32,25 +26,7 @@ MODELS_TO_EVALUATE = [
 
 def load_behavioral_samples():
     """Load behavioral samples from all_samples.csv"""
-    import csv
-    import json
-    samples = []
-    with open("../data/all_samples.csv", "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row["eval_type"] == "behavioral":
-                extra = json.loads(row.get("extra_metadata", "{}"))
-                samples.append(Sample(
-                    input=row["input"],
-                    target=row["target"],
-                    metadata={
-                        "category": row["category"],
-                        "expected_behavior": row["expected_behavior"],
-                        "eval_type": row["eval_type"],
-                        "behavior_type": extra.get("behavior_type", "")
-                    }
-                ))
-    return MemoryDataset(samples)
+    return load_samples(EVAL_TYPE)
 
 # SYSTEM PROMPT (Same for all models - no per-model tuning)
 BEHAVIORAL_PROMPT = """You are a precise assistant. Answer ONLY using the provided context.
@@ -63,6 +39,20 @@ Rules:
 
 Be concise."""
 
+# MATRIX AXES (expanded by task_matrix.py)
+EVAL_TYPE = "behavioral"
+PROMPTS = {"behavioral": BEHAVIORAL_PROMPT}
+CATEGORIES = []
+REFUSAL_PATTERNS = ["cannot answer", "not in", "not specified", "not mentioned",
+                    "does not contain", "no information", "not provided"]
+
+
+def behavioral_scorer(category=None):
+    """Judge + refusal pattern matching"""
+    from inspect_ai.scorer import model_graded_fact, includes
+
+    return [model_graded_fact(), includes(REFUSAL_PATTERNS)]
+
 # TASK DEFINITION
 @task
 def behavioral_eval():
@@ -71,22 +61,16 @@ def behavioral_eval():
     Loads from all_samples.csv with eval_type="behavioral".
     Do NOT modify this task per model.
     """
-    return Task(
+    return build_task(
+        "behavioral_eval",
         dataset=load_behavioral_samples(),
-        solver=[
-            system_message(BEHAVIORAL_PROMPT),
-            generate()
-        ],
-        scorer=[
-            model_graded_fact(),
-            includes(["cannot answer", "not in", "not specified", "not mentioned",
-                     "does not contain", "no information", "not provided"])
-        ]
+        prompt=BEHAVIORAL_PROMPT,
+        scorer=behavioral_scorer()
     )
 
 # MULTI-MODEL RUNNER
-def run_multi_model_eval():
-    """Run the same evaluation across all models using Python API."""
+def run_multi_model_eval(pool=False):
+    """Run the same evaluation across all models using Python API (pool: shared HTTP connections, http_pool.py)."""
     from inspect_ai import eval as inspect_eval
 
     print("=" * 60)
@@ -100,22 +84,31 @@ def run_multi_model_eval():
 
     results = {}
 
-    for model in MODELS_TO_EVALUATE:
-        print(f"\n>>> Evaluating: {model}")
-        print("-" * 40)
-
-        try:
-            log = inspect_eval(
-                behavioral_eval(),
-                model=model
-            )
-
-            print(f"✓ {model} - Completed successfully")
-            results[model] = "success"
-
-        except Exception as e:
-            print(f"✗ {model} - Exception: {str(e)}")
-            results[model] = "error"
+    models = MODELS_TO_EVALUATE
+    if pool:
+        import http_pool
+        http_pool.register()
+        models = [http_pool.pooled_model(m) for m in models]
+
+    # One interleaved run: every model shares the scheduler instead of running back to back
+    try:
+        logs = inspect_eval(
+            behavioral_eval(),
+            model=models,
+            max_tasks=len(models)
+        )
+        if pool:
+            http_pool.restore_model_names(logs)
+        for log in logs:
+            status = "success" if log.status == "success" else "error"
+            mark = "✓" if status == "success" else "✗"
+            print(f"{mark} {log.eval.model} - {log.status}")
+            results[log.eval.model] = status
+
+    except Exception as e:
+        print(f"✗ Exception: {str(e)}")
+        for model in MODELS_TO_EVALUATE:
+            results.setdefault(model, "error")
 
     print("\n" + "=" * 60)
     print("EVALUATION SUMMARY")
@@ -123,6 +116,9 @@ def run_multi_model_eval():
     for model, status in results.items():
         print(f"  {model}: {status}")
 
+    if pool:
+        print(http_pool.pool_report())
+
     print("\nView results with: inspect view")
     print("=" * 60)
 
@@ -131,13 +127,13 @@ def run_multi_model_eval():
 # MAIN
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "--run-all":
-        run_multi_model_eval()
+        run_multi_model_eval(pool="--pool" in sys.argv[2:])
     else:
         print("""
 Multi-Model Behavioral Evaluation
 Usage:
   1. Run ALL models:
-     python multi_model_eval.py --run-all
+     python multi_model_eval.py --run-all [--pool]   (--pool: one shared keep-alive HTTP pool, http_pool.py)
   2. Run single model:
      inspect eval multi_model_eval.py@behavioral_eval --model openrouter/google/gemini-2.0-flash-001
      inspect eval multi_model_eval.py@behavioral_eval --model openai/gpt-4o-mini
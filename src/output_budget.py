@@ -0,0 +1,278 @@
+"""
+Output Budget:Category-aware max_tokens per sample and an early stop right after a refusal sentence.
+
+COT runs and verbose refusals pay for output tokens that the score never uses. With budgets on:
+1)budget: each sample generates with max_tokens = BUDGETS[category] (NO_CONTEXT items only
+  need room to refuse), times PROMPT_FACTORS[prompt] for prompts that reason before answering
+2)early stop: the canonical refusal sentence (the phrase the prompt quotes, DEFAULT_REFUSAL
+  otherwise) followed by a sentence end is passed as stop sequences, so the provider stops
+  generating as soon as that sentence is complete. Providers drop the matched stop sequence and
+  the sentence is put back into the completion (so scorers see the full refusal), which needs the
+  provider to report which sequence matched: only STOP_SEQUENCE_PROVIDERS get the stop
+  sequences, every other model runs with max_tokens alone. Categories whose expected answer
+  qualifies the refusal (PARTIAL_CONTEXT) keep generating
+3)report: per category output tokens, early stops and budget hits of a run; against a
+  baseline run of the same samples, tokens saved and paired accuracy / refusal deltas
+  with bootstrap CIs (bootstrap.py)
+
+Tool-calling tasks are not budgeted (one sample spans several generate calls).
+
+Run: python task_matrix.py --run-all --model openai/gpt-4o-mini --output-budget
+     inspect eval prompt_variation_eval.py@cot_prompt_eval -T output_budget=true --model openai/gpt-4o-mini
+     python output_budget.py logs/<budgeted>.json [--compare logs/<baseline>.json]
+"""
+import argparse
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional
+
+from profiling import stage
+
+BUDGETS = {  # category -> max output tokens
+    "NO_CONTEXT": 128,
+    "MISLEADING_CONTEXT": 192,
+    "PARTIAL_CONTEXT": 256,
+    "FULL_CONTEXT": 256,
+}
+DEFAULT_BUDGET = 512
+PROMPT_FACTORS = {"cot": 4}  # prompt name -> budget multiplier (reasoning comes before the answer)
+NO_EARLY_STOP = {"PARTIAL_CONTEXT"}  # a qualified answer explains after "I cannot answer"
+DEFAULT_REFUSAL = "I cannot answer this question"
+SENTENCE_ENDS = [".", "\n"]
+QUOTED_REFUSAL_RE = re.compile(r'say "([^"]+)"')
+STORE_KEY = "output_budget"
+# providers whose raw response names the matched stop sequence (anthropic: "stop_sequence"); openai
+# and most others only say "stop", so a cut refusal could not be told from an empty answer
+STOP_SEQUENCE_PROVIDERS = {"anthropic"}
+WRAPPER_PROVIDERS = {"hedged", "pooled"}
+
+
+def reports_stop_sequence(model: str) -> bool:
+    """Whether the model's provider (under hedged/ and pooled/ prefixes) reports the matched stop sequence"""
+    parts = model.split("/")
+    while len(parts) > 1 and parts[0] in WRAPPER_PROVIDERS:
+        parts = parts[1:]
+    return len(parts) > 1 and parts[0] in STOP_SEQUENCE_PROVIDERS
+
+
+def refusal_phrase(prompt: str) -> str:
+    """The refusal the prompt asks for ('say "I cannot answer this question"'), DEFAULT_REFUSAL otherwise"""
+    match = QUOTED_REFUSAL_RE.search(prompt)
+    return match.group(1).rstrip(".") if match else DEFAULT_REFUSAL
+
+
+class OutputBudget:
+    """Per-category max_tokens and the refusal early stop for the generate step of a task."""
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, default: int = DEFAULT_BUDGET,
+                 factors: Optional[Dict[str, float]] = None, early_stop: bool = True):
+        self.budgets = BUDGETS if budgets is None else budgets
+        self.default = default
+        self.factors = PROMPT_FACTORS if factors is None else factors
+        self.early_stop = early_stop
+
+    def limit(self, category: str, prompt_name: Optional[str] = None) -> int:
+        return int(self.budgets.get(category, self.default) * self.factors.get(prompt_name, 1))
+
+    def solver(self, prompt: str, prompt_name: Optional[str] = None):
+        """generate() with max_tokens by sample category and the refusal early stop"""
+        from inspect_ai.solver import solver
+
+        phrase = refusal_phrase(prompt)
+        stops = [phrase + end for end in SENTENCE_ENDS]
+        budget = self
+
+        @solver(name="budgeted_generate")
+        def make_solver():
+            async def solve(state, generate):
+                category = (state.metadata or {}).get("category", "")
+                config = {"max_tokens": budget.limit(category, prompt_name)}
+                early = (budget.early_stop and category not in NO_EARLY_STOP
+                         and reports_stop_sequence(str(state.model)))
+                if early:
+                    config["stop_seqs"] = stops
+                with stage("generate"):
+                    state = await generate(state, **config)
+                stopped = restore_refusal(state, phrase, stops) if early else False
+                usage = state.output.usage
+                state.store.set(STORE_KEY, {
+                    "max_tokens": config["max_tokens"],
+                    "early_stop": stopped,
+                    "truncated": state.output.stop_reason == "max_tokens",
+                    "output_tokens": usage.output_tokens if usage else None
+                })
+                return state
+
+            return solve
+
+        return make_solver()
+
+
+def matched_stop(output: Any) -> Optional[str]:
+    """
+    The stop sequence the provider reports as matched (output metadata, else the raw response of
+    the sample's last model call), None if it does not say
+    """
+    from inspect_ai.log import transcript
+
+    value = (getattr(output, "metadata", None) or {}).get("stop_sequence")
+    if value is None:
+        for event in reversed(transcript().events):
+            if event.event == "model":
+                call = getattr(event, "call", None)
+                value = ((call.response if call else None) or {}).get("stop_sequence")
+                break
+    return value if isinstance(value, str) else None
+
+
+def restore_refusal(state: Any, phrase: str, stops: Iterable[str]) -> Optional[bool]:
+    """
+    Put the refusal sentence back when a refusal stop sequence ended generation.
+
+    Most providers report a stop sequence and a natural end of turn alike ("stop") and the text
+    before the cut cannot tell them apart, so the sentence is only restored when the provider
+    names the matched sequence. Returns True when restored, False when no refusal stop ended
+    generation and None when the generation stopped but the provider did not say why.
+    """
+    if state.output.stop_reason != "stop":
+        return False
+    matched = matched_stop(state.output)
+    if matched is None:
+        return None
+    if matched not in stops:
+        return False
+    restored = f"{state.output.completion}{phrase}."
+    state.output.completion = restored
+    if state.messages and state.messages[-1].role == "assistant":
+        state.messages[-1].text = restored
+    return True
+
+# REPORT
+def output_tokens(sample: Dict) -> int:
+    """Output tokens of the sample's final generation (judge calls excluded)"""
+    usage = (sample.get("output") or {}).get("usage") or {}
+    return usage.get("output_tokens") or 0
+
+
+def sample_records(samples: Iterable[Dict], task: str = "") -> Dict[tuple, Dict]:
+    """(task, id, epoch) -> category, accuracy credit, refusal, output tokens and budget outcome"""
+    from log_analysis import primary_score
+    from text_features import is_refusal
+
+    records = {}
+    for sample in samples:
+        score = primary_score(sample)
+        if not score:
+            continue
+        value = score.get("value", "")
+        budget = (sample.get("store") or {}).get(STORE_KEY) or {}
+        records[(task, sample.get("id"), sample.get("epoch", 1))] = {
+            "category": (sample.get("metadata") or {}).get("category", "UNKNOWN"),
+            "credit": 1.0 if value in ("C", "CORRECT") else 0.5 if value in ("P", "PARTIAL") else 0.0,
+            "refused": 1.0 if is_refusal(score.get("answer") or "") else 0.0,
+            "tokens": output_tokens(sample),
+            "max_tokens": budget.get("max_tokens"),
+            "early_stop": budget.get("early_stop"),
+            "truncated": bool(budget.get("truncated"))
+        }
+    return records
+
+
+def load_records(log_path: Path) -> Dict[tuple, Dict]:
+    from log_analysis import load_log_file
+
+    log_data = load_log_file(log_path)
+    if not log_data:
+        raise ValueError(f"Could not read log {log_path}")
+    return sample_records(log_data.get("samples", []), (log_data.get("eval") or {}).get("task", ""))
+
+
+def budget_report(records: Dict[tuple, Dict], baseline: Optional[Dict[tuple, Dict]] = None) -> str:
+    """
+    Per category output tokens, early stops and budget hits; vs baseline, tokens saved and paired
+    deltas. Sample ids restart per task, so a baseline of another task is refused (ValueError).
+    """
+    from bootstrap import CONFIDENCE, excludes_zero, format_ci, paired_deltas
+
+    if baseline is not None:
+        tasks, baseline_tasks = {key[0] for key in records}, {key[0] for key in baseline}
+        if tasks != baseline_tasks:
+            raise ValueError(f"Baseline is a different task ({', '.join(sorted(baseline_tasks))}) "
+                             f"from the budgeted run ({', '.join(sorted(tasks))})")
+
+    groups = defaultdict(list)
+    for key, record in records.items():
+        groups[record["category"]].append(key)
+    groups = {category: groups[category] for category in sorted(groups)}
+    groups["TOTAL"] = list(records)
+
+    lines = []
+    lines.append("=" * 92)
+    lines.append("OUTPUT BUDGET" + (" vs BASELINE" if baseline is not None else ""))
+    lines.append("=" * 92)
+    header = (f"{'Category':<20} {'n':>4} {'budget':>7} {'tok/sample':>11} {'early stops':>12} {'unknown':>8} "
+              f"{'budget hits':>12}")
+    lines.append(header + (f" {'baseline tok':>13} {'saved':>7}" if baseline is not None else ""))
+    lines.append("-" * 92)
+    pairs = defaultdict(list)
+    for category, keys in groups.items():
+        rows = [records[key] for key in keys]
+        limits = sorted({r["max_tokens"] for r in rows if r["max_tokens"]})
+        limit = str(limits[0]) if len(limits) == 1 else "-"
+        line = (f"{category:<20} {len(rows):>4} {limit:>7} {sum(r['tokens'] for r in rows) / len(rows):>11.1f} "
+                f"{sum(r['early_stop'] is True for r in rows):>12} {sum(r['early_stop'] is None for r in rows):>8} "
+                f"{sum(r['truncated'] for r in rows):>12}")
+        matched = [(records[key], baseline[key]) for key in keys if key in baseline] if baseline is not None else []
+        if matched:
+            new = sum(r["tokens"] for r, _ in matched)
+            base = sum(b["tokens"] for _, b in matched)
+            line += f" {base / len(matched):>13.1f} {1 - new / base if base else 0.0:>7.1%}"
+            pairs[("accuracy", category)] = [(r["credit"], b["credit"]) for r, b in matched]
+            pairs[("refusal", category)] = [(r["refused"], b["refused"]) for r, b in matched]
+        lines.append(line)
+
+    lines.append("-" * 92)
+    if baseline is None:
+        rows = records.values()
+        lines.append(f"{sum(r['early_stop'] is True for r in rows)} early stops "
+                     f"({sum(r['early_stop'] is None for r in rows)} unknown: provider did not report the stop sequence), "
+                     f"{sum(r['truncated'] for r in rows)} samples cut at their budget (check them for lost answers); "
+                     f"--compare a baseline log for tokens saved")
+    elif not pairs:
+        lines.append("No samples in common with the baseline (matched on task + id + epoch)")
+    else:
+        matched = [(records[key], baseline[key]) for key in records if key in baseline]
+        new = sum(r["tokens"] for r, _ in matched)
+        base = sum(b["tokens"] for _, b in matched)
+        lines.append(f"Paired samples: {len(matched)} (matched on task + id + epoch); output tokens {base} -> {new} "
+                     f"({base - new} saved)")
+        lines.append(f"Change, budgeted - baseline ({CONFIDENCE:.0%} bootstrap CI, * = excludes 0):")
+        deltas = paired_deltas(pairs)
+        for category in groups:
+            if ("accuracy", category) not in deltas:
+                continue
+            accuracy, refusal = deltas[("accuracy", category)], deltas[("refusal", category)]
+            lines.append(f"  {category:<20} accuracy {format_ci(accuracy, signed=True)}"
+                         f"{' *' if excludes_zero(accuracy) else '  '}   refusals {format_ci(refusal, signed=True)}"
+                         f"{' *' if excludes_zero(refusal) else ''}")
+    lines.append("=" * 92)
+    return "\n".join(lines)
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="Output tokens, early stops and accuracy impact of an output-budgeted run")
+    parser.add_argument("log", type=Path, help="log of a run with --output-budget / -T output_budget=true")
+    parser.add_argument("--compare", type=Path, default=None, metavar="BASELINE_LOG",
+                        help="log of the same samples without output budgets")
+    args = parser.parse_args()
+
+    baseline = load_records(args.compare) if args.compare else None
+    try:
+        print(budget_report(load_records(args.log), baseline))
+    except ValueError as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Synthetic Perturbations:Seeded, streaming generator of entity / temporal confusion and partial-context variants.
+
+The hand-written MISLEADING_CONTEXT, ENTITY_CONFUSION and TEMPORAL_CONFUSION cases number 8 or
+fewer per category. Seed rows from all_samples.csv (hallucination + taxonomy) are rewritten into
+labelled variants:
+1)renamed: entities, numbers and years changed consistently in context, question and target;
+  the seed's label is kept (also applied underneath every other kind, for variety)
+2)entity_swap: an entity the question asks about is replaced in the context only by another
+  name of the same kind (company, person, city, "Product X") -> MISLEADING_CONTEXT, refuse
+3)temporal_shift: the year / quarter the question asks about is shifted in the context only
+  -> MISLEADING_CONTEXT, refuse
+4)field_removal: the sentence or clause holding the answer is dropped from the context
+  -> PARTIAL_CONTEXT, qualify
+
+Label-changing kinds start from FULL_CONTEXT seeds, where the answer is in the context. Each
+variant draws from its own random.Random(f"{seed}:{i}"), so a run is reproducible and any
+slice of it can be regenerated alone. Rows are streamed to a CSV with the all_samples.csv
+columns, after the original rows, so every existing task runs on it unchanged:
+
+Run: python perturb.py --n 100000 --seed 0 [--out ../data/all_samples.perturbed.csv] [--kind entity_swap]
+     python task_matrix.py --run-all --model openai/gpt-4o-mini --data ../data/all_samples.perturbed.csv
+"""
+import argparse
+import csv
+import json
+import random
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Iterator, Optional
+
+from dedupe import text_digest
+from eval_common import DATA_PATH
+from text_features import NUMBER_RE, QUARTER_RE, YEAR_RE, extract_numbers, split_input
+
+SEED_EVAL_TYPES = ["hallucination", "taxonomy"]
+OUT_PATH = "../data/all_samples.perturbed.csv"
+MAX_MISSES = 50  # consecutive failed or duplicate draws before a (seed, kind) pair is exhausted
+
+REFUSE_TARGET = "I cannot answer this question based on the provided context."
+PARTIAL_TARGET = "I cannot answer this question. The requested information is not mentioned in the context."
+
+# kind -> (category, expected_behavior, taxonomy behavior_type, taxonomy potential_failure, target)
+KINDS = {
+    "renamed": None,  # the seed's own labels
+    "entity_swap": ("MISLEADING_CONTEXT", "refuse", "entity_confusion_avoidance", "ENTITY_CONFUSION", REFUSE_TARGET),
+    "temporal_shift": ("MISLEADING_CONTEXT", "refuse", "temporal_confusion_avoidance", "TEMPORAL_CONFUSION",
+                       REFUSE_TARGET),
+    "field_removal": ("PARTIAL_CONTEXT", "qualify", "missing_info_acknowledgment", "PARTIAL_GROUNDING", PARTIAL_TARGET),
+}
+
+# NAME POOLS (a name is only ever replaced by one of the same pool)
+POOLS = {
+    "company": ["TechCorp", "GlobalTech", "RivalCorp", "NovaSoft", "BrightLabs", "Apex Systems", "Orbit Labs",
+                "Helix Inc", "Vertex Dynamics", "Quantum Works", "BlueRiver Corp", "Summit Tech", "Crestline Inc",
+                "Northwind Labs", "Ironclad Systems", "Lumen Corp"],
+    "first_name_f": ["Alice", "Sarah", "Priya", "Maria", "Lena", "Aisha", "Fatima", "Nina", "Yuki", "Grace"],
+    "first_name_m": ["Bob", "Tom", "John", "Mike", "Raj", "Omar", "David", "Kenji", "Lucas", "Chen"],
+    "surname": ["Sharma", "Smith", "Garcia", "Okafor", "Tanaka", "Novak", "Patel", "Kim", "Silva", "Brown",
+                "Haddad", "Larsen"],
+    "city": ["Mumbai", "Delhi", "Tokyo", "Paris", "Berlin", "Toronto", "Nairobi", "Sydney", "Austin",
+             "Singapore", "Madrid", "Seoul", "Lagos", "Dublin"],
+}
+COMPANY_RE = re.compile(r"\b[A-Z][a-z]+(?:Corp|Tech|Soft|Labs)\b")
+LETTERED_RE = re.compile(r"\b(?:Product|Company|Model|Team|Project|Plan|Version|Building) [A-Z]\b")
+POOL_RE = re.compile(r"\b(?:" + "|".join(sorted((re.escape(n) for names in POOLS.values() for n in names),
+                                                key=len, reverse=True)) + r")\b")
+POOL_KIND = {name: kind for kind, names in POOLS.items() for name in names}
+NOT_JITTERED_RE = re.compile(r"(?:[A-Z][\w.]*|\d{1,2}:)\s*$")  # version numbers, dates, clock times
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+CLAUSE_RE = re.compile(r",\s+|;\s+|\s+and\s+")
+
+# ENTITIES
+def entities(text: str) -> List[str]:
+    """Swappable names in text: pool names, *Corp/*Tech/... companies and lettered names (Product X)"""
+    found = {m.group(0) for regex in (POOL_RE, COMPANY_RE, LETTERED_RE) for m in regex.finditer(text)}
+    return sorted(found, key=lambda e: (-len(e), e))
+
+
+def replacement(name: str, rng: random.Random, taken: set) -> Optional[str]:
+    """Another name of the same kind that does not occur in taken"""
+    if LETTERED_RE.fullmatch(name):
+        head = name[:-1]
+        choices = [head + c for c in "ABCDEFGHJKLMNPQRSTUVWXYZ" if head + c not in taken]
+    else:
+        choices = [n for n in POOLS[POOL_KIND.get(name, "company")] if n not in taken]
+    return rng.choice(choices) if choices else None
+
+
+def substitute(text: str, mapping: Dict[str, str]) -> str:
+    """Replace every whole-word key of mapping in text in one pass"""
+    if not mapping:
+        return text
+    regex = re.compile(r"\b(?:" + "|".join(re.escape(k) for k in sorted(mapping, key=len, reverse=True)) + r")\b")
+    return regex.sub(lambda m: mapping[m.group(0)], text)
+
+
+def rename_map(texts: List[str], rng: random.Random) -> Dict[str, str]:
+    """Consistent old -> new mapping for every swappable name in texts (new names never collide)"""
+    joined = " ".join(texts)
+    taken = set(entities(joined))
+    mapping = {}
+    for name in entities(joined):
+        if re.search(rf"\b{re.escape(name)}, [A-Z]", joined):  # "Paris, France": the pair must stay consistent
+            continue
+        new = replacement(name, rng, taken)
+        if new is not None:
+            mapping[name] = new
+            taken.add(new)
+    return mapping
+
+# NUMBERS AND PERIODS
+def _format_like(original: str, value: float) -> str:
+    decimals = len(original.split(".")[1]) if "." in original else 0
+    if decimals:
+        return f"{value:.{decimals}f}"
+    text = f"{int(round(value)):,}" if "," in original else str(int(round(value)))
+    return text
+
+
+def number_map(texts: List[str], rng: random.Random) -> Dict[str, str]:
+    """Consistent jitter (x0.5 - x2, same precision) of the quantities in texts; years, versions, dates and times are kept"""
+    joined = " ".join(texts)
+    existing = {m.group("value") for m in NUMBER_RE.finditer(joined)}
+    mapping = {}
+    for match in NUMBER_RE.finditer(joined):
+        value = match.group("value")
+        if value in mapping or value == "1" or (YEAR_RE.fullmatch(value) and not match.group("scale")):
+            continue
+        if NOT_JITTERED_RE.search(joined[:match.start()]) or re.match(r"\s*(?:AM|PM)\b|:", joined[match.end():]):
+            continue
+        number = float(value.replace(",", ""))
+        digits = value.replace(",", "").split(".")[0]
+        step = 10 ** (len(digits) - len(digits.rstrip("0"))) if "." not in value and number else 1
+        for _ in range(5):
+            new_number = max(2 * step, round(number * rng.uniform(0.5, 2.0) / step) * step) if "." not in value \
+                else number * rng.uniform(0.5, 2.0)
+            new = _format_like(value, new_number)
+            if new != value and new not in existing and new not in mapping.values():
+                mapping[value] = new
+                break
+    return mapping
+
+
+def substitute_numbers(text: str, mapping: Dict[str, str]) -> str:
+    if not mapping:
+        return text
+    return NUMBER_RE.sub(lambda m: m.group(0).replace(m.group("value"), mapping.get(m.group("value"),
+                                                                                    m.group("value")), 1), text)
+
+
+def shift_years(text: str, offset: int) -> str:
+    return YEAR_RE.sub(lambda m: str(int(m.group(0)) + offset), text) if offset else text
+
+# PERTURBATIONS
+def base_variant(context: str, question: str, target: str, rng: random.Random) -> tuple:
+    """renamed: the same sample with entities, quantities and years changed consistently"""
+    texts = [context, question, target]
+    names = rename_map(texts, rng)
+    numbers = number_map(texts, rng)
+    offset = rng.choice([-3, -2, -1, 0, 1, 2])
+    return tuple(shift_years(substitute_numbers(substitute(t, names), numbers), offset) for t in texts)
+
+
+def entity_swap(context: str, question: str, rng: random.Random) -> Optional[str]:
+    """Context with one name the question asks about replaced (None if the question names none of its entities)"""
+    shared = [e for e in entities(question) if re.search(rf"\b{re.escape(e)}\b", context)]
+    if not shared:
+        return None
+    name = rng.choice(shared)
+    new = replacement(name, rng, set(entities(context + " " + question)))
+    return substitute(context, {name: new}) if new else None
+
+
+def temporal_shift(context: str, question: str, rng: random.Random) -> Optional[str]:
+    """Context with the year or quarter the question asks about moved (None if it asks about none in the context)"""
+    years = set(YEAR_RE.findall(question)) & set(YEAR_RE.findall(context))
+    quarters = set(QUARTER_RE.findall(question)) & set(QUARTER_RE.findall(context))
+    options = [("year", o) for o in (-1, -2, -3, 1) if years] + [("quarter", o) for o in (1, 2, 3) if quarters]
+    rng.shuffle(options)
+    for unit, offset in options:
+        if unit == "year":
+            shifted = shift_years(context, offset)
+            if not years & set(YEAR_RE.findall(shifted)):
+                return shifted
+        else:
+            shifted = QUARTER_RE.sub(lambda m: f"Q{(int(m.group(0)[1]) - 1 + offset) % 4 + 1}", context)
+            if not quarters & set(QUARTER_RE.findall(shifted)):
+                return shifted
+    return None
+
+
+def _holds_answer(text: str, target: str) -> bool:
+    lowered = text.lower()
+    if target.lower().rstrip(".") in lowered:
+        return True
+    return bool(extract_numbers(target) & extract_numbers(text)) or \
+        any(e in text for e in entities(target))
+
+
+def field_removal(context: str, target: str) -> Optional[str]:
+    """
+    Context without the sentence holding target, or else without the trailing clause holding it
+    (the leading clause carries the subject, so it must survive); None if neither applies.
+    """
+    sentences = [p.strip() for p in SENTENCE_RE.split(context) if p.strip()]
+    kept = [p for p in sentences if not _holds_answer(p, target)]
+    if kept and len(kept) < len(sentences):
+        return " ".join(kept)
+    clauses = [p.strip() for p in CLAUSE_RE.split(context.rstrip(".")) if p.strip()]
+    if len(clauses) > 1 and not _holds_answer(clauses[0], target):
+        kept = [p for p in clauses if not _holds_answer(p, target)]
+        if len(kept) < len(clauses):
+            return ", ".join(kept) + "."
+    return None
+
+
+def applicable(row: Dict) -> List[str]:
+    """Kinds a seed row can produce"""
+    context, question = split_input(row["input"])
+    kinds = ["renamed"]
+    if row["category"] == "FULL_CONTEXT" and context:
+        probe = random.Random(0)
+        if entity_swap(context, question, probe):
+            kinds.append("entity_swap")
+        if temporal_shift(context, question, probe):
+            kinds.append("temporal_shift")
+        if field_removal(context, row["target"]):
+            kinds.append("field_removal")
+    return kinds
+
+
+def perturb(row: Dict, kind: str, rng: random.Random, line: int) -> Optional[Dict]:
+    """One variant row of kind from a seed row (None when this draw does not apply)"""
+    context, question = split_input(row["input"])
+    context, question, target = base_variant(context, question, row["target"], rng)
+    extra = json.loads(row.get("extra_metadata") or "{}")
+    category, expected = row["category"], row["expected_behavior"]
+    if kind != "renamed":
+        if kind == "entity_swap":
+            context = entity_swap(context, question, rng)
+        elif kind == "temporal_shift":
+            context = temporal_shift(context, question, rng)
+        else:
+            context = field_removal(context, target)
+        if context is None:
+            return None
+        category, expected, behavior_type, failure, target = KINDS[kind]
+        if row["eval_type"] == "taxonomy":
+            extra.update(behavior_type=behavior_type, potential_failure=failure)
+    extra.update(perturbation=kind, seed_line=line)
+    return {"eval_type": row["eval_type"], "input": f"Context: {context} Question: {question}", "target": target,
+            "category": category, "expected_behavior": expected, "extra_metadata": json.dumps(extra)}
+
+
+def generate(rows: List[Dict], n: int, seed: int = 0, kinds: Optional[List[str]] = None,
+             eval_types: Optional[List[str]] = None) -> Iterator[Dict]:
+    """
+    Stream up to n distinct variants of rows, round-robin over the applicable (seed, kind) pairs.
+    A pair that keeps producing duplicates (its seed has few variable parts) leaves the rotation.
+    """
+    eval_types = eval_types or SEED_EVAL_TYPES
+    plans = [(line, row, kind) for line, row in enumerate(rows, start=2) if row["eval_type"] in eval_types
+             for kind in applicable(row) if kinds is None or kind in kinds]
+    misses = [0] * len(plans)
+    seen = {text_digest(row["input"]) for row in rows}
+    produced = i = 0
+    while plans and produced < n:
+        slot = i % len(plans)
+        line, row, kind = plans[slot]
+        variant = perturb(row, kind, random.Random(f"{seed}:{i}"), line)
+        i += 1
+        digest = text_digest(variant["input"]) if variant else None
+        if variant is None or digest in seen:
+            misses[slot] += 1
+            if misses[slot] >= MAX_MISSES:
+                del plans[slot], misses[slot]
+            continue
+        misses[slot] = 0
+        seen.add(digest)
+        yield variant
+        produced += 1
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="Seeded synthetic perturbations of the grounding samples")
+    parser.add_argument("--data", default=DATA_PATH, help="seed CSV")
+    parser.add_argument("--out", default=OUT_PATH, help="CSV written: the seed rows followed by the variants")
+    parser.add_argument("--n", type=int, default=1000, help="variants to generate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kind", action="append", choices=list(KINDS), default=None, help="restrict kinds (repeatable)")
+    parser.add_argument("--eval-type", action="append", default=None, help=f"seed eval_types (default {SEED_EVAL_TYPES})")
+    args = parser.parse_args()
+
+    with open(args.data, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames, rows = reader.fieldnames, list(reader)
+    start = time.perf_counter()
+    counts = Counter()
+    with open(args.out, "w", encoding="utf-8", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+        for variant in generate(rows, args.n, args.seed, args.kind, args.eval_type):
+            writer.writerow(variant)
+            counts[(variant["eval_type"], json.loads(variant["extra_metadata"])["perturbation"],
+                    variant["category"])] += 1
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    print(f"{total} variants (+{len(rows)} seed rows) written to {Path(args.out)} in {elapsed:.2f}s "
+          f"({total / elapsed if elapsed else 0:,.0f}/s, seed {args.seed})")
+    for (eval_type, kind, category), n in sorted(counts.items()):
+        print(f"  {eval_type:<14} {kind:<15} {category:<20} {n:>8}")
+    if total < args.n:
+        print(f"  only {total} distinct variants could be drawn from these seeds")
+
+
+if __name__ == "__main__":
+    main()
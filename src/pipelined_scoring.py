@@ -0,0 +1,287 @@
+"""
+Pipelined Scoring:Generation and judging as two overlapped stages with their own pools.
+
+Inside one inspect sample, scoring runs after the solver and the sample keeps its slot while
+the judge model answers, so judge latency throttles generation. Here the stages are decoupled:
+1)stage 1 (generation): the tasks run with score=False; a final solver hands each finished
+  sample to the judge stage and the sample slot is released immediately
+2)queue: bounded (queue_size), so a slow judge applies backpressure instead of buffering
+  every transcript in memory
+3)stage 2 (judging): judge_workers scorer workers, optionally rate limited to judge_rate calls/s,
+  scoring while stage 1 keeps generating
+4)attach: once both stages are done the scores are written into each log through inspect's own
+  score_async (replaying the computed scores), so metrics and results are computed as usual
+
+Re-scoring an existing log with a different scorer is stage 2 on its own (--rescore).
+
+Run: python task_matrix.py --run-all --model openai/gpt-4o-mini --pipeline-scoring [--judge-workers 8] [--judge-rate 5]
+     python pipelined_scoring.py --rescore logs/<log> --suite hallucination [--category NO_CONTEXT]
+"""
+import argparse
+import asyncio
+import contextvars
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+QUEUE_SIZE = 64
+JUDGE_WORKERS = 8
+
+# JUDGE STAGE
+class RateLimiter:
+    """At most rate acquisitions per second (None = unlimited)."""
+
+    def __init__(self, rate: Optional[float] = None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class JudgeStage:
+    """Bounded queue of finished samples drained by a pool of scorer workers."""
+
+    def __init__(self, scorers: Dict[str, List[Any]], workers: int = JUDGE_WORKERS,
+                 queue_size: int = QUEUE_SIZE, rate: Optional[float] = None):
+        self.scorers = scorers  # task name -> scorers
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.limiter = RateLimiter(rate)
+        self.scores: Dict[tuple, Dict[str, Any]] = {}  # (task, model, id, epoch) -> {scorer name: Score}
+        self.failed: Dict[tuple, Dict[str, str]] = {}  # (task, model, id, epoch) -> {scorer name: error}
+        self.errors: List[str] = []
+        self.stats = {"queued": 0, "scored": 0, "failed": 0, "max_depth": 0, "queue_wait": 0.0,
+                      "judge_seconds": 0.0}
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, task_name: str, state: Any, target: Any):
+        """Called by the final solver of stage 1; blocks while the queue is full (backpressure)"""
+        key = (task_name, str(state.model), state.sample_id, state.epoch)
+        # the copied context carries the sample's active model, so a scorer's default judge resolves as in-task
+        await self.queue.put((key, state, target, contextvars.copy_context(), time.monotonic()))
+        self.stats["queued"] += 1
+        self.stats["max_depth"] = max(self.stats["max_depth"], self.queue.qsize())
+
+    async def _worker(self):
+        from inspect_ai._util.registry import registry_unqualified_name
+
+        while True:
+            key, state, target, context, queued_at = await self.queue.get()
+            self.stats["queue_wait"] += time.monotonic() - queued_at
+            try:
+                scores, failed = {}, {}
+                for scorer in self.scorers[key[0]]:
+                    name = registry_unqualified_name(scorer)
+                    await self.limiter.acquire()
+                    start = time.monotonic()
+                    try:
+                        # a task created inside context.run starts from a copy of that context
+                        scores[name] = await context.run(asyncio.ensure_future, scorer(state, target))
+                    except Exception as e:  # the other scorers of the sample still count
+                        failed[name] = f"{type(e).__name__}: {e}"
+                        self.errors.append(f"{key} {name}: {e}")
+                    self.stats["judge_seconds"] += time.monotonic() - start
+                self.scores[key] = scores
+                if failed:
+                    self.failed[key] = failed
+                    self.stats["failed"] += 1
+                else:
+                    self.stats["scored"] += 1
+            finally:
+                self.queue.task_done()
+
+    async def drain(self):
+        """Wait for every queued sample to be scored, then stop the workers"""
+        await self.queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def enqueue_for_judging(stage: JudgeStage, task_name: str):
+    """Final stage-1 solver: hand the finished sample to the judge stage"""
+    from inspect_ai.solver import solver
+
+    @solver(name="enqueue_for_judging")
+    def make_solver(task_name=task_name):
+        async def solve(state, generate):
+            await stage.submit(task_name, state, state.target)
+            return state
+
+        return solve
+
+    return make_solver()
+
+
+def replay_scorer(original: Any, task_name: str, scores: Dict[tuple, Dict[str, Any]]):
+    """
+    Scorer with the original's name and metrics that returns the score stage 2 already
+    computed, so inspect's score_async builds results and metrics exactly as in a normal run.
+    A sample the judge stage failed to score raises instead of counting as incorrect.
+    """
+    from inspect_ai._util.registry import registry_info, registry_unqualified_name
+    from inspect_ai.scorer import mean, scorer, stderr
+
+    name = registry_unqualified_name(original)
+    metrics = registry_info(original).metadata.get("metrics") or [mean(), stderr()]
+
+    @scorer(metrics=metrics, name=name)
+    def replay():
+        async def score(state, target):
+            computed = scores.get((task_name, str(state.model), state.sample_id, state.epoch), {})
+            if name not in computed:
+                raise RuntimeError(f"{name} did not score sample {state.sample_id} (judge stage error)")
+            return computed[name]
+
+        return score
+
+    return replay()
+
+
+async def attach_scores(logs: List[Any], stage: JudgeStage) -> List[Any]:
+    """
+    Write stage-2 scores into each EvalLog via score_async and save it.
+
+    Samples with a failed scorer are left out of score_async (and so out of the metrics, like
+    samples that errored during a normal run); they keep the scores that did succeed and are
+    marked with a scoring error.
+    """
+    from inspect_ai import score_async
+    from inspect_ai.log import EvalError, write_eval_log
+
+    scored = []
+    for log in logs:
+        task_name = log.eval.task
+        replay = [replay_scorer(s, task_name, stage.scores) for s in stage.scorers.get(task_name, [])]
+        samples = list(log.samples or [])
+        keys = [(task_name, log.eval.model, sample.id, sample.epoch) for sample in samples]
+        failed = [(sample, key) for sample, key in zip(samples, keys) if key in stage.failed]
+        log.samples = [sample for sample, key in zip(samples, keys) if key not in stage.failed]
+        log = await score_async(log, replay, action="overwrite")
+        for sample, key in failed:
+            errors = stage.failed[key]
+            sample.scores = stage.scores.get(key) or None
+            sample.error = EvalError(
+                message=f"Scoring failed: {'; '.join(f'{name}: {error}' for name, error in errors.items())}",
+                traceback="", traceback_ansi="")
+        if failed:
+            order = {(sample.id, sample.epoch): i for i, sample in enumerate(samples)}
+            log.samples = sorted((log.samples or []) + [sample for sample, _ in failed],
+                                 key=lambda sample: order[(sample.id, sample.epoch)])
+        log.eval.metadata = {**(log.eval.metadata or {}), "pipelined_scoring": dict(stage.stats)}
+        write_eval_log(log, log.location)
+        scored.append(log)
+    return scored
+
+# RUNNERS
+def _as_list(scorers: Any) -> List[Any]:
+    return scorers if isinstance(scorers, list) else [scorers]
+
+
+async def run_pipelined(tasks: List[Any], models: List[str], judge_workers: int = JUDGE_WORKERS,
+                        queue_size: int = QUEUE_SIZE, judge_rate: Optional[float] = None,
+                        **eval_kwargs) -> List[Any]:
+    """Stage 1 (eval_async, score=False) overlapped with stage 2 (judge pool); returns scored logs"""
+    from inspect_ai import eval_async, task_with
+    from inspect_ai.solver import chain
+
+    stage = JudgeStage({t.name: _as_list(t.scorer) for t in tasks}, judge_workers, queue_size, judge_rate)
+    pipelined = [task_with(t, solver=chain(t.solver, enqueue_for_judging(stage, t.name))) for t in tasks]
+
+    stage.start()
+    start = time.monotonic()
+    logs = await eval_async(pipelined, model=models, score=False, **eval_kwargs)
+    generation_done = time.monotonic()
+    await stage.drain()
+    stage.stats["generation_wall"] = generation_done - start
+    stage.stats["judge_tail"] = time.monotonic() - generation_done  # judging left after generation ended
+    for error in stage.errors:
+        print(f"Warning: judge stage: {error}")
+    return await attach_scores(logs, stage)
+
+
+def complete_header(log_data: Optional[Dict], log_path: Path) -> Dict:
+    """Fill the EvalLog header fields a dump does not record (eval.created, ...) so it validates"""
+    if not log_data or "eval" not in log_data:
+        raise ValueError(f"Could not read log header from {log_path}")
+    spec = log_data["eval"]
+    started = (log_data.get("stats") or {}).get("started_at")
+    if not started:
+        started = datetime.fromtimestamp(log_path.stat().st_mtime, timezone.utc).isoformat()
+    spec.setdefault("created", started)
+    spec.setdefault("dataset", {})
+    spec.setdefault("config", {})
+    spec.setdefault("task_id", spec.get("eval_id") or log_path.stem)
+    log_data.setdefault("status", "success")
+    return log_data
+
+
+async def rescore_log(log_path: Path, scorers: List[Any], judge_workers: int = JUDGE_WORKERS,
+                      queue_size: int = QUEUE_SIZE, judge_rate: Optional[float] = None,
+                      out_path: Optional[Path] = None) -> Any:
+    """Stage 2 alone: score the samples of an existing log with new scorers and write a new log"""
+    from inspect_ai.log import EvalLog, read_eval_log
+    from inspect_ai.model import ModelName
+    from inspect_ai.scorer import Target
+    from inspect_ai.solver import TaskState
+    from log_analysis import load_log_file
+
+    log_path = Path(log_path)
+    if log_path.suffix in (".eval", ".json"):
+        log = read_eval_log(str(log_path))
+    else:  # multi-document dumps and .glog copies
+        log = EvalLog.model_validate(complete_header(load_log_file(log_path), log_path))
+    task_name = log.eval.task
+    stage = JudgeStage({task_name: scorers}, judge_workers, queue_size, judge_rate)
+    stage.start()
+    for sample in log.samples or []:
+        state = TaskState(model=ModelName(log.eval.model), sample_id=sample.id, epoch=sample.epoch,
+                          input=sample.input, messages=sample.messages, target=Target(sample.target),
+                          output=sample.output, metadata=sample.metadata)
+        await stage.submit(task_name, state, state.target)
+    await stage.drain()
+    for error in stage.errors:
+        print(f"Warning: judge stage: {error}")
+
+    log.location = str(out_path or log_path.with_name(f"{log_path.name.split('.')[0]}_rescored.json"))
+    return (await attach_scores([log], stage))[0]
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="Re-score an existing log (judge stage only)")
+    parser.add_argument("--rescore", metavar="LOG", help="log to re-score (.eval, .json, dump or .glog)")
+    parser.add_argument("--suite", default="hallucination", help="scorer suite for --rescore (task_matrix.SUITES)")
+    parser.add_argument("--category", default=None, help="category passed to the suite's scorer factory")
+    parser.add_argument("--judge-workers", type=int, default=JUDGE_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--judge-rate", type=float, default=None, help="max judge calls per second")
+    args = parser.parse_args()
+
+    from eval_common import load_env
+    from task_matrix import SUITES
+
+    load_env()
+    if args.rescore:
+        scorers = _as_list(SUITES[args.suite]["scorer"](args.category))
+        log = asyncio.run(rescore_log(Path(args.rescore), scorers, args.judge_workers,
+                                      args.queue_size, args.judge_rate))
+        print(f"Re-scored log written to {log.location}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Profiling Hooks:Opt-in timers for the harness's own stages, separated from provider time.
+
+Enabled by the GROUNDEDEVALS_PROFILE environment variable (comma-separated modes):
+1)timers (or 1): wall time per stage: dataset load, Sample construction, task build,
+  system_message, use_tools schema build, tool execute, includes / judge scoring and generate
+2)cprofile: also runs cProfile over the whole run (<dir>/profile-<time>.prof, view with snakeviz
+  or python -m pstats)
+3)tracemalloc: also traces allocations (<dir>/profile-<time>-memory.txt, top allocation sites)
+
+At exit a per-run overhead summary is printed and written to <dir>/profile-<time>.json
+(<dir> = GROUNDEDEVALS_PROFILE_DIR, default "profile"): harness stages vs provider-bound
+stages (generate, judge scoring), plus the measured cost of the timers themselves.
+
+With the variable unset every hook returns the original function / solver / scorer, so a
+normal run is unchanged.
+
+Run: GROUNDEDEVALS_PROFILE=timers,cprofile python task_matrix.py --run-all --model openai/gpt-4o-mini
+"""
+import atexit
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Any, Callable, Optional
+
+ENV_VAR = "GROUNDEDEVALS_PROFILE"
+DIR_ENV_VAR = "GROUNDEDEVALS_PROFILE_DIR"
+PROVIDER_STAGES = {"generate", "score_judge"}  # waiting on a model API, not harness overhead
+MODES = {m.strip().lower() for m in os.environ.get(ENV_VAR, "").split(",") if m.strip() and m.strip() != "0"}
+if "1" in MODES:
+    MODES = (MODES - {"1"}) | {"timers"}
+ENABLED = bool(MODES)
+
+_NULL = nullcontext()
+
+# STAGE TIMERS
+class StageTimer:
+    """Call count and wall seconds of one stage."""
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.calls += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+
+STAGES: Dict[str, StageTimer] = {}
+
+
+@contextmanager
+def _timed(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGES.setdefault(name, StageTimer()).add(time.perf_counter() - start)
+
+
+def stage(name: str):
+    """Context manager timing one stage (a shared no-op when profiling is off)"""
+    return _timed(name) if ENABLED else _NULL
+
+
+def timed(name: str) -> Callable:
+    """Decorator timing every call of a sync or async function as stage name"""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        import inspect
+
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _timed(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _timed(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+# SOLVER / SCORER WRAPPERS
+def profile_solver(name: str, inner: Any) -> Any:
+    """inner solver with the same name and params, timed as stage name (inner itself when profiling is off)"""
+    if not ENABLED:
+        return inner
+    from inspect_ai._util.registry import registry_params, registry_unqualified_name, set_registry_params
+    from inspect_ai.solver import solver
+
+    @solver(name=registry_unqualified_name(inner))
+    def profiled():
+        async def solve(state, generate):
+            with _timed(name):
+                return await inner(state, generate)
+
+        return solve
+
+    wrapped = profiled()
+    set_registry_params(wrapped, registry_params(inner))  # logged plan and fingerprints see the inner args
+    return wrapped
+
+
+def scorer_stage(inner: Any) -> str:
+    """Stage name of a scorer: includes -> score_includes, model_graded_* -> score_judge"""
+    from inspect_ai._util.registry import registry_unqualified_name
+
+    name = registry_unqualified_name(inner)
+    if name.startswith("model_graded"):
+        return "score_judge"
+    return f"score_{name}"
+
+
+def profile_scorer(inner: Any) -> Any:
+    """inner scorer with the same name, params and metrics, timed (inner itself when profiling is off)"""
+    if not ENABLED:
+        return inner
+    from inspect_ai._util.registry import (registry_info, registry_params, registry_unqualified_name,
+                                           set_registry_params)
+    from inspect_ai.scorer import mean, scorer, stderr
+
+    name = scorer_stage(inner)
+    metrics = registry_info(inner).metadata.get("metrics") or [mean(), stderr()]
+
+    @scorer(metrics=metrics, name=registry_unqualified_name(inner))
+    def profiled():
+        async def score(state, target):
+            with _timed(name):
+                return await inner(state, target)
+
+        return score
+
+    wrapped = profiled()
+    set_registry_params(wrapped, registry_params(inner))  # eval.scorers options and fingerprints
+    return wrapped
+
+# RUN CAPTURE
+_RUN: Dict[str, Any] = {}
+
+
+def _timer_cost() -> float:
+    """Seconds one stage() timing adds, measured now"""
+    probe, calls = StageTimer(), 20000
+    start = time.perf_counter()
+    for _ in range(calls):
+        t = time.perf_counter()
+        probe.add(time.perf_counter() - t)
+    return (time.perf_counter() - start) / calls
+
+
+def overhead_summary(wall: Optional[float] = None) -> str:
+    """Per-stage table plus harness vs provider totals"""
+    wall = wall if wall is not None else time.perf_counter() - _RUN.get("start", time.perf_counter())
+    harness = sum(t.total for n, t in STAGES.items() if n not in PROVIDER_STAGES)
+    provider = sum(t.total for n, t in STAGES.items() if n in PROVIDER_STAGES)
+    timer_cost = _timer_cost() * sum(t.calls for t in STAGES.values())
+    lines = []
+    lines.append("=" * 78)
+    lines.append(f"HARNESS OVERHEAD (run wall {wall:.2f}s)")
+    lines.append("=" * 78)
+    lines.append(f"{'Stage':<26} {'kind':<9} {'calls':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9}")
+    lines.append("-" * 78)
+    for name, timer in sorted(STAGES.items(), key=lambda item: -item[1].total):
+        kind = "provider" if name in PROVIDER_STAGES else "harness"
+        lines.append(f"{name:<26} {kind:<9} {timer.calls:>7} {timer.total:>9.3f} "
+                     f"{timer.total / timer.calls * 1000:>9.2f} {timer.max * 1000:>9.2f}")
+    lines.append("-" * 78)
+    # stages of concurrent samples overlap, so these are summed task-seconds, not wall time
+    share = harness / (harness + provider) if harness + provider else 0.0
+    lines.append(f"Harness {harness:.3f}s vs provider {provider:.3f}s summed over samples ({share:.1%} harness); "
+                 f"timers cost ~{timer_cost * 1000:.2f} ms")
+    lines.append("=" * 78)
+    return "\n".join(lines)
+
+
+def start():
+    """Begin the run capture (called once on import when profiling is enabled)"""
+    if _RUN:
+        return
+    _RUN["start"] = time.perf_counter()
+    if "cprofile" in MODES:
+        import cProfile
+        _RUN["profiler"] = cProfile.Profile()
+        _RUN["profiler"].enable()
+    if "tracemalloc" in MODES:
+        import tracemalloc
+        tracemalloc.start(25)
+    atexit.register(finish)
+
+
+def finish():
+    """Stop capture, print the overhead summary and write the profile files"""
+    if not _RUN or _RUN.get("finished"):
+        return
+    _RUN["finished"] = True
+    wall = time.perf_counter() - _RUN["start"]
+    out_dir = Path(os.environ.get(DIR_ENV_VAR, "profile"))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    prefix = out_dir / f"profile-{time.strftime('%Y%m%dT%H%M%S')}"
+    if "profiler" in _RUN:
+        _RUN["profiler"].disable()
+        _RUN["profiler"].dump_stats(f"{prefix}.prof")
+    if "tracemalloc" in MODES:
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        with open(f"{prefix}-memory.txt", "w", encoding="utf-8") as f:
+            f.write(f"current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n\n")
+            for stat in snapshot.statistics("lineno")[:25]:
+                f.write(f"{stat}\n")
+    summary = overhead_summary(wall)
+    with open(f"{prefix}.json", "w", encoding="utf-8") as f:
+        json.dump({"wall": wall, "modes": sorted(MODES),
+                   "stages": {n: {"calls": t.calls, "total": t.total, "max": t.max,
+                                  "provider": n in PROVIDER_STAGES} for n, t in STAGES.items()}}, f, indent=2)
+    print(summary)
+    print(f"Profile written to {prefix}.*")
+
+
+if ENABLED:
+    start()
@@ -7,13 +7,7 @@ Hypothesis:
 4)COT: Better reasoning, fewer errors
 Run: inspect eval prompt_variation_eval.py@strict_prompt_eval --model bedrock/anthropic.claude-3-sonnet-20240229-v1:0
 """
-from dotenv import load_dotenv
-load_dotenv()
-
-from inspect_ai import Task, task
-from inspect_ai.dataset import Sample, MemoryDataset
-from inspect_ai.solver import generate, system_message
-from inspect_ai.scorer import model_graded_fact, includes
+from eval_common import task, load_samples, build_task
 
 # PROMPT VARIANTS
 STRICT_PROMPT = """You are a precise assistant that ONLY answers based on the provided context.
@@ -46,77 +40,64 @@ COT_PROMPT = """You are a precise assistant. Before answering:
 
 Think through this carefully."""
 
+# MATRIX AXES (expanded by task_matrix.py)
+EVAL_TYPE = "prompt_variation"
+PROMPTS = {
+    "strict": STRICT_PROMPT,
+    "moderate": MODERATE_PROMPT,
+    "weak": WEAK_PROMPT,
+    "cot": COT_PROMPT
+}
+CATEGORIES = []
+REFUSAL_PATTERNS = ["cannot answer", "not in", "not specified", "not mentioned"]
+
+
+def variation_scorer(category=None):
+    """Judge + refusal pattern matching, identical for every prompt variant"""
+    from inspect_ai.scorer import model_graded_fact, includes
+
+    return [model_graded_fact(), includes(REFUSAL_PATTERNS)]
+
 # TASKS
 def load_prompt_variation_samples():
     """Load prompt_variation samples from csv"""
-    import csv
-    samples = []
-    with open("../data/all_samples.csv", "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row["eval_type"] == "prompt_variation":
-                samples.append(Sample(
-                    input=row["input"],
-                    target=row["target"],
-                    metadata={
-                        "category": row["category"],
-                        "expected_behavior": row["expected_behavior"],
-                        "eval_type": row["eval_type"]
-                    }
-                ))
-    return MemoryDataset(samples)
+    return load_samples(EVAL_TYPE)
 
 
-@task
-def strict_prompt_eval():
-    """STRICT instructions - loads from csv"""
-    return Task(
+def prompt_variant_task(variant, output_budget=False):
+    """Same 12 samples, only the system prompt changes (output_budget: per-category max_tokens, output_budget.py)"""
+    return build_task(
+        f"{variant}_prompt_eval",
         dataset=load_prompt_variation_samples(),
-        solver=[system_message(STRICT_PROMPT), generate()],
-        scorer=[
-            model_graded_fact(),
-            includes(["cannot answer", "not in", "not specified", "not mentioned"])
-        ]
+        prompt=PROMPTS[variant],
+        scorer=variation_scorer(),
+        output_budget=output_budget,
+        prompt_name=variant
     )
 
 
 @task
-def moderate_prompt_eval():
+def strict_prompt_eval(output_budget=False):
+    """STRICT instructions - loads from csv"""
+    return prompt_variant_task("strict", output_budget)
+
+
+@task
+def moderate_prompt_eval(output_budget=False):
     """MODERATE instructions - loads from csv"""
-    return Task(
-        dataset=load_prompt_variation_samples(),
-        solver=[system_message(MODERATE_PROMPT), generate()],
-        scorer=[
-            model_graded_fact(),
-            includes(["cannot answer", "not in", "not specified", "not mentioned"])
-        ]
-    )
+    return prompt_variant_task("moderate", output_budget)
 
 
 @task
-def weak_prompt_eval():
+def weak_prompt_eval(output_budget=False):
     """WEAK instructions - loads from csv"""
-    return Task(
-        dataset=load_prompt_variation_samples(),
-        solver=[system_message(WEAK_PROMPT), generate()],
-        scorer=[
-            model_graded_fact(),
-            includes(["cannot answer", "not in", "not specified", "not mentioned"])
-        ]
-    )
+    return prompt_variant_task("weak", output_budget)
 
 
 @task
-def cot_prompt_eval():
+def cot_prompt_eval(output_budget=False):
     """CHAIN-OF-THOUGHT instructions - loads from csv"""
-    return Task(
-        dataset=load_prompt_variation_samples(),
-        solver=[system_message(COT_PROMPT), generate()],
-        scorer=[
-            model_graded_fact(),
-            includes(["cannot answer", "not in", "not specified", "not mentioned"])
-        ]
-    )
+    return prompt_variant_task("cot", output_budget)
 
 # MAIN
 if __name__ == "__main__":
@@ -131,5 +112,11 @@ Tasks:
 Run all:
   inspect eval prompt_variation_eval.py@strict_prompt_eval --model bedrock/anthropic.claude-3-sonnet-20240229-v1:0
   inspect eval prompt_variation_eval.py@weak_prompt_eval --model bedrock/anthropic.claude-3-sonnet-20240229-v1:0
+
+All variants as one interleaved run:
+  python task_matrix.py --run-all --model openai/gpt-4o-mini
+
+Per-category max_tokens + refusal early stop (tokens saved vs a plain run: python output_budget.py LOG --compare BASELINE):
+  inspect eval prompt_variation_eval.py@cot_prompt_eval -T output_budget=true --model openai/gpt-4o-mini
 Compare results in: inspect view
 """)
@@ -0,0 +1,305 @@
+"""
+Retrieval Context Builder:BM25 over a local document corpus builds each sample's Context.
+
+The CSV inlines one-sentence contexts; a RAG workload retrieves passages instead:
+1)index: every .txt / .md file under the corpus directory is split into passages (paragraphs,
+  long ones cut into PASSAGE_WORDS windows) and added to an inverted index persisted in
+  <corpus>/.bm25_index; a rebuild only re-reads files whose size or mtime changed and drops
+  the passages of deleted files
+2)query: Okapi BM25 (k1 1.5, b 0.75) over the question's terms, top-k passages
+3)cache: results per (question, k) are kept in memory and in <corpus>/.bm25_cache, which is
+  discarded whenever the index changes
+4)distractors: optional near-miss passages (ranked just below the top k, from other documents)
+  shuffled into the context deterministically, for MISLEADING_CONTEXT-style tests
+
+The sample's question is kept; its Context is replaced by the retrieved passages and the
+passage ids are recorded in metadata["retrieved"].
+
+Run: python retrieval.py --build ../data/corpus
+     python retrieval.py --query "What was TechCorp's Q3 revenue?" ../data/corpus [--k 3]
+     python retrieval.py --bench 100000 ../data/corpus
+     inspect eval hallucination_eval.py@rag_grounding_eval -T corpus=../data/corpus -T k=3 -T distractors=2 --model ...
+"""
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Any
+
+from text_features import split_input
+
+INDEX_NAME = ".bm25_index"
+CACHE_NAME = ".bm25_cache"
+CORPUS_PATTERNS = ("*.txt", "*.md")
+PASSAGE_WORDS = 120
+DENSE_FRACTION = 0.05  # terms in more passages than this only re-score candidates (see BM25Index.search)
+K1 = 1.5
+B = 0.75
+TERM_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from has have how in is it its of on or that the this "
+    "to was were what when where which who why will with".split()
+)
+
+
+def terms(text: str) -> List[str]:
+    return [t for t in TERM_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def split_passages(text: str, words: int = PASSAGE_WORDS) -> List[str]:
+    """Paragraphs (blank-line separated); paragraphs longer than words are cut into windows"""
+    passages = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        tokens = paragraph.split()
+        for start in range(0, len(tokens), words):
+            passages.append(" ".join(tokens[start:start + words]))
+    return [p for p in passages if p]
+
+# INDEX
+class BM25Index:
+    """Inverted index over corpus passages, persisted and updated file by file."""
+
+    def __init__(self, corpus_dir: Path):
+        self.corpus_dir = Path(corpus_dir)
+        self.path = self.corpus_dir / INDEX_NAME
+        self.files: Dict[str, Dict] = {}  # relative path -> {"size", "mtime", "passages": [pid]}
+        self.passages: Dict[int, List] = {}  # pid -> [relative path, text, length in terms]
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)  # term -> {pid: term frequency}
+        self.next_id = 0
+        self.total_length = 0
+        self.version = ""
+        self._impacts: Dict[str, Dict[int, float]] = {}  # term -> {pid: idf x saturated tf}, filled on first query
+        self._max_impact: Dict[str, float] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.files, self.next_id, self.version = data["files"], data["next_id"], data["version"]
+            self.passages = {int(pid): p for pid, p in data["passages"].items()}
+            for term, posting in data["postings"].items():
+                self.postings[term] = {int(pid): tf for pid, tf in posting.items()}
+            self.total_length = sum(p[2] for p in self.passages.values())
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files, "next_id": self.next_id, "version": self.version,
+                       "passages": self.passages, "postings": self.postings}, f)
+
+    def _remove_file(self, name: str):
+        for pid in self.files.pop(name)["passages"]:
+            _, _, length = self.passages.pop(pid)
+            self.total_length -= length
+        # their postings are dropped in one sweep at the end of build()
+
+    def _add_file(self, name: str, text: str, stat):
+        pids = []
+        for passage in split_passages(text):
+            pid = self.next_id
+            self.next_id += 1
+            passage_terms = terms(passage)
+            for term, tf in Counter(passage_terms).items():
+                self.postings[term][pid] = tf
+            self.passages[pid] = [name, passage, len(passage_terms)]
+            self.total_length += len(passage_terms)
+            pids.append(pid)
+        self.files[name] = {"size": stat.st_size, "mtime": stat.st_mtime, "passages": pids}
+
+    def build(self) -> Dict[str, int]:
+        """Bring the index up to date with the corpus directory; returns files added / updated / removed"""
+        current = {}
+        for pattern in CORPUS_PATTERNS:
+            for path in self.corpus_dir.rglob(pattern):
+                current[path.relative_to(self.corpus_dir).as_posix()] = path
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        for name in [n for n in self.files if n not in current]:
+            self._remove_file(name)
+            stats["removed"] += 1
+        for name, path in sorted(current.items()):
+            stat = path.stat()
+            known = self.files.get(name)
+            if known and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime:
+                stats["unchanged"] += 1
+                continue
+            if known:
+                self._remove_file(name)
+                stats["updated"] += 1
+            else:
+                stats["added"] += 1
+            self._add_file(name, path.read_text(encoding="utf-8", errors="replace"), stat)
+        if stats["removed"] or stats["updated"]:
+            for term in list(self.postings):
+                posting = {pid: tf for pid, tf in self.postings[term].items() if pid in self.passages}
+                if posting:
+                    self.postings[term] = posting
+                else:
+                    del self.postings[term]
+        if stats["added"] or stats["updated"] or stats["removed"]:
+            self._impacts, self._max_impact = {}, {}
+            self.version = hashlib.sha1(json.dumps(
+                sorted((n, f["size"], f["mtime"]) for n, f in self.files.items())).encode("utf-8")).hexdigest()[:16]
+            self.save()
+        return stats
+
+    def _impact(self, term: str) -> Dict[int, float]:
+        """BM25 contribution of term to every passage containing it (computed once per index version)"""
+        impact = self._impacts.get(term)
+        if impact is None:
+            posting = self.postings.get(term) or {}
+            n, average = len(self.passages), self.total_length / max(1, len(self.passages))
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            impact = {pid: idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * self.passages[pid][2] / average))
+                      for pid, tf in posting.items()}
+            self._impacts[term] = impact
+            self._max_impact[term] = max(impact.values(), default=0.0)
+        return impact
+
+    def search(self, query: str, k: int = 3) -> List[tuple]:
+        """
+        [(pid, score)] of the top k passages for query.
+
+        Rare terms are scored over their whole posting list. Terms in more than DENSE_FRACTION of
+        the passages only add to passages already scored, when their summed maximum impact
+        cannot lift any other passage into the top k (MaxScore pruning, same result as full scoring).
+        """
+        dense_df = DENSE_FRACTION * len(self.passages)
+        query_terms = [t for t in set(terms(query)) if t in self.postings]
+        sparse = [t for t in query_terms if len(self.postings[t]) <= dense_df]
+        dense = [t for t in query_terms if len(self.postings[t]) > dense_df]
+        scores: Dict[int, float] = defaultdict(float)
+        for term in sparse:
+            for pid, weight in self._impact(term).items():
+                scores[pid] += weight
+        if dense:
+            impacts = [self._impact(term) for term in dense]
+            bound = sum(self._max_impact[term] for term in dense)
+            kth = heapq.nlargest(k, scores.values())
+            if len(kth) == k and kth[-1] >= bound:
+                for impact in impacts:
+                    for pid in scores:
+                        scores[pid] += impact.get(pid, 0.0)
+            else:
+                for impact in impacts:
+                    for pid, weight in impact.items():
+                        scores[pid] += weight
+        return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+
+# CONTEXT BUILDER
+class Retriever:
+    """BM25 index + per-question result cache, building Context strings for samples."""
+
+    def __init__(self, corpus_dir: Path, build: bool = True):
+        if not Path(corpus_dir).is_dir():
+            raise FileNotFoundError(f"Corpus directory not found: {corpus_dir}")
+        self.index = BM25Index(corpus_dir)
+        self.cache_path = Path(corpus_dir) / CACHE_NAME
+        self.hits = self.misses = 0
+        if build:
+            self.build()
+        else:
+            self.load_cache()
+
+    def build(self) -> Dict[str, int]:
+        """Build or update the index, then load the cache entries of the new index version"""
+        stats = self.index.build()
+        self.load_cache()
+        return stats
+
+    def load_cache(self):
+        self.cache: Dict[str, List] = {}
+        self.dirty = False
+        if self.cache_path.exists():
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.index.version:  # stale once the index changed
+                self.cache = data["results"]
+
+    def save(self):
+        if self.dirty:
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.index.version, "results": self.cache}, f)
+            self.dirty = False
+
+    def retrieve(self, question: str, k: int = 3) -> List[List]:
+        """[(pid, score)] of the top k passages, from the cache when this question was asked before"""
+        key = f"{k}\x00{' '.join(question.lower().split())}"
+        if key in self.cache:
+            self.hits += 1
+            return self.cache[key]
+        self.misses += 1
+        result = [[pid, round(score, 4)] for pid, score in self.index.search(question, k)]
+        self.cache[key] = result
+        self.dirty = True
+        return result
+
+    def context(self, question: str, k: int = 3, distractors: int = 0) -> tuple:
+        """(context text, passage ids, distractor ids) for a question"""
+        ranked = self.retrieve(question, k + (4 * distractors if distractors else 0))
+        top = [pid for pid, _ in ranked[:k]]
+        sources = {self.index.passages[pid][0] for pid in top}
+        near_miss = [pid for pid, _ in ranked[k:] if self.index.passages[pid][0] not in sources][:distractors]
+        chosen = top + near_miss
+        rng = random.Random(hashlib.sha1(question.encode("utf-8")).hexdigest())  # same order every run
+        if near_miss:
+            rng.shuffle(chosen)
+        return " ".join(self.index.passages[pid][1] for pid in chosen), top, near_miss
+
+    def apply(self, samples: List[Any], k: int = 3, distractors: int = 0) -> List[Any]:
+        """Samples with their Context replaced by retrieved passages (the question is kept)"""
+        built = []
+        for sample in samples:
+            text = sample.input if isinstance(sample.input, str) else str(sample.input)
+            _, question = split_input(text)
+            question = question or text
+            context, top, near_miss = self.context(question, k, distractors)
+            built.append(sample.model_copy(update={
+                "input": f"Context: {context} Question: {question}",
+                "metadata": {**(sample.metadata or {}), "retrieved": top, "distractors": near_miss}
+            }))
+        self.save()
+        return built
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="BM25 retrieval over a local corpus")
+    parser.add_argument("corpus", help="directory of .txt / .md documents")
+    parser.add_argument("--build", action="store_true", help="build or update the index")
+    parser.add_argument("--query", default=None, help="print the top passages for one question")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--bench", type=int, metavar="N", default=None,
+                        help="time N queries (cold, then cached) built from corpus sentences")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    retriever = Retriever(Path(args.corpus), build=False)
+    stats = retriever.build()
+    print(f"Index: {len(retriever.index.files)} files, {len(retriever.index.passages)} passages, "
+          f"{len(retriever.index.postings)} terms ({', '.join(f'{v} {k}' for k, v in stats.items())}) "
+          f"in {time.perf_counter() - start:.2f}s")
+    if args.query:
+        for pid, score in retriever.retrieve(args.query, args.k):
+            name, text, _ = retriever.index.passages[pid]
+            print(f"  {score:>7.3f}  {name}#{pid}  {text[:100]}")
+        retriever.save()
+    if args.bench:
+        rng = random.Random(0)
+        texts = [p[1].split() for p in retriever.index.passages.values()]
+        questions = []
+        for _ in range(args.bench):
+            words = rng.choice(texts)
+            start_word = rng.randrange(max(1, len(words) - 8))
+            questions.append(" ".join(words[start_word:start_word + 8]))
+        for label in ("cold", "cached"):
+            start = time.perf_counter()
+            for question in questions:
+                retriever.retrieve(question, args.k)
+            elapsed = time.perf_counter() - start
+            print(f"  {label}: {args.bench} queries in {elapsed:.2f}s ({args.bench / elapsed:,.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Longest-Job-First Scheduling:Dispatches the most expensive samples first to cut run makespan.
+
+Inspect starts a task's samples in dataset order as connections free up, so a slow sample that
+happens to sit at the end of the dataset runs alone after everything else has finished.
+Reordering each dataset by predicted cost (and the tasks by their total) is classic LPT list
+scheduling: the long jobs overlap with the short ones instead of trailing them.
+
+Per-sample cost (seconds) is predicted from the results store of prior logs, first match wins:
+1)fingerprint: the exact same sample, task config and model ran before
+2)input + model: the same input ran under another prompt / scorer for this model
+3)input: the same input ran for any model
+4)length fit: seconds ~ a + b * input characters, fitted per eval_type (tokens stand in for
+  time where a log has no total_time)
+
+Run: python sample_scheduler.py --report [--log-dir logs] [--workers 10]
+     python task_matrix.py --run-all --model openai/gpt-4o-mini --order ljf
+"""
+import argparse
+import heapq
+import statistics
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from incremental_eval import ResultsStore, STORE_NAME, sample_fingerprint, task_config
+
+DEFAULT_WORKERS = 10  # inspect's default max_connections per model
+
+
+def _input_text(sample_input: Any) -> str:
+    return sample_input if isinstance(sample_input, str) else str(sample_input)
+
+
+def _tokens(record: Dict) -> int:
+    return sum(u.get("total_tokens", 0) for u in (record.get("model_usage") or {}).values())
+
+# COST MODEL
+class CostModel:
+    """Predicts per-sample seconds from prior results (see module docstring for the tiers)."""
+
+    def __init__(self, records: List[Dict], exclude_log: Optional[str] = None):
+        records = [r for r in records if r.get("log") != exclude_log]
+        timed = [r for r in records if r.get("total_time")]
+        # seconds per token, to cost records that only carry token usage
+        rates = [r["total_time"] / _tokens(r) for r in timed if _tokens(r)]
+        self.seconds_per_token = statistics.median(rates) if rates else None
+
+        self.by_fingerprint: Dict[str, List[float]] = defaultdict(list)
+        self.by_input_model: Dict[tuple, List[float]] = defaultdict(list)
+        self.by_input: Dict[str, List[float]] = defaultdict(list)
+        points: Dict[str, List[tuple]] = defaultdict(list)
+        for record in records:
+            cost = self._cost(record)
+            if cost is None:
+                continue
+            text = _input_text(record.get("input"))
+            if record.get("fingerprint"):
+                self.by_fingerprint[record["fingerprint"]].append(cost)
+            self.by_input_model[(text, record.get("model"))].append(cost)
+            self.by_input[text].append(cost)
+            eval_type = (record.get("metadata") or {}).get("eval_type", "")
+            points[eval_type].append((len(text), cost))
+            points[None].append((len(text), cost))
+        self.fits = {eval_type: self._fit(xy) for eval_type, xy in points.items()}
+
+    def _cost(self, record: Dict) -> Optional[float]:
+        if record.get("total_time"):
+            return float(record["total_time"])
+        if self.seconds_per_token and _tokens(record):
+            return _tokens(record) * self.seconds_per_token
+        return None
+
+    @staticmethod
+    def _fit(points: List[tuple]) -> tuple:
+        """Least-squares (a, b) for seconds = a + b * chars (b = 0 if lengths don't vary)"""
+        mean_x = statistics.fmean(x for x, _ in points)
+        mean_y = statistics.fmean(y for _, y in points)
+        var_x = sum((x - mean_x) ** 2 for x, _ in points)
+        if var_x == 0:
+            return mean_y, 0.0
+        b = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+        return mean_y - b * mean_x, b
+
+    def predict(self, sample_input: Any, metadata: Optional[Dict] = None, model: Optional[str] = None,
+                fingerprint: Optional[str] = None) -> tuple:
+        """(predicted seconds, tier used)"""
+        text = _input_text(sample_input)
+        if fingerprint and fingerprint in self.by_fingerprint:
+            return statistics.fmean(self.by_fingerprint[fingerprint]), "fingerprint"
+        if (text, model) in self.by_input_model:
+            return statistics.fmean(self.by_input_model[(text, model)]), "input+model"
+        if text in self.by_input:
+            return statistics.fmean(self.by_input[text]), "input"
+        eval_type = (metadata or {}).get("eval_type", "")
+        fit = self.fits.get(eval_type) or self.fits.get(None)
+        if fit is None:
+            return float(len(text)), "length"  # no history: relative cost only
+        a, b = fit
+        return max(a + b * len(text), 0.0), "length fit"
+
+
+def load_cost_model(log_dir: str = "logs") -> tuple:
+    """(CostModel, records) from the results store of log_dir, refreshed incrementally"""
+    store = ResultsStore(Path(log_dir) / STORE_NAME)
+    store.refresh(log_dir)
+    records = []
+    for fingerprint, epochs in store.samples.items():
+        for record in epochs.values():
+            records.append(dict(record, fingerprint=fingerprint))
+    return CostModel(records), records
+
+# SCHEDULING
+def longest_first(items: List[Any], costs: List[float]) -> List[Any]:
+    """items reordered by descending cost (stable, so ties keep dataset order)"""
+    order = sorted(range(len(items)), key=lambda i: -costs[i])
+    return [items[i] for i in order]
+
+
+def simulate_makespan(costs: List[float], workers: int = DEFAULT_WORKERS) -> float:
+    """Wall time of list scheduling: each job, in order, starts on the first free worker"""
+    free = [0.0] * max(1, min(workers, len(costs) or 1))
+    for cost in costs:
+        heapq.heappush(free, heapq.heappop(free) + cost)
+    return max(free)
+
+
+def choose_order(items: List[Any], costs: List[float], workers: int = DEFAULT_WORKERS) -> tuple:
+    """
+    (items, costs, "ljf" | "default"): longest-first unless the predicted makespan of the
+    dataset order is already shorter (LPT is a 4/3-approximation, not always better).
+    """
+    ljf_items, ljf_costs = longest_first(items, costs), sorted(costs, reverse=True)
+    if simulate_makespan(ljf_costs, workers) < simulate_makespan(costs, workers):
+        return ljf_items, ljf_costs, "ljf"
+    return list(items), list(costs), "default"
+
+
+def cell_configs(cells: List[Dict], models: List[str]) -> Dict[str, Dict[str, Dict]]:
+    """cell name -> model -> fingerprint config (incremental_eval.task_config) of matrix cells"""
+    from task_matrix import SUITES
+
+    configs = {}
+    for cell in cells:
+        scorers = SUITES[cell["suite"]]["scorer"](cell["category"])
+        scorers = scorers if isinstance(scorers, list) else [scorers]
+        configs[cell["name"]] = {model: task_config(cell, model, scorers) for model in models}
+    return configs
+
+
+def plan_longest_first(datasets: Dict[str, List[Any]], model: CostModel,
+                       models: Optional[List[str]] = None, workers: int = DEFAULT_WORKERS,
+                       configs: Optional[Dict[str, Dict[str, Dict]]] = None) -> List[Dict]:
+    """
+    Order every dataset's samples longest-first, and the datasets by total predicted cost.
+
+    A task's dataset is shared by all models of one eval() call, so a sample's cost is its
+    predicted cost summed over the models. configs (cell_configs) fingerprints each sample per
+    dataset and model, so a sample that ran under the same prompt and scorers before is costed
+    from those runs rather than from every prompt its input ran under. Returns one entry per
+    dataset name with the reordered samples and the costs needed by plan_report.
+    """
+    models = models or [None]
+    configs = configs or {}
+    plan = []
+    for name, samples in datasets.items():
+        costs, tiers = [], defaultdict(int)
+        for sample in samples:
+            cost = 0.0
+            for model_name in models:
+                config = configs.get(name, {}).get(model_name)
+                fingerprint = sample_fingerprint(sample.input, sample.target, sample.metadata, config) \
+                    if config else None
+                seconds, tier = model.predict(sample.input, sample.metadata, model_name, fingerprint)
+                cost += seconds
+                tiers[tier] += 1
+            costs.append(cost)
+        ordered, ordered_costs, order = choose_order(samples, costs, workers)
+        plan.append({"name": name, "samples": ordered, "costs": costs, "ordered_costs": ordered_costs,
+                     "order": order, "tiers": dict(tiers)})
+    plan.sort(key=lambda entry: -sum(entry["costs"]))
+    return plan
+
+
+def plan_report(plan: List[Dict], workers: int = DEFAULT_WORKERS) -> str:
+    """Predicted makespan per task, default vs longest-first order"""
+    lines = [f"{'Task':<40} {'N':>4} {'default s':>10} {'chosen s':>9} {'order':>8} {'saved':>7}  predicted by"]
+    lines.append("-" * 110)
+    for entry in plan:
+        default = simulate_makespan(entry["costs"], workers)
+        chosen = simulate_makespan(entry["ordered_costs"], workers)
+        saved = 1 - chosen / default if default else 0.0
+        tiers = ", ".join(f"{tier} {n}" for tier, n in sorted(entry["tiers"].items()))
+        lines.append(f"{entry['name'][:40]:<40} {len(entry['costs']):>4} {default:>10.1f} {chosen:>9.1f} "
+                     f"{entry['order']:>8} {saved:>7.1%}  {tiers}")
+    return "\n".join(lines)
+
+# REPLAY REPORT
+def replay_report(log_dir: str = "logs", workers: int = DEFAULT_WORKERS) -> str:
+    """
+    Makespan saved on past runs: every logged run is replayed with its ACTUAL per-sample times,
+    once in dataset order and once in the order a cost model fitted on all OTHER logs would
+    have chosen (leave-one-out, so a run never predicts itself).
+    """
+    _, records = load_cost_model(log_dir)
+    runs: Dict[str, List[Dict]] = defaultdict(list)
+    for record in records:
+        if record.get("total_time"):
+            runs[record["log"]].append(record)
+
+    lines = []
+    lines.append("=" * 100)
+    lines.append(f"LONGEST-JOB-FIRST REPLAY ({workers} workers, actual sample times)")
+    lines.append("=" * 100)
+    lines.append(f"{'Task':<28} {'Model':<34} {'N':>4} {'default s':>10} {'LJF s':>8} {'oracle s':>9} {'saved':>7}")
+    lines.append("-" * 100)
+    total_default = total_ljf = total_oracle = 0.0
+    for log, run in sorted(runs.items(), key=lambda item: (item[1][0]["task"], item[1][0]["model"])):
+        run.sort(key=lambda r: (r["epoch"], str(r["id"]).zfill(8)))
+        actual = [float(r["total_time"]) for r in run]
+        cost_model = CostModel(records, exclude_log=log)
+        predicted = [cost_model.predict(r["input"], r.get("metadata"), r["model"], r.get("fingerprint"))[0]
+                     for r in run]
+        default = simulate_makespan(actual, workers)
+        ljf = simulate_makespan(choose_order(actual, predicted, workers)[0], workers)
+        oracle = simulate_makespan(sorted(actual, reverse=True), workers)
+        total_default += default
+        total_ljf += ljf
+        total_oracle += oracle
+        lines.append(f"{run[0]['task'][:28]:<28} {run[0]['model'][-34:]:<34} {len(run):>4} {default:>10.1f} "
+                     f"{ljf:>8.1f} {oracle:>9.1f} {1 - ljf / default if default else 0.0:>7.1%}")
+    if total_default:
+        lines.append("-" * 100)
+        lines.append(f"Total makespan: {total_default:.1f}s -> {total_ljf:.1f}s "
+                     f"({1 - total_ljf / total_default:.1%} saved; "
+                     f"perfect prediction would reach {total_oracle:.1f}s, {1 - total_oracle / total_default:.1%})")
+    lines.append("=" * 100)
+    return "\n".join(lines)
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="Longest-job-first sample scheduling")
+    parser.add_argument("--report", action="store_true", help="replay past runs: default vs LJF makespan")
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent samples (max_connections)")
+    args = parser.parse_args()
+
+    if args.report:
+        print(replay_report(args.log_dir, args.workers))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Declarative Task Matrix:Expands prompts x category filters x tool sets x models into ONE interleaved workload.
+
+Instead of many sequential `inspect eval file.py@task` invocations, a matrix spec lists which
+axes to cross for each suite. Every cell becomes a Task built from the shared dataset cache
+(eval_common.load_rows), and the whole grid is handed to a single inspect eval() call so all
+tasks x models share one scheduling pool and provider concurrency stays saturated.
+
+Spec format (suite -> axes, omitted axes default to [None]):
+    {"hallucination": {"prompts": ["strict_grounding"], "categories": [None, "NO_CONTEXT"]},
+     "tool_agent": {"prompts": ["tool_agent"], "tool_sets": ["all", "multi"]}}
+"tool_set_prompts": {tool_set: prompt} pairs each tool set with one prompt instead of crossing
+the prompts axis with it (the default tool_agent cells match the hand-written @tasks this way).
+
+Run: python task_matrix.py --run-all --model openai/gpt-4o-mini --model openai/gpt-4
+Or one cell: inspect eval task_matrix.py@matrix_cell -T name=prompt_variation-cot --model openai/gpt-4
+"""
+import argparse
+import itertools
+
+from eval_common import DATA_PATH, task, load_samples, build_task
+import hallucination_eval
+import prompt_variation_eval
+import tool_agent_eval
+import failure_taxonomy
+import multi_model_eval
+
+# SUITES (eval module + its scorer factory)
+SUITES = {
+    "hallucination": {"module": hallucination_eval, "scorer": hallucination_eval.grounding_scorer},
+    "prompt_variation": {"module": prompt_variation_eval, "scorer": prompt_variation_eval.variation_scorer},
+    "tool_agent": {"module": tool_agent_eval, "scorer": tool_agent_eval.tool_scorer},
+    "taxonomy": {"module": failure_taxonomy, "scorer": failure_taxonomy.taxonomy_scorer},
+    "behavioral": {"module": multi_model_eval, "scorer": multi_model_eval.behavioral_scorer},
+}
+
+# DEFAULT GRID (covers every hand-written @task in the eval modules)
+DEFAULT_MATRIX = {
+    "hallucination": {"prompts": ["strict_grounding"], "categories": [None] + hallucination_eval.CATEGORIES},
+    "prompt_variation": {"prompts": list(prompt_variation_eval.PROMPTS)},
+    "tool_agent": {"tool_sets": list(tool_agent_eval.TOOL_SETS), "tool_set_prompts": tool_agent_eval.TOOL_SET_PROMPTS},
+    "taxonomy": {"prompts": ["taxonomy"]},
+    "behavioral": {"prompts": ["behavioral"]},
+}
+
+# MATRIX EXPANSION
+def cell_name(suite, prompt, category=None, tool_set=None):
+    """Stable task name for one cell, e.g. hallucination-strict_grounding-no_context"""
+    parts = [suite, prompt]
+    if category:
+        parts.append(category.lower())
+    if tool_set:
+        parts.append(f"tools_{tool_set}")
+    return "-".join(parts)
+
+
+def expand_matrix(spec=None):
+    """Expand a matrix spec into a list of cell dicts (suite, prompt, category, tool_set, name)"""
+    spec = spec or DEFAULT_MATRIX
+    cells = []
+    for suite, axes in spec.items():
+        if suite not in SUITES:
+            raise ValueError(f"Unknown suite '{suite}'. Available: {', '.join(SUITES)}")
+        module = SUITES[suite]["module"]
+        prompts = axes.get("prompts") or list(module.PROMPTS)
+        combos = itertools.product(prompts, axes.get("categories", [None]), axes.get("tool_sets", [None]))
+        paired = axes.get("tool_set_prompts")
+        if paired:
+            missing = [tool_set for tool_set in axes["tool_sets"] if tool_set not in paired]
+            if missing:
+                raise ValueError(f"No prompt paired with tool set(s) {', '.join(missing)} for suite '{suite}'")
+            combos = [(paired[tool_set], category, tool_set)
+                      for category, tool_set in itertools.product(axes.get("categories", [None]), axes["tool_sets"])]
+        for prompt, category, tool_set in combos:
+            if prompt not in module.PROMPTS:
+                raise ValueError(f"Unknown prompt '{prompt}' for suite '{suite}'")
+            if tool_set is not None and tool_set not in getattr(module, "TOOL_SETS", {}):
+                raise ValueError(f"Unknown tool set '{tool_set}' for suite '{suite}'")
+            cells.append({
+                "name": cell_name(suite, prompt, category, tool_set),
+                "suite": suite,
+                "prompt": prompt,
+                "category": category,
+                "tool_set": tool_set
+            })
+    return cells
+
+
+def build_cell_task(cell, dataset=None, model=None, budget=None, data=DATA_PATH, output_budget=None):
+    """
+    Build the Task for one matrix cell from the shared dataset cache of the CSV at data (or an explicit subset).
+
+    budget (token_budget.TokenBudget) pre-flights the cached dataset; an explicit subset is used as given.
+    output_budget (output_budget.OutputBudget) caps max_tokens per category and prompt of tool-free cells.
+    """
+    suite = SUITES[cell["suite"]]
+    module = suite["module"]
+    tools = None
+    requires = None
+    if cell["tool_set"] is not None:
+        tool_spec = module.TOOL_SETS[cell["tool_set"]]
+        tools = [factory() for factory in tool_spec["tools"]]
+        requires = tool_spec["requires"]
+    return build_task(
+        cell["name"],
+        dataset=dataset if dataset is not None else load_samples(
+            module.EVAL_TYPE, category=cell["category"], requires_tool=requires, path=data,
+            budget=budget, prompt=module.PROMPTS[cell["prompt"]], name=cell["name"]),
+        prompt=module.PROMPTS[cell["prompt"]],
+        tools=tools,
+        scorer=suite["scorer"](cell["category"]),
+        metadata={"matrix_cell": cell},
+        model=model,
+        output_budget=output_budget,
+        prompt_name=cell["prompt"]
+    )
+
+# TASK ENTRY POINT
+@task
+def matrix_cell(name: str):
+    """Run a single cell of the default matrix by name"""
+    for cell in expand_matrix():
+        if cell["name"] == name:
+            return build_cell_task(cell)
+    raise ValueError(f"Unknown matrix cell '{name}'. Use: python task_matrix.py --list")
+
+# MATRIX RUNNER
+def run_matrix(models, spec=None, max_tasks=None, order="default", log_dir="logs", hedge=False,
+               pipelined=False, judge_workers=None, judge_rate=None, budget=None, data=DATA_PATH, pool=False,
+               output_budget=False, **eval_kwargs):
+    """
+    Run every cell x model as one interleaved inspect eval() call; returns the EvalLogs.
+
+    order="ljf" dispatches the samples (and cells) predicted to be slowest first, using the
+    prior logs in log_dir (sample_scheduler.py). hedge=True duplicates straggling model calls
+    (hedging.py) and records the hedge stats in each log header. pipelined=True moves scoring
+    out of the samples into a separate judge pool fed as samples finish (pipelined_scoring.py).
+    budget="trim" | "reject" counts tokens before the run and trims or drops samples that would
+    overflow a model's context window (token_budget.py). data is the samples CSV (e.g. the
+    synthetic variants written by perturb.py). pool=True sends every model and judge call through
+    one shared keep-alive HTTP pool and prints its connection reuse (http_pool.py). output_budget=True
+    generates with per-category max_tokens and stops after a refusal sentence (output_budget.py).
+    """
+    from inspect_ai import eval as inspect_eval
+
+    cells = expand_matrix(spec)
+    token_budget = None
+    if budget:
+        from token_budget import TokenBudget
+        token_budget = TokenBudget(models, budget, log_dir=log_dir, epochs=eval_kwargs.get("epochs", 1))
+    generation_budget = None
+    if output_budget:
+        from output_budget import OutputBudget
+        generation_budget = OutputBudget()
+    tasks = [build_cell_task(cell, budget=token_budget, data=data, output_budget=generation_budget) for cell in cells]
+
+    print("=" * 60)
+    print("TASK MATRIX EVALUATION")
+    print("=" * 60)
+    print(f"\nCells: {len(cells)}  Models: {len(models)}  Runs: {len(cells) * len(models)}")
+    if token_budget is not None:
+        print(token_budget.report())
+
+    if order == "ljf":
+        from inspect_ai.dataset import MemoryDataset
+        from sample_scheduler import (DEFAULT_WORKERS, cell_configs, load_cost_model, plan_longest_first,
+                                      plan_report)
+
+        workers = eval_kwargs.get("max_connections", DEFAULT_WORKERS)
+        cost_model, _ = load_cost_model(log_dir)
+        plan = plan_longest_first({t.name: list(t.dataset) for t in tasks}, cost_model, models, workers,
+                                  configs=cell_configs(cells, models))
+        by_name = {cell["name"]: cell for cell in cells}
+        tasks = [build_cell_task(by_name[entry["name"]], dataset=MemoryDataset(entry["samples"]),
+                                 output_budget=generation_budget) for entry in plan]
+        print("\nLongest-job-first order (predicted makespan):")
+        print(plan_report(plan, workers))
+
+    if pool:
+        import http_pool
+        http_pool.register()
+        models = [http_pool.pooled_model(m) for m in models]
+
+    if hedge:
+        import hedging
+        hedging.register()
+        models = [hedging.hedged_model(m) for m in models]
+
+    if pipelined:
+        import asyncio
+        from pipelined_scoring import JUDGE_WORKERS, run_pipelined
+
+        logs = asyncio.run(run_pipelined(
+            tasks, models, judge_workers or JUDGE_WORKERS, judge_rate=judge_rate,
+            max_tasks=max_tasks or len(tasks) * len(models), log_dir=log_dir, **eval_kwargs))
+        stats = logs[0].eval.metadata["pipelined_scoring"] if logs else {}
+        print(f"\nPipelined scoring: {stats.get('scored', 0)} samples judged, judging finished "
+              f"{stats.get('judge_tail', 0):.1f}s after generation ({stats.get('generation_wall', 0):.1f}s)")
+    else:
+        logs = inspect_eval(
+            tasks,
+            model=models,
+            max_tasks=max_tasks or len(tasks) * len(models),
+            log_dir=log_dir,
+            **eval_kwargs
+        )
+
+    if hedge:
+        print("\nHedging:")
+        for stats in hedging.attach_hedge_stats(logs):
+            print(f"  {stats['task']} @ {stats['model']}: {stats['hedges']}/{stats['calls']} calls hedged, "
+                  f"{stats['hedge_wins']} won by the backup, {stats['wasted_tokens']} wasted tokens")
+    if pool:
+        http_pool.restore_model_names(logs)
+        print(http_pool.pool_report())
+    if generation_budget is not None:
+        from output_budget import budget_report, sample_records
+        for model in sorted({log.eval.model for log in logs}):
+            records = {}
+            for log in logs:
+                if log.eval.model == model:
+                    records.update(sample_records((s.model_dump() for s in log.samples or []), log.eval.task))
+            print(f"\n{model}:")
+            print(budget_report(records))
+    return logs
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="Run the declarative task matrix")
+    parser.add_argument("--list", action="store_true", help="list the cells of the default matrix")
+    parser.add_argument("--run-all", action="store_true", help="run every cell for every --model")
+    parser.add_argument("--model", action="append", default=[], help="model to evaluate (repeatable)")
+    parser.add_argument("--max-tasks", type=int, default=None, help="cap on concurrently running tasks")
+    parser.add_argument("--order", choices=["default", "ljf"], default="default",
+                        help="sample dispatch order; ljf = predicted longest first (sample_scheduler.py)")
+    parser.add_argument("--log-dir", default="logs", help="where logs are written and cost history is read")
+    parser.add_argument("--hedge", action="store_true", help="hedge straggling model calls (hedging.py)")
+    parser.add_argument("--pipeline-scoring", action="store_true",
+                        help="judge samples on a separate pool as they finish (pipelined_scoring.py)")
+    parser.add_argument("--judge-workers", type=int, default=None, help="judge pool size with --pipeline-scoring")
+    parser.add_argument("--judge-rate", type=float, default=None, help="max judge calls per second")
+    parser.add_argument("--budget", choices=["trim", "reject"], default=None,
+                        help="pre-flight token check: trim or drop samples over a model's context (token_budget.py)")
+    parser.add_argument("--data", default=DATA_PATH, help="samples CSV, e.g. synthetic variants from perturb.py")
+    parser.add_argument("--pool", action="store_true", help="one shared keep-alive HTTP pool for all calls (http_pool.py)")
+    parser.add_argument("--output-budget", action="store_true",
+                        help="per-category max_tokens + stop after a refusal sentence (output_budget.py)")
+    args = parser.parse_args()
+
+    if args.run_all:
+        if not args.model:
+            parser.error("--run-all needs at least one --model")
+        run_matrix(args.model, max_tasks=args.max_tasks, order=args.order, log_dir=args.log_dir,
+                   hedge=args.hedge, pipelined=args.pipeline_scoring, judge_workers=args.judge_workers,
+                   judge_rate=args.judge_rate, budget=args.budget, data=args.data,
+                   pool=args.pool, output_budget=args.output_budget)
+    elif args.list:
+        for cell in expand_matrix():
+            print(cell["name"])
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Text Features:Cheap, deterministic lexical signals extracted from inputs and answers.
+
+Signals:
+1)split_input: "Context: ... Question: ..." -> (context, question)
+2)extract_numbers: normalized numeric values ($4.5 billion == 4.5B == 4500000000)
+3)extract_periods: years (2024) and quarters (Q3)
+4)extract_entities: capitalized names (TechCorp, New York, Dr Smith)
+5)claim_spans: the checkable spans of an answer (numbers, dates, entities) with their surface text
+6)is_refusal / is_apologetic: canonical refusal and apology phrases
+
+Shared by the failure-taxonomy classifier and local scorers. Only stdlib `re`; features of
+repeated texts (contexts are shared by every run of a sample) are memoized.
+"""
+import re
+from functools import lru_cache
+
+INPUT_RE = re.compile(r"^\s*Context:\s*(?P<context>.*?)\s*Question:\s*(?P<question>.*)$", re.S)
+
+NUMBER_RE = re.compile(
+    r"(?<![\w.])\$?(?P<value>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)\s?"
+    r"(?P<scale>billion|million|thousand|bn|[kmb])?(?![\w])",
+    re.I
+)
+YEAR_RE = re.compile(r"(?<!\d)(?:19|20)\d{2}(?!\d)")
+QUARTER_RE = re.compile(r"\bQ[1-4]\b")
+ENTITY_RE = re.compile(r"\b[A-Z][\w&-]*(?:\s+[A-Z][\w&-]*)*")
+
+SCALES = {"thousand": 1e3, "k": 1e3, "million": 1e6, "m": 1e6, "billion": 1e9, "bn": 1e9, "b": 1e9}
+
+# Capitalized words that are not entities (sentence starts, question words, pronouns)
+ENTITY_STOPWORDS = {
+    "A", "An", "The", "This", "That", "These", "Those", "It", "Its", "I", "We", "You", "He", "She",
+    "They", "What", "When", "Where", "Who", "Whom", "Which", "Why", "How", "Is", "Are", "Was",
+    "Were", "Do", "Does", "Did", "Can", "Could", "Should", "Would", "Will", "If", "In", "On", "At",
+    "For", "Of", "To", "From", "By", "With", "As", "Based", "According", "However", "But", "And",
+    "Or", "No", "Not", "Yes", "Context", "Question", "Answer", "Unfortunately", "Sorry", "Step",
+    "Therefore", "So", "There", "Here", "Since", "Because", "Also", "Please", "Note", "AM", "PM",
+}
+
+REFUSAL_MARKERS = (
+    "cannot answer", "can't answer", "unable to answer", "cannot determine", "can't determine",
+    "not in the context", "not provided", "not mentioned", "not specified", "not stated",
+    "does not contain", "doesn't contain", "does not provide", "doesn't provide",
+    "does not mention", "doesn't mention", "no information", "not available",
+)
+APOLOGY_MARKERS = ("sorry", "apologize", "apologies", "unfortunately")
+
+# SPLITTING
+@lru_cache(maxsize=65536)
+def split_input(text: str) -> tuple:
+    """Split a sample input into (context, question); inputs without a Context: prefix are all question"""
+    match = INPUT_RE.match(text or "")
+    if not match:
+        return "", (text or "").strip()
+    return match.group("context"), match.group("question")
+
+# EXTRACTION
+def _normalize_number(value: str, scale: str) -> str:
+    number = float(value.replace(",", ""))
+    if scale:
+        number *= SCALES[scale.lower()]
+    return f"{number:g}" if number < 1e15 else str(int(number))
+
+
+def extract_numbers(text: str) -> frozenset:
+    """Normalized numbers in text, excluding years (those are periods)"""
+    numbers = set()
+    for match in NUMBER_RE.finditer(text):
+        value = match.group("value")
+        if YEAR_RE.fullmatch(value) and not match.group("scale"):
+            continue
+        numbers.add(_normalize_number(value, match.group("scale") or ""))
+    return frozenset(numbers)
+
+
+def extract_periods(text: str) -> frozenset:
+    """Years and quarters mentioned in text"""
+    return frozenset(YEAR_RE.findall(text)) | frozenset(QUARTER_RE.findall(text))
+
+
+def extract_entities(text: str) -> frozenset:
+    """Capitalized name spans, possessives stripped, stopwords and periods dropped"""
+    entities = set()
+    for match in ENTITY_RE.finditer(text):
+        words = [w for w in match.group(0).replace("'s", "").split() if w not in ENTITY_STOPWORDS]
+        words = [w for w in words if not QUARTER_RE.fullmatch(w)]
+        if words:
+            entities.add(" ".join(words).lower())
+    return frozenset(entities)
+
+
+@lru_cache(maxsize=262144)
+def text_features(text: str) -> dict:
+    """numbers / periods / entities of a text (memoized: contexts and questions repeat across runs)"""
+    return {
+        "numbers": extract_numbers(text),
+        "periods": extract_periods(text),
+        "entities": extract_entities(text),
+    }
+
+
+def claim_spans(text: str) -> list:
+    """(kind, surface text, normalized value) for every number, period and entity span in text"""
+    spans = []
+    for match in NUMBER_RE.finditer(text):
+        value = match.group("value")
+        if YEAR_RE.fullmatch(value) and not match.group("scale"):
+            continue
+        spans.append(("number", match.group(0), _normalize_number(value, match.group("scale") or "")))
+    for match in YEAR_RE.finditer(text):
+        spans.append(("date", match.group(0), match.group(0)))
+    for match in QUARTER_RE.finditer(text):
+        spans.append(("date", match.group(0), match.group(0)))
+    for match in ENTITY_RE.finditer(text):
+        words = [w for w in match.group(0).replace("'s", "").split() if w not in ENTITY_STOPWORDS]
+        words = [w for w in words if not QUARTER_RE.fullmatch(w)]
+        if words:
+            spans.append(("entity", " ".join(words), " ".join(words).lower()))
+    return spans
+
+# REFUSALS
+def is_refusal(answer: str) -> bool:
+    """Whether an answer contains a canonical refusal phrase"""
+    answer = (answer or "").lower()
+    return any(marker in answer for marker in REFUSAL_MARKERS)
+
+
+def is_apologetic(answer: str) -> bool:
+    """Whether an answer apologizes"""
+    answer = (answer or "").lower()
+    return any(marker in answer for marker in APOLOGY_MARKERS)
@@ -0,0 +1,254 @@
+"""
+Token Budget:Pre-flight token counting and context budgeting before any model call.
+
+Over-length grounding contexts used to surface only as provider rejections mid-sweep (a
+wasted concurrency slot plus retries). Before a run:
+1)count: every sample's system prompt + input is counted per target model with a local
+  tokenizer (tiktoken; a ~4 characters/token estimate when it is not installed), in one batch
+  per tokenizer, cached by content hash in <log_dir>/.token_counts
+2)budget: a sample must fit context window - OUTPUT_RESERVE for EVERY model of the run (they
+  share one dataset); over-budget samples are rejected or, with policy "trim", get their
+  context cut from the end at a token boundary (the question is always kept)
+3)predict: input tokens per model for the whole run, printed before the first call
+
+Windows come from CONTEXT_WINDOWS (first matching model-name fragment wins).
+
+Run: python token_budget.py --model openai/gpt-4o-mini --model openai/gpt-4 [--policy trim|reject] [--epochs 1]
+     python task_matrix.py --run-all --model openai/gpt-4 --budget trim
+"""
+import argparse
+import hashlib
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from text_features import split_input
+
+CACHE_NAME = ".token_counts"  # JSON, but not *.json so log globs skip it
+OUTPUT_RESERVE = 1024  # tokens kept free for the answer
+MESSAGE_OVERHEAD = 8  # chat-format tokens around the system + user messages
+CONTEXT_WINDOWS = [  # (model-name fragment, context window), most specific first
+    ("gpt-4o", 128000),
+    ("gpt-4-turbo", 128000),
+    ("gpt-4-32k", 32768),
+    ("gpt-4", 8192),
+    ("gpt-3.5-turbo", 16385),
+    ("claude", 200000),
+    ("gemini", 1000000),
+    ("mistral", 32000),
+    ("llama3", 8192),
+]
+DEFAULT_WINDOW = 8192
+ESTIMATE = "estimate"  # tokenizer name when tiktoken is unavailable
+ESTIMATE_RE = re.compile(r"\s*\S{1,4}|\s+$")  # ~4 characters per token
+
+
+def context_window(model: str) -> int:
+    name = model.lower()
+    return next((window for fragment, window in CONTEXT_WINDOWS if fragment in name), DEFAULT_WINDOW)
+
+
+def encoding_name(model: str) -> str:
+    """tiktoken encoding for a model; other providers' tokenizers are approximated by cl100k"""
+    name = model.lower()
+    if any(fragment in name for fragment in ("gpt-4o", "o1", "o3", "o4")):
+        return "o200k_base"
+    return "cl100k_base"
+
+# TOKENIZER
+class Tokenizer:
+    """tiktoken encoding, or the character estimate; encode/decode round-trip for trimming."""
+
+    def __init__(self, encoding: str):
+        self.encoding = None
+        self.name = ESTIMATE
+        try:
+            import tiktoken
+        except ImportError:
+            return
+        try:
+            self.encoding = tiktoken.get_encoding(encoding)
+            self.name = encoding
+        except Exception as e:  # BPE files are downloaded on first use; offline this is a network error
+            print(f"Warning: tiktoken encoding {encoding} unavailable ({type(e).__name__}: {e}); "
+                  f"using the character estimate")
+
+    def encode(self, text: str) -> List[Any]:
+        if self.encoding is None:
+            return ESTIMATE_RE.findall(text)
+        return self.encoding.encode(text, disallowed_special=())
+
+    def decode(self, tokens: List[Any]) -> str:
+        return "".join(tokens) if self.encoding is None else self.encoding.decode(tokens)
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        if self.encoding is None:
+            return [len(ESTIMATE_RE.findall(t)) for t in texts]
+        return [len(t) for t in self.encoding.encode_batch(texts, disallowed_special=())]
+
+
+@lru_cache(maxsize=None)
+def tokenizer_for(model: str) -> Tokenizer:
+    return _tokenizer(encoding_name(model))
+
+
+@lru_cache(maxsize=None)
+def _tokenizer(encoding: str) -> Tokenizer:
+    return Tokenizer(encoding)
+
+
+class TokenCounts:
+    """Token counts cached by (tokenizer, content hash), persisted across runs."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self.counts: Dict[str, int] = {}
+        self.hits = self.misses = 0
+        if self.path and self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.counts = json.load(f)
+        self.dirty = False
+
+    @staticmethod
+    def key(tokenizer: Tokenizer, text: str) -> str:
+        return f"{tokenizer.name}:{hashlib.sha1(text.encode('utf-8')).hexdigest()[:20]}"
+
+    def count(self, tokenizer: Tokenizer, texts: List[str]) -> List[int]:
+        """Counts for texts; only texts never seen with this tokenizer are tokenized (in one batch)"""
+        keys = [self.key(tokenizer, t) for t in texts]
+        missing = list({k: t for k, t in zip(keys, texts) if k not in self.counts}.items())
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            for (k, _), n in zip(missing, tokenizer.count_batch([t for _, t in missing])):
+                self.counts[k] = n
+            self.dirty = True
+        return [self.counts[k] for k in keys]
+
+    def save(self):
+        if self.path and self.dirty:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.counts, f)
+            self.dirty = False
+
+# BUDGET
+class TokenBudget:
+    """Pre-flight stage applied by eval_common.load_samples to every dataset of a run."""
+
+    def __init__(self, models: List[str], policy: str = "trim", output_reserve: int = OUTPUT_RESERVE,
+                 log_dir: str = "logs", epochs: int = 1):
+        if policy not in ("trim", "reject"):
+            raise ValueError(f"Unknown budget policy '{policy}' (trim or reject)")
+        self.models = list(models)
+        self.policy = policy
+        self.output_reserve = output_reserve
+        self.epochs = epochs
+        self.counts = TokenCounts(Path(log_dir) / CACHE_NAME)
+        self._prompt_tokens: Dict[str, int] = {}  # of the dataset being applied
+        self.rows: List[Dict] = []  # one per dataset, for report()
+
+    def limit(self, model: str) -> int:
+        return context_window(model) - self.output_reserve
+
+    def _counts(self, texts: List[str]) -> Dict[str, List[int]]:
+        return {model: self.counts.count(tokenizer_for(model), texts) for model in self.models}
+
+    def _trim(self, text: str, excess: Dict[str, int]) -> Optional[str]:
+        """Cut the context from the end until it fits every model; None if even no context does not fit"""
+        context, question = split_input(text)
+        if not context:
+            return None
+        for _ in range(len(self.models) + 2):
+            model = max(excess, key=excess.get)
+            tokenizer = tokenizer_for(model)
+            tokens = tokenizer.encode(context)
+            keep = len(tokens) - excess[model]
+            if keep <= 0:
+                return None
+            context = tokenizer.decode(tokens[:keep]).rstrip()
+            text = f"Context: {context} Question: {question}"
+            excess = {m: n - self.limit(m) for m, n in zip(self.models, self._sample_totals(text))}
+            excess = {m: e for m, e in excess.items() if e > 0}
+            if not excess:
+                return text
+        return None
+
+    def _sample_totals(self, text: str) -> List[int]:
+        return [self._prompt_tokens[m] + n + MESSAGE_OVERHEAD for m, n in
+                ((m, self.counts.count(tokenizer_for(m), [text])[0]) for m in self.models)]
+
+    def apply(self, samples: List[Any], prompt: str = "", name: str = "") -> List[Any]:
+        """Samples that fit every model (trimmed copies where policy is trim); records the dataset's row"""
+        inputs = [s.input if isinstance(s.input, str) else str(s.input) for s in samples]
+        self._prompt_tokens = {m: self.counts.count(tokenizer_for(m), [prompt])[0] for m in self.models}
+        counts = self._counts(inputs)
+        kept, trimmed, rejected = [], [], []
+        totals = {m: 0 for m in self.models}
+        for i, sample in enumerate(samples):
+            need = {m: self._prompt_tokens[m] + counts[m][i] + MESSAGE_OVERHEAD for m in self.models}
+            excess = {m: n - self.limit(m) for m, n in need.items() if n > self.limit(m)}
+            if excess:
+                text = self._trim(inputs[i], excess) if self.policy == "trim" else None
+                if text is None:
+                    rejected.append(sample.id)
+                    continue
+                sample = sample.model_copy(update={
+                    "input": text, "metadata": {**(sample.metadata or {}), "trimmed_from_tokens": max(need.values())}})
+                need = dict(zip(self.models, self._sample_totals(text)))
+                trimmed.append(sample.id)
+            for m in self.models:
+                totals[m] += need[m] * self.epochs
+            kept.append(sample)
+        self.counts.save()
+        self.rows.append({"name": name, "samples": len(samples), "kept": len(kept), "trimmed": trimmed,
+                          "rejected": rejected, "input_tokens": totals})
+        return kept
+
+    def report(self) -> str:
+        """Per-dataset fit and the run's predicted input tokens per model"""
+        lines = []
+        lines.append("=" * 100)
+        lines.append(f"PRE-FLIGHT TOKEN BUDGET (policy {self.policy}, {self.output_reserve} tokens reserved for output)")
+        for model in self.models:
+            lines.append(f"  {model}: window {context_window(model)}, tokenizer {tokenizer_for(model).name}")
+        lines.append("=" * 100)
+        lines.append(f"{'Dataset':<46} {'N':>4} {'trimmed':>8} {'rejected':>9} {'input tokens (all models)':>28}")
+        lines.append("-" * 100)
+        for row in self.rows:
+            lines.append(f"{row['name'][:46]:<46} {row['samples']:>4} {len(row['trimmed']):>8} "
+                         f"{len(row['rejected']):>9} {sum(row['input_tokens'].values()):>28,}")
+            if row["rejected"]:
+                lines.append(f"    rejected ids: {', '.join(str(i) for i in row['rejected'][:20])}")
+        lines.append("-" * 100)
+        for model in self.models:
+            total = sum(row["input_tokens"][model] for row in self.rows)
+            lines.append(f"Predicted input tokens for {model}: {total:,} (x{self.epochs} epochs included)")
+        lines.append(f"Token count cache: {self.counts.hits} hits, {self.counts.misses} tokenized")
+        lines.append("=" * 100)
+        return "\n".join(lines)
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="Pre-flight token counting for the task matrix")
+    parser.add_argument("--model", action="append", default=[], help="target model (repeatable)")
+    parser.add_argument("--policy", choices=["trim", "reject"], default="trim")
+    parser.add_argument("--output-reserve", type=int, default=OUTPUT_RESERVE)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--log-dir", default="logs", help="where the token count cache lives")
+    args = parser.parse_args()
+
+    if not args.model:
+        parser.error("at least one --model is required")
+    from task_matrix import build_cell_task, expand_matrix
+
+    budget = TokenBudget(args.model, args.policy, args.output_reserve, args.log_dir, args.epochs)
+    for cell in expand_matrix():
+        build_cell_task(cell, budget=budget)
+    print(budget.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -13,17 +13,12 @@ Tools Implemented:
 3)search_database: Employee/product database lookup
 4)date_calculator: Date arithmetic
 
+Several tool calls in one assistant turn run concurrently (eval_common.build_task -> tool_execution.py).
+
 Run: inspect eval tool_agent_eval.py@tool_usage_eval --model bedrock/anthropic.claude-3-sonnet-20240229-v1:0
 """
 
-from dotenv import load_dotenv
-load_dotenv()
-
-from inspect_ai import Task, task
-from inspect_ai.dataset import Sample, MemoryDataset
-from inspect_ai.solver import generate, system_message, use_tools
-from inspect_ai.tool import tool
-from inspect_ai.scorer import model_graded_fact
+from eval_common import task, tool, load_samples, build_task
 
 # TOOL DEFINITIONS
 @tool
@@ -229,32 +224,63 @@ INSTRUCTIONS:
 
 Always use tools when available rather than guessing or using prior knowledge."""
 
+MULTI_TOOL_PROMPT = """You have access to multiple tools.
+            You may need to use multiple tools to answer complex questions.
+            First gather information, then calculate if needed."""
+
+# MATRIX AXES (expanded by task_matrix.py)
+EVAL_TYPE = "tool_agent"
+PROMPTS = {
+    "tool_agent": TOOL_AGENT_PROMPT,
+    "calculator": "You have access to a calculator. Use it for all math questions.",
+    "policy": "You have access to company policies. Look them up to answer questions.",
+    "database": "You have access to the company database. Search it to answer questions.",
+    "multi_tool": MULTI_TOOL_PROMPT
+}
+CATEGORIES = []
+
+# tool set name -> tool factories offered + requires_tool filter on the samples
+TOOL_SETS = {
+    "all": {"tools": [calculator, lookup_policy, search_database, date_calculator], "requires": None},
+    "calculator": {"tools": [calculator], "requires": "calculator"},
+    "lookup_policy": {"tools": [lookup_policy], "requires": "lookup_policy"},
+    "search_database": {"tools": [search_database], "requires": "search_database"},
+    "multi": {"tools": [calculator, lookup_policy, search_database, date_calculator], "requires": ","},
+}
+# tool set -> prompt of its hand-written @task (task_matrix pairs them instead of crossing the axes)
+TOOL_SET_PROMPTS = {
+    "all": "tool_agent",
+    "calculator": "calculator",
+    "lookup_policy": "policy",
+    "search_database": "database",
+    "multi": "multi_tool",
+}
+
+
+def tool_scorer(category=None):
+    """Tool tasks are judged on the final answer only"""
+    from inspect_ai.scorer import model_graded_fact
+
+    return model_graded_fact()
+
 # TASKS
 
 def load_tool_samples_by_type(tool_type=None):
-      """Load tool_agent samples, optionally filtered by requires_tool"""
-      import csv
-      import json
-      samples = []
-      with open("../data/all_samples.csv", "r", encoding="utf-8") as f:
-          reader = csv.DictReader(f)
-          for row in reader:
-              if row["eval_type"] == "tool_agent":
-                  extra = json.loads(row.get("extra_metadata", "{}"))
-                  requires = extra.get("requires_tool", "")
-                  if tool_type is None or tool_type in requires:
-                      samples.append(Sample(
-                          input=row["input"],
-                          target=row["target"],
-                          metadata={
-                              "category": row["category"],
-                              "expected_behavior": row["expected_behavior"],
-                              "eval_type": row["eval_type"],
-                              "requires_tool": requires,
-                              "difficulty": extra.get("difficulty", "")
-                          }
-                      ))
-      return MemoryDataset(samples)
+    """Load tool_agent samples, optionally filtered by requires_tool"""
+    return load_samples(EVAL_TYPE, requires_tool=tool_type)
+
+
+def tool_task(name, prompt, tool_set):
+    """One tool task: prompt + the tool set's tools over the samples that need them"""
+    spec = TOOL_SETS[tool_set]
+    return build_task(
+        name,
+        dataset=load_tool_samples_by_type(spec["requires"]),
+        prompt=PROMPTS[prompt],
+        tools=[factory() for factory in spec["tools"]],
+        scorer=tool_scorer()
+    )
+
 
 @task
 def tool_usage_eval():
@@ -267,89 +293,31 @@ def tool_usage_eval():
     - Tool usage (calling with correct arguments)
     - Result interpretation (using tool output correctly)
     """
-    return Task(
-        dataset=load_tool_samples_by_type(),
-        solver=[
-            system_message(TOOL_AGENT_PROMPT),
-            use_tools([
-                calculator(),
-                lookup_policy(),
-                search_database(),
-                date_calculator()
-            ]),
-            generate()
-        ],
-        scorer=model_graded_fact()
-    )
+    return tool_task("tool_usage_eval", "tool_agent", "all")
 
 
 @task
 def calculator_eval():
     """Focused evaluation on calculator tool usage."""
-
-    return Task(
-        dataset=load_tool_samples_by_type("calculator"),
-        solver=[
-            system_message("You have access to a calculator. Use it for all math questions."),
-            use_tools([calculator()]),
-            generate()
-        ],
-        scorer=model_graded_fact()
-    )
+    return tool_task("calculator_eval", "calculator", "calculator")
 
 
 @task
 def policy_lookup_eval():
     """Focused evaluation on policy lookup tool."""
-
-    return Task(
-        dataset=load_tool_samples_by_type("lookup_policy"),
-        solver=[
-            system_message("You have access to company policies. Look them up to answer questions."),
-            use_tools([lookup_policy()]),
-            generate()
-        ],
-        scorer=model_graded_fact()
-    )
+    return tool_task("policy_lookup_eval", "policy", "lookup_policy")
 
 
 @task
 def database_search_eval():
     """Focused evaluation on database search tool."""
-
-
-    return Task(
-         dataset=load_tool_samples_by_type("search_database"),
-        solver=[
-            system_message("You have access to the company database. Search it to answer questions."),
-            use_tools([search_database()]),
-            generate()
-        ],
-        scorer=model_graded_fact()
-    )
+    return tool_task("database_search_eval", "database", "search_database")
 
 
 @task
 def multi_tool_eval():
     """Evaluate model's ability to use multiple tools together."""
-
-
-    return Task(
-        dataset=load_tool_samples_by_type(","),
-        solver=[
-            system_message("""You have access to multiple tools.
-            You may need to use multiple tools to answer complex questions.
-            First gather information, then calculate if needed."""),
-            use_tools([
-                calculator(),
-                lookup_policy(),
-                search_database(),
-                date_calculator()
-            ]),
-            generate()
-        ],
-        scorer=model_graded_fact()
-    )
+    return tool_task("multi_tool_eval", "multi_tool", "multi")
 
 # MAIN
 if __name__ == "__main__":
@@ -361,6 +329,8 @@ Tools Available:
 3)search_database: Employee/product/department lookup
 4)date_calculator: Date arithmetic
 
+Several tool calls in one assistant turn run concurrently (eval_common.build_task -> tool_execution.py).
+
 Tasks:
   tool_usage_eval    - Full evaluation (12 samples)
   calculator_eval    - Calculator only (3 samples)
@@ -371,6 +341,9 @@ Tasks:
 Run:
   inspect eval tool_agent_eval.py@tool_usage_eval --model bedrock/anthropic.claude-3-sonnet-20240229-v1:0
 
+All variants as one interleaved run:
+  python task_matrix.py --run-all --model openai/gpt-4o-mini
+
 View:
   inspect view
 """)
@@ -0,0 +1,214 @@
+"""
+Parallel Tool Execution:Runs the independent tool calls of one assistant turn concurrently.
+
+When a model asks for several tools in one message (search_database for two employees plus
+lookup_policy), none of those calls can depend on another's result, so they are run together:
+1)per-tool concurrency limits: TOOL_LIMITS caps how many calls of one tool run at once (a real
+  database or API behind a tool has its own capacity)
+2)timeouts: a call running past TOOL_TIMEOUT seconds becomes a timeout error for the model
+3)speedup: every multi-call turn records serial seconds (sum of call durations), wall seconds
+  and their ratio in the sample store (tool_turns) and transcript, reported by log_analysis.py
+
+parallel_tool_generate() replaces generate() in build_task for every task with tools; each call
+still goes through inspect's execute_tools, so transcripts keep their tool events.
+execute_concurrently() is plain asyncio and does not need inspect_ai.
+
+Run: python tool_execution.py --bench [--latency 0.2] [--calls 3]
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Any, Optional
+
+from profiling import stage
+
+TOOL_TIMEOUT = 30.0  # seconds
+DEFAULT_TOOL_LIMIT = 8
+TOOL_LIMITS = {
+    "search_database": 4,
+    "lookup_policy": 4,
+    "calculator": DEFAULT_TOOL_LIMIT,
+    "date_calculator": DEFAULT_TOOL_LIMIT,
+}
+MAX_TURNS = 10  # model <-> tool rounds per sample
+
+_SEMAPHORES: Dict[tuple, asyncio.Semaphore] = {}
+
+
+def _semaphore(name: str, limits: Dict[str, int]) -> asyncio.Semaphore:
+    """Per-tool semaphore, shared by every sample running in this event loop"""
+    key = (id(asyncio.get_running_loop()), name)
+    if key not in _SEMAPHORES:
+        _SEMAPHORES[key] = asyncio.Semaphore(limits.get(name, DEFAULT_TOOL_LIMIT))
+    return _SEMAPHORES[key]
+
+# CONCURRENT EXECUTION
+async def limited_call(name: str, factory: Any, limits: Dict[str, int], timeout: float,
+                       durations: List[float]) -> Any:
+    """Await factory() under the per-tool limit and timeout, appending its duration; errors propagate"""
+    async with _semaphore(name, limits):
+        start = time.perf_counter()
+        try:
+            with stage("tool_execute"):
+                return await asyncio.wait_for(factory(), timeout)
+        finally:
+            durations.append(time.perf_counter() - start)
+
+
+def turn_stats(tools: List[str], durations: List[float], wall: float) -> Dict:
+    serial = sum(durations)
+    return {
+        "calls": len(tools),
+        "tools": tools,
+        "serial": round(serial, 4),
+        "wall": round(wall, 4),
+        "speedup": round(serial / wall, 2) if wall > 0 else 1.0
+    }
+
+
+async def execute_concurrently(calls: List[tuple], limits: Optional[Dict[str, int]] = None,
+                               timeout: float = TOOL_TIMEOUT) -> tuple:
+    """
+    Run (tool name, zero-argument coroutine factory) pairs concurrently.
+
+    Returns ([(result, error) per call, in call order], turn stats). error is None, "timeout"
+    or the exception; a failing call never cancels its siblings.
+    """
+    limits = TOOL_LIMITS if limits is None else limits
+    durations = []
+
+    async def run(name, factory):
+        try:
+            return await limited_call(name, factory, limits, timeout, durations), None
+        except asyncio.TimeoutError:
+            return None, "timeout"
+        except Exception as e:
+            return None, e
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(run(name, factory) for name, factory in calls))
+    return outcomes, turn_stats([name for name, _ in calls], durations, time.perf_counter() - start)
+
+# SOLVER
+def limit_tool(tool: Any, limits: Dict[str, int], timeout: float, durations: List[float]) -> Any:
+    """The tool with the same name and schema, run under its TOOL_LIMITS slot and the timeout"""
+    from inspect_ai.tool import ToolDef
+
+    tool_def = ToolDef(tool)
+
+    async def execute(**kwargs):
+        return await limited_call(tool_def.name, lambda: tool_def.tool(**kwargs), limits, timeout, durations)
+
+    return ToolDef(execute, name=tool_def.name, description=tool_def.description,
+                   parameters=tool_def.parameters, parallel=tool_def.parallel,
+                   viewer=tool_def.viewer).as_tool()
+
+
+def parallel_tool_generate(limits: Optional[Dict[str, int]] = None, timeout: float = TOOL_TIMEOUT,
+                           max_turns: int = MAX_TURNS):
+    """
+    generate() with the tool calls of each assistant turn executed concurrently.
+
+    inspect's execute_tools runs the calls of one message one after another, so each call goes
+    through execute_tools on its own (parse errors, approval, tool events, result conversion) as
+    a one-call copy of the assistant message, and the calls are gathered; tools declared
+    parallel=False still run one at a time. Every tool is wrapped in its per-tool limit and
+    timeout. The last turn generates without tools, so the model answers every result.
+    """
+    from inspect_ai.log import transcript
+    from inspect_ai.model import execute_tools
+    from inspect_ai.solver import solver
+    from inspect_ai.tool import ToolDef
+
+    @solver(name="parallel_tool_generate")
+    def make_solver(limits=limits, timeout=timeout, max_turns=max_turns):
+        limits = TOOL_LIMITS if limits is None else limits
+
+        async def solve(state, generate):
+            durations = []
+            with stage("tool_schema"):
+                tools = [limit_tool(tool, limits, timeout, durations) for tool in state.tools]
+                serial = {ToolDef(tool).name for tool in state.tools if not ToolDef(tool).parallel}
+            serial_lock = asyncio.Lock()
+
+            async def execute(call):
+                history = state.messages[:-1] + [state.messages[-1].model_copy(update={"tool_calls": [call]})]
+                if call.function in serial:
+                    async with serial_lock:
+                        return await execute_tools(history, tools)
+                return await execute_tools(history, tools)
+            turns = state.store.get("tool_turns", [])
+            tool_choice = state.tool_choice
+            for turn in range(max_turns):
+                if turn == max_turns - 1:
+                    state.tool_choice = "none"  # out of rounds: answer with the results so far
+                with stage("generate"):
+                    state = await generate(state, tool_calls="none")
+                calls = state.output.message.tool_calls or []
+                if not calls or state.completed:
+                    break
+
+                durations.clear()
+                start = time.perf_counter()
+                results = await asyncio.gather(*(execute(call) for call in calls))
+                wall = time.perf_counter() - start
+                for result in results:  # in call order
+                    state.messages.extend(getattr(result, "messages", result))
+                    if getattr(result, "output", None) is not None:
+                        state.output = result.output
+                if len(calls) > 1:
+                    stats = turn_stats([call.function for call in calls], durations, wall)
+                    turns.append(stats)
+                    transcript().info({"tool_turn": stats}, source="tool_execution")
+            state.tool_choice = tool_choice
+            state.store.set("tool_turns", turns)
+            return state
+
+        return solve
+
+    return make_solver()
+
+# BENCHMARK
+def bench(latency: float = 0.2, calls: int = 3, turns: int = 5) -> str:
+    """Simulated I/O-bound tools: sequential vs concurrent turns"""
+    async def io_tool():
+        await asyncio.sleep(latency)
+        return "ok"
+
+    names = (["search_database", "search_database", "lookup_policy"] * calls)[:calls]
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(turns):
+            for name in names:
+                await io_tool()
+        sequential = time.perf_counter() - start
+        start = time.perf_counter()
+        speedups = []
+        for _ in range(turns):
+            _, stats = await execute_concurrently([(name, io_tool) for name in names])
+            speedups.append(stats["speedup"])
+        return sequential, time.perf_counter() - start, speedups
+
+    sequential, concurrent, speedups = asyncio.run(run())
+    return (f"{turns} turns x {calls} calls ({', '.join(names)}) at {latency * 1000:.0f} ms each\n"
+            f"  sequential: {sequential:.2f}s\n"
+            f"  concurrent: {concurrent:.2f}s ({sequential / concurrent:.1f}x, "
+            f"mean recorded per-turn speedup {sum(speedups) / len(speedups):.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent tool execution")
+    parser.add_argument("--bench", action="store_true", help="simulated I/O tools: sequential vs concurrent")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per simulated tool call")
+    parser.add_argument("--calls", type=int, default=3, help="tool calls per turn")
+    args = parser.parse_args()
+
+    if args.bench:
+        print(bench(args.latency, args.calls))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
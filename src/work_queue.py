@@ -0,0 +1,418 @@
+"""
+Work-Queue Backend:Shards a sweep across worker processes and hosts through one SQLite queue.
+
+1)coordinator (--enqueue): expands matrix cells x models x samples x epochs into work items
+  (re-enqueueing the same sweep adds nothing)
+2)workers (--work): lease a batch of items of one cell x model, evaluate them with inspect and
+  write each scored sample back; a heartbeat thread keeps the lease alive, and an item whose
+  worker died is leased again once its lease expires (up to MAX_ATTEMPTS times)
+3)merger (--merge): every finished cell x model becomes one standard inspect .json log in
+  log_dir (metrics recomputed by inspect's score_async), readable by log_analysis.py
+
+Workers on other hosts point --db at the same file on a shared filesystem with working locks.
+On one box, --workers N starts N local worker processes; --demo N runs the whole cycle against
+inspect's mock model (mockllm/model), no API keys needed.
+
+Run: python work_queue.py --enqueue --model openai/gpt-4o-mini [--suite behavioral] [--epochs 1]
+     python work_queue.py --work [--workers 4] [--batch 8]
+     python work_queue.py --merge [--log-dir logs]
+     python work_queue.py --status
+     python work_queue.py --demo 4
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Optional
+
+DB_PATH = "logs/.work_queue.db"  # dot name, so log globs skip it
+SWEEP_SUITES = ["behavioral", "hallucination", "tool_agent"]
+LEASE_SECONDS = 300.0
+HEARTBEAT_SECONDS = 30.0
+MAX_ATTEMPTS = 3
+BATCH = 8  # items of one cell x model evaluated per eval() call
+POLL_SECONDS = 5.0  # idle wait while other workers still hold leases
+MOCK_MODEL = "mockllm/model"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    cell TEXT NOT NULL,
+    cell_json TEXT NOT NULL,
+    model TEXT NOT NULL,
+    sample_id TEXT NOT NULL,
+    epoch INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    UNIQUE (cell, model, sample_id, epoch)
+);
+CREATE INDEX IF NOT EXISTS items_status ON items (status, lease_until);
+CREATE TABLE IF NOT EXISTS headers (
+    cell TEXT NOT NULL,
+    model TEXT NOT NULL,
+    header TEXT NOT NULL,
+    merged TEXT,
+    PRIMARY KEY (cell, model)
+);
+"""
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+# QUEUE
+class WorkQueue:
+    """Work items in SQLite; every state change is one short write transaction."""
+
+    def __init__(self, path: str = DB_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _write(self, sql: str, params: tuple = ()) -> int:
+        with self.db:
+            return self.db.execute(sql, params).rowcount
+
+    def enqueue(self, items: List[Dict]) -> int:
+        """Insert work items; ones already queued (same cell, model, sample, epoch) are skipped"""
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            added = 0
+            for item in items:
+                added += self.db.execute(
+                    "INSERT OR IGNORE INTO items (cell, cell_json, model, sample_id, epoch) VALUES (?, ?, ?, ?, ?)",
+                    (item["cell"]["name"], json.dumps(item["cell"]), item["model"],
+                     json.dumps(item["sample_id"]), item["epoch"])).rowcount
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return added
+
+    def lease(self, worker: str, batch: int = BATCH, lease_seconds: float = LEASE_SECONDS) -> List[sqlite3.Row]:
+        """Claim up to batch available items of one cell x model x epoch (pending, or leased and expired)"""
+        now = time.time()
+        available = ("(status = 'pending' OR (status = 'leased' AND lease_until < ?)) AND attempts < ?")
+        self.db.execute("BEGIN IMMEDIATE")  # one leaser at a time across processes
+        try:
+            self.db.execute("UPDATE items SET status = 'failed', error = 'lease expired' "
+                            "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?", (now, MAX_ATTEMPTS))
+            first = self.db.execute(f"SELECT cell, model, epoch FROM items WHERE {available} ORDER BY id LIMIT 1",
+                                    (now, MAX_ATTEMPTS)).fetchone()
+            if first is None:
+                self.db.execute("COMMIT")
+                return []
+            rows = self.db.execute(
+                f"SELECT * FROM items WHERE {available} AND cell = ? AND model = ? AND epoch = ? ORDER BY id LIMIT ?",
+                (now, MAX_ATTEMPTS, first["cell"], first["model"], first["epoch"], batch)).fetchall()
+            ids = [row["id"] for row in rows]
+            self.db.execute(
+                f"UPDATE items SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                f"WHERE id IN ({','.join('?' * len(ids))})", (worker, now + lease_seconds, *ids))
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return rows
+
+    def heartbeat(self, worker: str, ids: List[int], lease_seconds: float = LEASE_SECONDS) -> int:
+        """Extend this worker's leases; returns how many it still holds"""
+        return self._write(
+            f"UPDATE items SET lease_until = ? WHERE status = 'leased' AND worker = ? "
+            f"AND id IN ({','.join('?' * len(ids))})", (time.time() + lease_seconds, worker, *ids))
+
+    def complete(self, worker: str, item_id: int, result: str) -> bool:
+        """Store a scored sample; False if the lease was lost to another worker meanwhile"""
+        return self._write("UPDATE items SET status = 'done', result = ?, error = NULL "
+                           "WHERE id = ? AND worker = ? AND status = 'leased'", (result, item_id, worker)) == 1
+
+    def fail(self, worker: str, ids: List[int], error: str):
+        """Release failed items for another attempt, or mark them failed after MAX_ATTEMPTS"""
+        self._write(
+            f"UPDATE items SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+            f"error = ?, lease_until = NULL WHERE worker = ? AND status = 'leased' "
+            f"AND id IN ({','.join('?' * len(ids))})", (MAX_ATTEMPTS, error, worker, *ids))
+
+    def set_header(self, cell: str, model: str, header: str):
+        """Log header (eval spec, plan) of the first finished batch of a cell x model"""
+        self._write("INSERT OR IGNORE INTO headers (cell, model, header) VALUES (?, ?, ?)", (cell, model, header))
+
+    def outstanding(self) -> int:
+        """Items not yet done or failed"""
+        return self.db.execute("SELECT COUNT(*) FROM items WHERE status IN ('pending', 'leased')").fetchone()[0]
+
+    def progress(self) -> List[sqlite3.Row]:
+        return self.db.execute(
+            "SELECT cell, model, COUNT(*) AS total, SUM(status = 'done') AS done, SUM(status = 'leased') AS leased, "
+            "SUM(status = 'failed') AS failed, COUNT(DISTINCT worker) AS workers FROM items "
+            "GROUP BY cell, model ORDER BY cell, model").fetchall()
+
+# COORDINATOR
+def sweep_items(models: List[str], spec: Optional[Dict] = None, epochs: int = 1) -> List[Dict]:
+    """cells x models x samples x epochs of a matrix spec"""
+    from task_matrix import build_cell_task, expand_matrix
+
+    items = []
+    for cell in expand_matrix(spec):
+        dataset = build_cell_task(cell).dataset
+        for model in models:
+            for sample in dataset:
+                for epoch in range(1, epochs + 1):
+                    items.append({"cell": cell, "model": model, "sample_id": sample.id, "epoch": epoch})
+    return items
+
+
+def suite_spec(suites: List[str]) -> Dict:
+    """Default-matrix axes for the named suites"""
+    from task_matrix import DEFAULT_MATRIX
+
+    return {suite: DEFAULT_MATRIX[suite] for suite in suites}
+
+# WORKER
+def evaluate_batch(rows: List[sqlite3.Row], runner: Optional[Any] = None) -> tuple:
+    """
+    Run one leased batch (same cell x model x epoch) through inspect; returns (header JSON, [sample JSON]).
+
+    runner (http_pool.PooledRunner) runs it on the worker's long-lived loop and shared HTTP pool.
+    """
+    from inspect_ai import eval as inspect_eval
+    from inspect_ai.dataset import MemoryDataset
+    from task_matrix import build_cell_task
+
+    cell, model, epoch = json.loads(rows[0]["cell_json"]), rows[0]["model"], rows[0]["epoch"]
+    wanted = {json.loads(row["sample_id"]) for row in rows}
+    samples = [s for s in build_cell_task(cell).dataset if s.id in wanted]
+    with tempfile.TemporaryDirectory() as tmp:
+        if runner is not None:
+            from http_pool import pooled_model
+
+            task = build_cell_task(cell, dataset=MemoryDataset(samples), model=pooled_model(model))
+            log = runner.eval(task, log_dir=tmp, display="none")[0]  # keeps the queued model name
+        else:
+            task = build_cell_task(cell, dataset=MemoryDataset(samples), model=model)
+            log = inspect_eval(task, log_dir=tmp, display="none")[0]
+        if log.status != "success":
+            raise RuntimeError(log.error.message if log.error else log.status)
+        # serialise before tmp goes: newer inspect versions load samples lazily from the log file
+        results = []
+        for sample in log.samples or []:
+            sample.epoch = epoch  # each batch is a one-epoch run of the item's epoch
+            results.append(sample.model_dump_json())
+        return log.model_dump_json(exclude={"samples"}), results
+
+
+def _heartbeat(db_path: str, worker: str, ids: List[int], stop: threading.Event):
+    queue = WorkQueue(db_path)  # sqlite connections stay in the thread that made them
+    try:
+        while not stop.wait(HEARTBEAT_SECONDS):
+            queue.heartbeat(worker, ids)
+    finally:
+        queue.close()
+
+
+def run_worker(db_path: str = DB_PATH, worker: Optional[str] = None, batch: int = BATCH,
+               evaluate: Callable = evaluate_batch, pool: bool = False) -> int:
+    """
+    Lease and evaluate batches until the queue is drained; returns samples completed.
+
+    pool=True evaluates every batch on one event loop through the shared HTTP pool (http_pool.py),
+    so connections to the provider are reused from batch to batch.
+    """
+    from eval_common import load_env
+
+    load_env()
+    worker = worker or worker_name()
+    queue = WorkQueue(db_path)
+    completed = 0
+    runner = None
+    if pool and evaluate is evaluate_batch:
+        from functools import partial
+        from http_pool import PooledRunner
+
+        runner = PooledRunner()
+        evaluate = partial(evaluate_batch, runner=runner)
+    try:
+        while True:
+            rows = queue.lease(worker, batch)
+            if not rows:
+                if not queue.outstanding():
+                    break
+                time.sleep(POLL_SECONDS)  # others hold leases that may still expire
+                continue
+            ids = [row["id"] for row in rows]
+            stop = threading.Event()
+            beat = threading.Thread(target=_heartbeat, args=(db_path, worker, ids, stop), daemon=True)
+            beat.start()
+            try:
+                header, results = evaluate(rows)
+                by_id = {(json.loads(r)["id"], json.loads(r)["epoch"]): r for r in results}
+                queue.set_header(rows[0]["cell"], rows[0]["model"], header)
+                missing = []
+                for row in rows:
+                    result = by_id.get((json.loads(row["sample_id"]), row["epoch"]))
+                    if result is None:
+                        missing.append(row["id"])
+                    elif queue.complete(worker, row["id"], result):
+                        completed += 1
+                if missing:
+                    queue.fail(worker, missing, "sample missing from eval log")
+            except Exception as e:
+                queue.fail(worker, ids, str(e))
+                print(f"[{worker}] batch of {rows[0]['cell']} @ {rows[0]['model']} failed: {e}")
+            finally:
+                stop.set()
+                beat.join()
+    finally:
+        queue.close()
+        if runner is not None:
+            from http_pool import pool_report
+
+            runner.close()
+            print(f"[{worker}]\n{pool_report(runner.runs)}")
+    return completed
+
+
+def run_local_workers(db_path: str = DB_PATH, workers: int = 4, batch: int = BATCH, pool: bool = False) -> None:
+    """N worker processes on this box"""
+    import multiprocessing
+
+    processes = [multiprocessing.Process(target=run_worker, args=(db_path, f"{worker_name()}-w{i}", batch),
+                                         kwargs={"pool": pool})
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+# MERGER
+def merge_logs(db_path: str = DB_PATH, log_dir: str = "logs", force: bool = False) -> List[str]:
+    """Write one inspect .json log per finished cell x model (skips ones already merged unless force)"""
+    import asyncio
+    from inspect_ai import score_async
+    from inspect_ai.log import EvalLog, EvalSample, write_eval_log
+    from pipelined_scoring import replay_scorer
+    from task_matrix import SUITES
+
+    queue = WorkQueue(db_path)
+    written = []
+    for group in queue.progress():
+        if group["done"] + group["failed"] < group["total"]:
+            continue  # still running
+        row = queue.db.execute("SELECT header, merged FROM headers WHERE cell = ? AND model = ?",
+                               (group["cell"], group["model"])).fetchone()
+        if row is None or (row["merged"] and not force):
+            continue
+        results = queue.db.execute("SELECT cell_json, result FROM items WHERE cell = ? AND model = ? "
+                                   "AND status = 'done'", (group["cell"], group["model"])).fetchall()
+        if not results:
+            print(f"Skipped {group['cell']} @ {group['model']}: all {group['failed']} items failed")
+            continue  # nothing to merge; stays unmerged so a requeue can still produce its log
+        cell = json.loads(results[0]["cell_json"])
+        samples = sorted((EvalSample.model_validate_json(r["result"]) for r in results),
+                         key=lambda s: (s.epoch, str(s.id).zfill(8)))
+        log = EvalLog.model_validate_json(row["header"])
+        log.samples = samples
+        log.eval.dataset.samples = len({s.id for s in samples})
+        log.eval.config.epochs = max(s.epoch for s in samples)
+        log.eval.metadata = {**(log.eval.metadata or {}), "work_queue": {
+            "items": group["total"], "failed": group["failed"], "workers": group["workers"]}}
+
+        # recompute results/metrics over the merged samples with the cell's own scorers
+        scorers = SUITES[cell["suite"]]["scorer"](cell["category"])
+        scores = {(log.eval.task, str(log.eval.model), s.id, s.epoch): s.scores or {} for s in samples}
+        replay = [replay_scorer(s, log.eval.task, scores) for s in (scorers if isinstance(scorers, list) else [scorers])]
+        log = asyncio.run(score_async(log, replay, action="overwrite"))
+
+        stamp = time.strftime("%Y-%m-%dT%H-%M-%S", time.localtime())
+        location = Path(log_dir) / f"{stamp}_{group['cell']}_{log.eval.task_id}.json"
+        location.parent.mkdir(parents=True, exist_ok=True)
+        write_eval_log(log, str(location))
+        queue._write("UPDATE headers SET merged = ? WHERE cell = ? AND model = ?",
+                     (str(location), group["cell"], group["model"]))
+        written.append(str(location))
+    queue.close()
+    return written
+
+
+def status_report(db_path: str = DB_PATH) -> str:
+    queue = WorkQueue(db_path)
+    rows = queue.progress()
+    queue.close()
+    lines = []
+    lines.append("=" * 100)
+    lines.append(f"WORK QUEUE ({db_path})")
+    lines.append("=" * 100)
+    lines.append(f"{'Cell':<42} {'Model':<26} {'total':>6} {'done':>6} {'leased':>7} {'failed':>7} {'workers':>8}")
+    lines.append("-" * 100)
+    for row in rows:
+        lines.append(f"{row['cell'][:42]:<42} {row['model'][-26:]:<26} {row['total']:>6} {row['done']:>6} "
+                     f"{row['leased']:>7} {row['failed']:>7} {row['workers']:>8}")
+    lines.append("=" * 100)
+    return "\n".join(lines)
+
+# MAIN
+def main():
+    parser = argparse.ArgumentParser(description="SQLite work queue for sharded eval sweeps")
+    parser.add_argument("--db", default=DB_PATH, help="queue database (shared path for multi-host runs)")
+    parser.add_argument("--enqueue", action="store_true", help="expand the sweep into work items")
+    parser.add_argument("--model", action="append", default=[], help="model to evaluate (repeatable)")
+    parser.add_argument("--suite", action="append", default=[], help=f"suite to sweep (default: {', '.join(SWEEP_SUITES)})")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--work", action="store_true", help="lease and evaluate items until the queue is drained")
+    parser.add_argument("--workers", type=int, default=1, help="local worker processes for --work")
+    parser.add_argument("--batch", type=int, default=BATCH, help="items per lease")
+    parser.add_argument("--pool", action="store_true", help="reuse HTTP connections across batches (http_pool.py)")
+    parser.add_argument("--merge", action="store_true", help="write logs for finished cell x model groups")
+    parser.add_argument("--force", action="store_true", help="re-merge groups already written")
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--status", action="store_true")
+    parser.add_argument("--demo", type=int, metavar="N", help=f"enqueue + N local workers + merge on {MOCK_MODEL}")
+    args = parser.parse_args()
+
+    suites = args.suite or SWEEP_SUITES
+    if args.demo:
+        queue = WorkQueue(args.db)
+        print(f"Queued {queue.enqueue(sweep_items([MOCK_MODEL], suite_spec(suites), args.epochs))} items")
+        queue.close()
+        run_local_workers(args.db, args.demo, args.batch)
+        print(status_report(args.db))
+        for path in merge_logs(args.db, args.log_dir, args.force):
+            print(f"Merged {path}")
+    elif args.enqueue:
+        if not args.model:
+            parser.error("--enqueue needs at least one --model")
+        queue = WorkQueue(args.db)
+        items = sweep_items(args.model, suite_spec(suites), args.epochs)
+        print(f"Queued {queue.enqueue(items)} new of {len(items)} items")
+        queue.close()
+    elif args.work:
+        if args.workers > 1:
+            run_local_workers(args.db, args.workers, args.batch, args.pool)
+        else:
+            print(f"Completed {run_worker(args.db, batch=args.batch, pool=args.pool)} samples")
+    elif args.merge:
+        for path in merge_logs(args.db, args.log_dir, args.force):
+            print(f"Merged {path}")
+    elif args.status:
+        print(status_report(args.db))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()